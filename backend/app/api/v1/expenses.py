@@ -0,0 +1,182 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+import asyncio
+from ....db.session import get_async_db, SessionLocal
+from ....services.expenses_services import (
+    list_expenses,
+    update_expense_async,
+    delete_expense_async,
+    to_schema,
+    EXPENSE_COLUMNS,
+    DEFAULT_EXPENSE_FIELDS,
+    DEFAULT_SEARCH_FIELDS,
+)
+from ....services.rollup_services import get_spend_summary, GROUP_COLUMNS
+from ....services.vendor_services import search_expenses
+from ....services.category_services import (
+    list_overrides_async,
+    set_override_async,
+    delete_override_async,
+    recategorize,
+)
+from ....schemas.expense import ExpenseUpdate, CategoryOverrideSet
+from ....services.pagination import InvalidCursor, parse_fields
+from ....services.export_services import export_stream, parquet_available, EXPORT_FORMATS, MEDIA_TYPES
+from ....core.config import settings
+
+
+router = APIRouter(prefix="/expenses", tags=["expenses"])
+
+
+@router.get("")
+async def get_expenses(
+    user_id: int = Query(...),
+    start_date: date | None = None,
+    end_date: date | None = None,
+    category: str | None = None,
+    vendor: str | None = None,
+    fields: str | None = Query(default=None, description="Comma-separated columns to return"),
+    cursor: str | None = Query(default=None, description="`next_cursor` from the previous page"),
+    limit: int = Query(default=50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    List a user's expenses, newest first, one keyset page at a time
+    """
+    try:
+        selected = parse_fields(fields, tuple(EXPENSE_COLUMNS), DEFAULT_EXPENSE_FIELDS)
+        items, next_cursor = await list_expenses(
+            db,
+            user_id=user_id,
+            fields=selected,
+            start_date=start_date,
+            end_date=end_date,
+            category=category,
+            vendor=vendor,
+            cursor=cursor,
+            limit=limit,
+        )
+    except (InvalidCursor, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/search")
+async def search(
+    user_id: int = Query(...),
+    q: str = Query(..., min_length=2, description="Merchant or vendor name, misspellings allowed"),
+    fields: str | None = Query(default=None, description="Comma-separated columns to return"),
+    limit: int = Query(default=20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Fuzzy search of a user's expenses by merchant or vendor name, best match first
+    """
+    try:
+        selected = parse_fields(fields, tuple(EXPENSE_COLUMNS), DEFAULT_SEARCH_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    items = await search_expenses(
+        db, user_id=user_id, query=q, columns={name: EXPENSE_COLUMNS[name] for name in selected}, limit=limit
+    )
+    return {"items": items}
+
+
+@router.get("/export")
+async def export_expenses(
+    user_id: int = Query(...),
+    format: str = Query(default="csv", description="csv or parquet"),
+    include_raw_text: bool = False,
+):
+    """
+    Stream all of a user's expenses as CSV or Parquet; memory use stays
+    constant regardless of history size
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    return StreamingResponse(
+        export_stream(
+            "expenses", user_id, format,
+            include_raw_text=include_raw_text, chunk_size=settings.export_chunk_size,
+        ),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="expenses-{user_id}.{format}"'},
+    )
+
+@router.get("/summary")
+async def get_summary(
+    user_id: int = Query(...),
+    group_by: str = Query(default="month", description=f"One of: {', '.join(GROUP_COLUMNS)}"),
+    start_month: date | None = None,
+    end_month: date | None = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Spend totals per month, category or vendor, served from the rollup table
+    """
+    if group_by not in GROUP_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of: {', '.join(GROUP_COLUMNS)}")
+    buckets = await get_spend_summary(
+        db, user_id=user_id, group_by=group_by, start_month=start_month, end_month=end_month
+    )
+    return {"group_by": group_by, "buckets": buckets}
+
+
+def _recategorize(user_id: int) -> int:
+    with SessionLocal() as db:
+        return recategorize(db, user_id)
+
+
+@router.get("/category-overrides")
+async def get_category_overrides(user_id: int = Query(...), db: AsyncSession = Depends(get_async_db)):
+    return {"items": await list_overrides_async(db, user_id)}
+
+
+@router.put("/category-overrides")
+async def put_category_override(
+    override: CategoryOverrideSet,
+    user_id: int = Query(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Always file a merchant's expenses under `category`; existing expenses
+    (other than hand-edited ones) are re-categorised straight away
+    """
+    try:
+        key = await set_override_async(db, user_id, override.vendor, override.category)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    recategorized = await asyncio.to_thread(_recategorize, user_id)
+    return {"vendor_key": key, "category": override.category, "recategorized": recategorized}
+
+
+@router.delete("/category-overrides")
+async def remove_category_override(
+    user_id: int = Query(...),
+    vendor: str = Query(...),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if not await delete_override_async(db, user_id, vendor):
+        raise HTTPException(status_code=404, detail=f"No category override for {vendor!r}")
+    recategorized = await asyncio.to_thread(_recategorize, user_id)
+    return {"recategorized": recategorized}
+
+
+@router.patch("/{expense_id}")
+async def patch_expense(expense_id: int, changes: ExpenseUpdate, db: AsyncSession = Depends(get_async_db)):
+    expense = await update_expense_async(db, expense_id, changes)
+    if expense is None:
+        raise HTTPException(status_code=404, detail=f"Expense {expense_id} not found")
+    return to_schema(expense).model_dump()
+
+
+@router.delete("/{expense_id}", status_code=204)
+async def remove_expense(expense_id: int, db: AsyncSession = Depends(get_async_db)):
+    if not await delete_expense_async(db, expense_id):
+        raise HTTPException(status_code=404, detail=f"Expense {expense_id} not found")
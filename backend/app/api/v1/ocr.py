@@ -1,16 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Header, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
-from ....db.session import get_db
-from ....services.ocr_services import extract_expense_data
-from ....services.expenses_services import create_expense, to_schema as expense_to_schema
-from ....services.payments_services import create_payment, to_schema as payment_to_schema
-from ....services.auth_services import get_user_by_id
+from ....db.session import get_async_db, AsyncSessionLocal
+from ....services.ocr_services import (
+    extract_expense_data,
+    extract_with_tesseract,
+    expense_data_from_extraction,
+    has_required_fields,
+    escalation_reasons,
+    is_trusted,
+    required_field_count,
+    cascade_stats,
+    ocr_cache,
+    sniff_image_type,
+    SNIFF_BYTES,
+)
+from ....services.gemini_client import hedged, hedge_stats
+from ....services.ocr_engines import get_engine, ocr_engines
+from ....services.ocr_executor import ocr_executor, OCRQueueFull, OCRJobTimeout
+from ....services.transactions_services import create_expense_with_payment_async, find_recorded_transaction_async
+from ....services.idempotency_services import (
+    begin_async,
+    finish_async,
+    release_async,
+    request_fingerprint,
+    IdempotencyConflict,
+    IdempotencyInProgress,
+    REPLAYED_HEADER,
+)
+from ....schemas.expense import ExpenseCreate
+from ....schemas.payments import PaymentCreate
+from ....services.auth_services import get_user_by_id_async
+from ....services.category_services import apply_overrides, user_overrides_async
+from ....services.ocr_jobs_services import enqueue_job_async, get_job_async, to_schema as job_to_schema
 from ....models.user import User
+from ....core.config import ocr_settings, settings
+from ....core.metrics import observe_stage, ocr_extractions
 from datetime import datetime
-import tempfile
-import os
+import asyncio
+import json
 import logging
+import time
 
 # Configure module logger
 logger = logging.getLogger(__name__)
@@ -24,112 +58,514 @@ if not logger.handlers:
 
 router = APIRouter(prefix="/ocr", tags=["ocr"])
 
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
 
 class OCRRequest(BaseModel):
     """Request model for OCR endpoint"""
     user_id: int
-    
+    # From an earlier /extract; lets a retry skip OCR when the transaction is already saved
+    transaction_id: str | None = None
+
+
+
+async def read_image_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """Read an uploaded image into memory, rejecting non-images and oversized bodies early
+
+    The magic bytes are checked on the first read and the size limit is
+    enforced chunk by chunk, so a bad upload is refused without buffering it.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Image exceeds {max_bytes} bytes")
+
+    head = await file.read(SNIFF_BYTES)
+    if sniff_image_type(head) is None:
+        raise HTTPException(status_code=415, detail="Unsupported image format")
+
+    buffer = bytearray(head)
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Image exceeds {max_bytes} bytes")
+    return bytes(buffer)
+
+
+# Pipeline step (as recorded in the extraction's `timings`) -> (metrics stage, engine)
+PIPELINE_STAGES = {
+    "draft": ("decode", ""),
+    "decode": ("decode", ""),
+    "crop": ("preprocess", ""),
+    "grayscale": ("preprocess", ""),
+    "downscale": ("preprocess", ""),
+    "binarize": ("preprocess", ""),
+    "tesseract": ("ocr", "tesseract"),
+    "gemini": ("ocr", "gemini"),
+    "parse": ("parse", ""),
+}
+
+
+def observe_pipeline(timings: dict[str, float]) -> None:
+    """Record an extraction's step timings (milliseconds) as stage histograms"""
+    stages: dict[tuple[str, str], float] = {}
+    for step, ms in timings.items():
+        if step in PIPELINE_STAGES:
+            stage = PIPELINE_STAGES[step]
+            stages[stage] = stages.get(stage, 0.0) + ms
+    for (stage, engine), ms in stages.items():
+        observe_stage(stage, ms / 1000, engine)
+
+
+async def timed_upload(file: UploadFile) -> bytes:
+    started = time.perf_counter()
+    content = await read_image_upload(file, settings.max_upload_bytes)
+    observe_stage("upload_read", time.perf_counter() - started)
+    return content
+
+
+async def run_extraction(content: bytes) -> dict:
+    """Extract expense data from image bytes, serving repeats from the cache"""
+    # Identical uploads (retries, re-shares) are served from the cache
+    cache_key = ocr_cache.key_for(content)
+    data = await ocr_cache.get_async(cache_key)
+    if data is not None:
+        ocr_extractions.inc(outcome="cache_hit")
+        return data
+
+    client = get_engine("gemini")
+    try:
+        if client is None:
+            # Extract data using OCR service in the process pool (bytes are decoded in memory)
+            data = await tesseract_extraction(content)
+        elif ocr_settings.ocr_cascade:
+            data = await cascade_extraction(client, content)
+        else:
+            data = await extract_with_gemini(client, content)
+    except OCRQueueFull:
+        ocr_extractions.inc(outcome="queue_full")
+        raise
+    except OCRJobTimeout:
+        ocr_extractions.inc(outcome="timeout")
+        raise
+    except Exception:
+        ocr_extractions.inc(outcome="error")
+        raise
+
+    ocr_extractions.inc(outcome="success" if data else "empty")
+    # An untrusted read is only a best effort; a retry should get to escalate again
+    if is_trusted(data):
+        await ocr_cache.put_async(cache_key, data)
+    return data
+
+
+async def tesseract_extraction(content: bytes) -> dict:
+    data = await ocr_executor.run(extract_with_tesseract, content)
+    # Observed as each engine finishes, so a read that loses a hedge still counts
+    observe_pipeline(data.get("timings", {}))
+    return data
+
+
+async def gemini_extraction(client, content: bytes) -> dict:
+    image_part = {"mime_type": f"image/{sniff_image_type(content)}", "data": content}
+    data = expense_data_from_extraction(await client.extract_async(image_part), {})
+    observe_pipeline(data["timings"])
+    return data
+
+
+async def extract_with_gemini(client, content: bytes) -> dict:
+    """Ask Gemini first; hedge with pooled tesseract if it is slow or fails"""
+    return await hedged(
+        lambda: gemini_extraction(client, content),
+        lambda: tesseract_extraction(content),
+        hedge_after=ocr_settings.gemini_hedge_after or None,
+        is_valid=has_required_fields,
+        score=required_field_count,
+    )
+
+
+async def cascade_extraction(client, content: bytes) -> dict:
+    """Pooled tesseract first; escalate to Gemini if its read is untrustworthy, fails or is slow"""
+
+    async def local() -> dict:
+        try:
+            data = await tesseract_extraction(content)
+        except Exception:
+            cascade_stats.record(["tesseract_failed"])
+            raise
+        cascade_stats.record(escalation_reasons(data))
+        return data
+
+    return await hedged(
+        local,
+        lambda: gemini_extraction(client, content),
+        hedge_after=ocr_settings.gemini_hedge_after or None,
+        is_valid=is_trusted,
+        score=required_field_count,
+    )
+
+
+async def idempotent(
+    db: AsyncSession,
+    response: Response,
+    *,
+    key: str | None,
+    user_id: int,
+    endpoint: str,
+    fingerprint: str,
+    handler,
+    keep=lambda result: True,
+) -> dict:
+    """Run `handler` once per Idempotency-Key and replay its result to retries
+
+    Results `keep` rejects (and exceptions) release the key, so the client's
+    next retry runs the request again.
+    """
+    if key is None:
+        return await handler()
+    try:
+        record = await begin_async(
+            db, user_id=user_id, key=key, endpoint=endpoint, fingerprint=fingerprint, lease=settings.idempotency_lease
+        )
+    except IdempotencyConflict:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    except IdempotencyInProgress:
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still being processed",
+            headers={"Retry-After": str(settings.ocr_retry_after)},
+        )
+    if record is not None:
+        ocr_extractions.inc(outcome="idempotent_replay")
+        response.headers[REPLAYED_HEADER] = "true"
+        return record.response
+
+    try:
+        result = await handler()
+    except BaseException:
+        await release_async(db, user_id=user_id, key=key)
+        raise
+    if keep(result):
+        await finish_async(
+            db, user_id=user_id, key=key, status_code=200, response=jsonable_encoder(result), ttl=settings.idempotency_ttl
+        )
+    else:
+        await release_async(db, user_id=user_id, key=key)
+    return result
+
+
+def extraction_payload(data: dict) -> dict:
+    """Shape extracted fields into the API response format"""
+    return {
+        "amount": data.get("amount"),
+        "merchant": data.get("vendor"),
+        "date": data.get("date"),
+        "transaction_id": data.get("id", "N/A"),
+        "category": data.get("category", "Other"),
+        "payment_method": data.get("payment_method", "UPI"),
+        "raw_text": data.get("raw_text", "")
+    }
 
 
 @router.post("/extract")
 async def extract_from_image(
+    response: Response,
     file: UploadFile = File(...),
     user_id: int = Form(default=1),  # Default user for testing
-    db: Session = Depends(get_db)
+    idempotency_key: str | None = Header(default=None, max_length=255),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Extract expense data from uploaded screenshot
+
+    With an Idempotency-Key header, a retry of a successful request returns
+    the first response without running OCR again.
     """
     # Validate file type
-    if not file.content_type.startswith('image/'):
+    if not file.content_type or not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="File must be an image")
-    
-    # Save uploaded file temporarily
-    temp_file = None
-    try:
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.jpg') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-        
-        # Extract data using OCR service (pass the file path)
-        data = extract_expense_data(temp_file_path)
-        
-        if not data:
+
+    content = await timed_upload(file)
+
+    async def extract() -> dict:
+        try:
+            data = await run_extraction(content)
+
+            if not data:
+                return {
+                    "success": False,
+                    "error": "Could not extract data from image"
+                }
+            data = apply_overrides(data, *await user_overrides_async(db, user_id))
+
+            # For now, just return the extracted data without saving to DB
+            # You can uncomment the DB saving code below when you want to persist data
+
             return {
-                "success": False,
-                "error": "Could not extract data from image"
+                "success": True,
+                "data": extraction_payload(data)
             }
-        
-        # For now, just return the extracted data without saving to DB
-        # You can uncomment the DB saving code below when you want to persist data
-        
-        return {
-            "success": True,
-            "data": {
-                "amount": data.get("amount"),
-                "merchant": data.get("vendor"),
-                "date": data.get("date"),
-                "transaction_id": data.get("id", "N/A"),
-                "category": data.get("category", "Other"),
-                "payment_method": data.get("payment_method", "UPI"),
-                "raw_text": data.get("raw_text", "")
+
+        except OCRQueueFull as e:
+            logger.warning("OCR queue full (in_flight=%d), rejecting upload", ocr_executor.in_flight)
+            raise HTTPException(
+                status_code=503,
+                detail="OCR service is busy, retry later",
+                headers={"Retry-After": str(e.retry_after)},
+            )
+
+        except OCRJobTimeout:
+            logger.warning("OCR job timed out")
+            raise HTTPException(status_code=504, detail="OCR processing timed out")
+
+        except Exception as e:
+            logger.exception("OCR processing failed")
+            return {
+                "success": False,
+                "error": f"Processing failed: {str(e)}"
             }
-        }
-        
-    except Exception as e:
-        logger.exception("OCR processing failed")
-        return {
-            "success": False,
-            "error": f"Processing failed: {str(e)}"
-        }
-    
-    finally:
-        # Clean up temporary file
-        if temp_file and os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
+
+    return await idempotent(
+        db,
+        response,
+        key=idempotency_key,
+        user_id=user_id,
+        endpoint="/ocr/extract",
+        fingerprint=request_fingerprint(ocr_cache.key_for(content)),
+        handler=extract,
+        keep=lambda result: result["success"],
+    )
+
+
+@router.post("/extract-batch")
+async def extract_batch(
+    files: list[UploadFile] = File(...),
+    user_id: int = Form(default=1),  # Default user for testing
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Extract expense data from many screenshots, streaming one NDJSON line per
+    image in completion order. Each line carries the image's `index` in the
+    upload so clients can match results back.
+    """
+    if len(files) > settings.ocr_batch_max_files:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.ocr_batch_max_files} images per batch",
+        )
+
+    overrides, merchants = await user_overrides_async(db, user_id)
+    semaphore = asyncio.Semaphore(settings.ocr_batch_concurrency)
+
+    async def process(index: int, file: UploadFile) -> dict:
+        result = {"index": index, "filename": file.filename}
+        # Read inside the semaphore so at most ocr_batch_concurrency images are in memory;
+        # the rest stay spooled in the form (closed only after the response has streamed)
+        async with semaphore:
+            try:
+                if not file.content_type or not file.content_type.startswith('image/'):
+                    raise HTTPException(status_code=400, detail="File must be an image")
+                content = await timed_upload(file)
+            except HTTPException as e:
+                return {**result, "success": False, "error": e.detail}
+            try:
+                data = await run_extraction(content)
+            except OCRQueueFull as e:
+                return {**result, "success": False, "error": "OCR service is busy", "retry_after": e.retry_after}
+            except OCRJobTimeout:
+                return {**result, "success": False, "error": "OCR processing timed out"}
+            except Exception as e:
+                logger.exception("OCR processing failed for batch item %d", index)
+                return {**result, "success": False, "error": f"Processing failed: {str(e)}"}
+        if not data:
+            return {**result, "success": False, "error": "Could not extract data from image"}
+        return {**result, "success": True, "data": extraction_payload(apply_overrides(data, overrides, merchants))}
+
+    async def stream():
+        tasks = [asyncio.create_task(process(index, file)) for index, file in enumerate(files)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished) + "\n"
+        finally:
+            # Client went away: don't leave OCR work queued on its behalf
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+def job_payload(job) -> dict:
+    payload = job_to_schema(job).model_dump()
+    if payload["result"]:
+        payload["result"] = extraction_payload(payload["result"])
+    return payload
+
+
+@router.post("/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    user_id: int = Form(default=1),  # Default user for testing
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Queue a screenshot for extraction and return immediately with a job ID.
+    Poll `/ocr/jobs/{id}` or subscribe to `/ocr/jobs/{id}/events` for the result.
+    """
+    if not file.content_type or not file.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
+
+    content = await timed_upload(file)
+    started = time.perf_counter()
+    job = await enqueue_job_async(
+        db, user_id=user_id, image=content, max_attempts=settings.ocr_job_max_attempts
+    )
+    observe_stage("db_write", time.perf_counter() - started)
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    job = await get_job_async(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job_payload(job)
+
+
+async def _load_job_payload(job_id: str) -> dict | None:
+    async with AsyncSessionLocal() as db:
+        job = await get_job_async(db, job_id)
+        return job_payload(job) if job else None
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Server-sent events for a job: a `status` event whenever its state changes,
+    then a final `done` or `failed` event carrying the job and closing the stream.
+    """
+    payload = await _load_job_payload(job_id)
+    if payload is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+
+    async def stream():
+        current = payload
+        last_seen = None
+        while True:
+            state = (current["status"], current["attempts"])
+            if current["status"] in ("done", "failed"):
+                yield f"event: {current['status']}\ndata: {json.dumps(current)}\n\n"
+                return
+            if state != last_seen:
+                yield f"event: status\ndata: {json.dumps(current)}\n\n"
+                last_seen = state
+            await asyncio.sleep(settings.ocr_job_poll_interval)
+            current = await _load_job_payload(job_id)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/cache-stats")
+def cache_stats():
+    """Hit/miss counters for the OCR result cache"""
+    return ocr_cache.stats()
+
+
+@router.get("/cascade-stats")
+def cascade_stats_view():
+    """How often tesseract reads were accepted vs escalated to the LLM, and why, and what the LLM calls cost"""
+    client = get_engine("gemini") if "gemini" in ocr_engines.loaded() else None
+    return {
+        "cascade": cascade_stats.as_dict(),
+        "hedge": hedge_stats.as_dict(),
+        "gemini": client.stats() if client else None,
+    }
 
 
 @router.post("/extract-and-save")
-def extract_and_save(request: OCRRequest, db: Session = Depends(get_db)):
+async def extract_and_save(
+    request: OCRRequest,
+    response: Response,
+    idempotency_key: str | None = Header(default=None, max_length=255),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Extract a screenshot and save it as an expense and its payment
+
+    A transaction id that is already saved for the user is not saved again;
+    the existing pair comes back with `duplicate: true`. With an
+    Idempotency-Key header, retries return the first response.
+    """
     user_id = request.user_id
 
-    user = get_user_by_id(db, user_id)
+    user = await get_user_by_id_async(db, user_id)
     if not user:
         # Provide helpful error details without leaking sensitive data
-        available_ids = [u.id for u in db.query(User).all()]
+        available_ids = (await db.scalars(select(User.id))).all()
         logger.info("User lookup failed for user_id=%s; available_ids=%s", user_id, available_ids)
         raise HTTPException(status_code=404, detail=f"User {user_id} not found")
 
-    data = extract_expense_data()
+    async def save() -> dict:
+        # Checked before OCR when the client already knows the transaction id
+        recorded = await find_recorded_transaction_async(db, user_id=user_id, transaction_id=request.transaction_id)
+        if recorded:
+            return saved_payload(*recorded, duplicate=True)
 
-    if not data:
-        raise HTTPException(status_code=400, detail="No data extracted")
+        data = extract_expense_data()
 
-    expense = create_expense(
-        db,
-        user_id=user_id,
-        vendor=data["vendor"],
-        amount=float(data["amount"]),
-        expense_date=datetime.fromisoformat(data["date"]).date(),
-        category=data.get("category", "Other"),
-        raw_text=data.get("raw_text", ""),
-    )
+        if not data:
+            raise HTTPException(status_code=400, detail="No data extracted")
+        data = apply_overrides(data, *await user_overrides_async(db, user_id))
+
+        transaction_id = data.get("id") or None
+        recorded = await find_recorded_transaction_async(db, user_id=user_id, transaction_id=transaction_id)
+        if recorded:
+            return saved_payload(*recorded, duplicate=True)
+
+        expense_date = datetime.fromisoformat(data["date"]).date()
+        started = time.perf_counter()
+        try:
+            expense, payment = await create_expense_with_payment_async(
+                db,
+                user_id=user_id,
+                expense=ExpenseCreate(
+                    vendor=data["vendor"],
+                    amount=float(data["amount"]),
+                    expense_date=expense_date,
+                    category=data.get("category", "Other"),
+                    raw_text=data.get("raw_text", ""),
+                ),
+                payment=PaymentCreate(
+                    amount=float(data["amount"]),
+                    payment_date=expense_date,
+                    transanction_Id=data.get("id", ""),
+                    raw_text=data.get("raw_text", ""),
+                ),
+            )
+        except IntegrityError:
+            # A concurrent request saved the same transaction first
+            recorded = await find_recorded_transaction_async(db, user_id=user_id, transaction_id=transaction_id)
+            if not recorded:
+                raise
+            return saved_payload(*recorded, duplicate=True)
+        observe_stage("db_write", time.perf_counter() - started)
+        return saved_payload(expense, payment, duplicate=False)
 
-    payment = create_payment(
+    return await idempotent(
         db,
+        response,
+        key=idempotency_key,
         user_id=user_id,
-        amount=float(data["amount"]),
-        payment_date=datetime.fromisoformat(data["date"]).date(),
-        payment_method=data.get("payment_method", "unknown"),
-        payment_status=data.get("payment_status", "unknown"),
-        raw_text=data.get("raw_text", ""),
+        endpoint="/ocr/extract-and-save",
+        fingerprint=request_fingerprint(request.model_dump_json()),
+        handler=save,
     )
 
+
+def saved_payload(expense, payment, *, duplicate: bool) -> dict:
     return {
-        "expense": expense_to_schema(expense).model_dump(),
-        "payment": payment_to_schema(payment).model_dump(),
+        "expense": expense.model_dump() if expense else None,
+        "payment": payment.model_dump(),
+        "duplicate": duplicate,
     }
-
-
@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date
+from ....db.session import get_async_db
+from ....services.payments_services import list_payments, PAYMENT_COLUMNS, DEFAULT_PAYMENT_FIELDS
+from ....services.pagination import InvalidCursor, parse_fields
+from ....services.export_services import export_stream, parquet_available, EXPORT_FORMATS, MEDIA_TYPES
+from ....core.config import settings
+
+
+router = APIRouter(prefix="/payments", tags=["payments"])
+
+
+@router.get("")
+async def get_payments(
+    user_id: int = Query(...),
+    start_date: date | None = None,
+    end_date: date | None = None,
+    fields: str | None = Query(default=None, description="Comma-separated columns to return"),
+    cursor: str | None = Query(default=None, description="`next_cursor` from the previous page"),
+    limit: int = Query(default=50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    List a user's payments, newest first, one keyset page at a time
+    """
+    try:
+        selected = parse_fields(fields, tuple(PAYMENT_COLUMNS), DEFAULT_PAYMENT_FIELDS)
+        items, next_cursor = await list_payments(
+            db,
+            user_id=user_id,
+            fields=selected,
+            start_date=start_date,
+            end_date=end_date,
+            cursor=cursor,
+            limit=limit,
+        )
+    except (InvalidCursor, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get("/export")
+async def export_payments(
+    user_id: int = Query(...),
+    format: str = Query(default="csv", description="csv or parquet"),
+    include_raw_text: bool = False,
+):
+    """
+    Stream all of a user's payments as CSV or Parquet; memory use stays
+    constant regardless of history size
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+
+    return StreamingResponse(
+        export_stream(
+            "payments", user_id, format,
+            include_raw_text=include_raw_text, chunk_size=settings.export_chunk_size,
+        ),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="payments-{user_id}.{format}"'},
+    )
@@ -0,0 +1,86 @@
+"""
+Expense/payment inserts per second, one pair per transaction against bulk batches
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m backend.benchmarks.bulk_insert_bench [--rows N] [--batch-sizes 100 1000]
+
+Writes synthetic transactions for a fresh user through
+create_expense_with_payment (what extract-and-save does per screenshot)
+and through bulk_create_expenses_with_payments (what import_expenses does)
+at each batch size, and reports rows per second. The rows are left in
+place, so point DATABASE_URL at a scratch database.
+"""
+import argparse
+import logging
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+from backend.benchmarks.screenshots import VENDORS
+from backend.db.session import SessionLocal, create_tables
+from backend.models.user import User
+from backend.schemas.expense import ExpenseCreate
+from backend.schemas.payments import PaymentCreate
+from backend.services.transactions_services import bulk_create_expenses_with_payments, create_expense_with_payment
+
+logger = logging.getLogger("bulk_insert_bench")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def synthetic_pairs(count: int, seed: int) -> list[tuple[ExpenseCreate, PaymentCreate]]:
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        vendor = rng.choice(VENDORS)
+        amount = float(rng.randint(10, 20000))
+        when = date(2025, 1, 1) + timedelta(days=rng.randrange(360))
+        text = f"Paid to\n{vendor}\nRs {amount:.2f}\n{when:%d %b %Y}"
+        pairs.append((
+            ExpenseCreate(vendor=vendor, amount=amount, expense_date=when, category="Other", raw_text=text),
+            PaymentCreate(amount=amount, payment_date=when, transanction_Id=uuid.uuid4().hex, raw_text=text),
+        ))
+    return pairs
+
+
+def bench_user(db) -> int:
+    token = uuid.uuid4().hex[:12]
+    user = User(email=f"bench-{token}@example.com", phone=f"bench-{token}", password_hash="-", name="bulk_insert_bench")
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000, help="pairs written per mode")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    create_tables()
+    with SessionLocal() as db:
+        user_id = bench_user(db)
+
+        pairs = synthetic_pairs(args.rows, args.seed)
+        started = time.perf_counter()
+        for expense, payment in pairs:
+            create_expense_with_payment(db, user_id=user_id, expense=expense, payment=payment)
+        elapsed = time.perf_counter() - started
+        logger.info("%-12s %8.0f rows/sec", "per pair", args.rows / elapsed)
+
+        for batch_size in args.batch_sizes:
+            pairs = synthetic_pairs(args.rows, args.seed + batch_size)
+            started = time.perf_counter()
+            for start in range(0, len(pairs), batch_size):
+                bulk_create_expenses_with_payments(db, user_id=user_id, pairs=pairs[start:start + batch_size])
+            elapsed = time.perf_counter() - started
+            logger.info("%-12s %8.0f rows/sec", f"bulk x{batch_size}", args.rows / elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Categorisation latency: one keyword match, and re-categorising a large history
+
+    python -m backend.benchmarks.categorizer_bench [--rows N] [--vendors V]
+
+Matches are timed against vendor names and OCR text from a synthetic mix of
+known and unknown merchants. The batch pass runs `recategorize` over N
+expenses for one user in a throwaway SQLite database.
+"""
+import argparse
+import logging
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from backend.db.base import Base
+from backend.models.expenses import Expense
+from backend.services.categorizer import DEFAULT_CATEGORY_KEYWORDS, categorize, category_matcher
+from backend.services.category_services import recategorize
+from backend.services.raw_text_services import store_raw_texts
+
+logger = logging.getLogger("categorizer_bench")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+USER_ID = 1
+INSERT_BATCH = 10_000
+
+
+def synthetic_vendors(count: int, seed: int = 7) -> list[str]:
+    """Known merchants with OCR-ish suffixes, plus made-up shops no keyword matches"""
+    rng = random.Random(seed)
+    keywords = [keyword for words in DEFAULT_CATEGORY_KEYWORDS.values() for keyword in words]
+    vendors = []
+    for index in range(count):
+        if rng.random() < 0.7:
+            vendors.append(f"{rng.choice(keywords).upper()} {rng.choice(['', 'PVT LTD', 'STORE', str(index)])}".strip())
+        else:
+            vendors.append(f"Shop {index} {rng.choice(['Traders', 'Enterprises', 'Agencies'])}")
+    return vendors
+
+
+def time_matches(vendors: list[str], iterations: int) -> float:
+    """Mean microseconds per `categorize` call"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for vendor in vendors:
+            categorize(vendor, f"Paid to {vendor} UPI transaction ID 123456789012")
+    return (time.perf_counter() - started) / (iterations * len(vendors)) * 1e6
+
+
+def seed_expenses(db: Session, vendors: list[str], rows: int) -> None:
+    rng = random.Random(11)
+    start = date(2023, 1, 1)
+    for offset in range(0, rows, INSERT_BATCH):
+        chosen = [rng.choice(vendors) for _ in range(min(INSERT_BATCH, rows - offset))]
+        digests = store_raw_texts(db, [f"Paid to {vendor}" for vendor in chosen])
+        db.execute(insert(Expense), [
+            {
+                "user_id": USER_ID,
+                "vendor": vendor,
+                "merchant": vendor,
+                "amount": rng.randint(10, 5000),
+                "expense_date": start + timedelta(days=rng.randrange(1000)),
+                "category": "Other",
+                "raw_text_digest": digest,
+            }
+            for vendor, digest in zip(chosen, digests)
+        ])
+    db.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--vendors", type=int, default=5_000)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    vendors = synthetic_vendors(args.vendors)
+    logger.info(
+        "dictionary %s: %.1f us per categorize()",
+        category_matcher.version, time_matches(vendors[:1000], args.iterations),
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{Path(directory) / 'bench.db'}")
+        Base.metadata.create_all(engine)
+        with Session(engine) as db:
+            started = time.perf_counter()
+            seed_expenses(db, vendors, args.rows)
+            logger.info("seeded %d expenses in %.1fs", args.rows, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            updated = recategorize(db, USER_ID)
+            elapsed = time.perf_counter() - started
+            logger.info(
+                "recategorize: %d of %d rows changed in %.2fs (%.0f rows/s)",
+                updated, args.rows, elapsed, args.rows / elapsed,
+            )
+
+            started = time.perf_counter()
+            updated = recategorize(db, USER_ID)
+            logger.info("recategorize again (nothing to change): %d rows in %.2fs", updated, time.perf_counter() - started)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Structured Gemini replies against the old free-text replies, offline
+
+    python -m backend.benchmarks.gemini_bench [--seconds S] [--latency MS]
+
+Plays backend/benchmarks/fixtures/gemini_responses.json through a
+GeminiClient on the stub backend and reports per-field accuracy and time
+to a result for the schema-constrained JSON (one pydantic validation) next
+to the free-text replies the old prompt produced (label regexes), plus
+reply sizes and the client's call stats.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from datetime import date
+from pathlib import Path
+
+from backend.schemas.extraction import ExtractedTransaction
+from backend.services.gemini_client import GeminiClient, GeminiReply, StubGeminiBackend
+from backend.services.upi_parser import FIELDS, parse_transaction_text
+
+logger = logging.getLogger("gemini_bench")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+CORPUS_PATH = Path(__file__).parent / "fixtures" / "gemini_responses.json"
+TODAY = date(2025, 12, 31)
+
+
+def structured_parse(text: str) -> dict:
+    transaction = ExtractedTransaction.model_validate_json(text)
+    return {
+        "provider": transaction.payment_app,
+        "vendor": transaction.vendor,
+        "amount": transaction.amount,
+        "id": transaction.transaction_id,
+        "date": transaction.date,
+    }
+
+
+def free_text_parse(text: str) -> dict:
+    return parse_transaction_text(text, today=TODAY)
+
+
+def accuracy(parse, texts: list[str], corpus: list[dict]) -> dict[str, float]:
+    fields = ("provider", *FIELDS)
+    correct = {field: 0 for field in fields}
+    for text, case in zip(texts, corpus):
+        result = parse(text)
+        for field in fields:
+            correct[field] += result.get(field) == case["expected"][field]
+    return {field: correct[field] / len(corpus) for field in fields}
+
+
+def microseconds_per_parse(parse, texts: list[str], seconds: float) -> float:
+    parses = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for text in texts:
+            parse(text)
+        parses += len(texts)
+    return (time.perf_counter() - started) / parses * 1e6
+
+
+async def through_client(corpus: list[dict], latency: float) -> dict:
+    """Each structured reply once through the client, as /ocr/extract makes the call"""
+    replies = [
+        GeminiReply(json.dumps(case["response"]), case.get("prompt_tokens", 0), case.get("output_tokens", 0))
+        for case in corpus
+    ]
+    client = GeminiClient(StubGeminiBackend(replies, latency))
+    await asyncio.gather(*(client.extract_async(None) for _ in corpus))
+    return client.stats()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="time budget per parser")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub call latency in ms")
+    args = parser.parse_args()
+
+    corpus = json.loads(CORPUS_PATH.read_text(encoding="utf-8"))
+    structured = [json.dumps(case["response"]) for case in corpus]
+    free_text = [case["legacy_text"] for case in corpus]
+
+    for name, parse, texts in (("free-text", free_text_parse, free_text), ("structured", structured_parse, structured)):
+        scores = accuracy(parse, texts, corpus)
+        micros = microseconds_per_parse(parse, texts, args.seconds)
+        chars = sum(len(text) for text in texts) / len(texts)
+        logger.info(
+            "%-10s %7.1f us/reply  %5.0f chars/reply  accuracy %s",
+            name, micros, chars, {field: f"{score:.0%}" for field, score in scores.items()},
+        )
+
+    logger.info("client stats: %s", asyncio.run(through_client(corpus, args.latency / 1000)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Import-time budget for application startup
+
+    python -m backend.benchmarks.import_budget [--module backend.main] [--budget-ms 1000]
+
+Imports the module in a fresh interpreter with `-X importtime`, reports the
+total and the heaviest top-level packages, and exits non-zero if the total
+exceeds the budget or a lazily loaded dependency was imported eagerly.
+"""
+import argparse
+import logging
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+logger = logging.getLogger("import_budget")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# Only ever imported on first use (see services/ocr_engines.py, services/export_services.py, services/raw_text_services.py)
+LAZY_MODULES = ("google.generativeai", "pytesseract", "tesserocr", "pyarrow", "zstandard")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(module: str) -> list[tuple[str, int, int, int]]:
+    """(module, self us, cumulative us, depth) for every import made by `module`"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{completed.stderr[-2000:]}")
+    rows = []
+    for line in completed.stderr.splitlines():
+        if match := _LINE.match(line):
+            rows.append((match[4], int(match[1]), int(match[2]), len(match[3])))
+    return rows
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    total_ms = next(cumulative for name, _, cumulative, _ in rows if name == args.module) / 1000
+
+    by_package: dict[str, int] = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+    heaviest = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[: args.top]
+
+    logger.info("import %s: %.1fms (budget %.0fms)", args.module, total_ms, args.budget_ms)
+    for package, self_us in heaviest:
+        logger.info("  %-28s %8.1fms", package, self_us / 1000)
+
+    imported = {name for name, _, _, _ in rows}
+    eager = [name for name in LAZY_MODULES if name in imported]
+    if eager:
+        logger.error("Imported eagerly, should load on first use: %s", ", ".join(eager))
+    if total_ms > args.budget_ms:
+        logger.error("Import time %.1fms is over the %.0fms budget", total_ms, args.budget_ms)
+    return 1 if eager or total_ms > args.budget_ms else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,386 @@
+"""
+Asyncio load generator for the API with latency SLO reporting
+
+    python -m backend.benchmarks.load_test [--concurrency N | --rate R] [--duration S] [--slo extract.p95_ms=2000 ...]
+
+Drives /ocr/extract (multipart uploads of synthetic screenshots, see
+screenshots.py), /ocr/extract-and-save and the read endpoints with a
+weighted mix, either closed-loop (N clients sending back to back) or
+open-loop (Poisson arrivals at R requests/sec; latency is measured from
+each request's scheduled start, so a stalled server can't hide its queue).
+Reports throughput, p50/p95/p99 latency and error rates per endpoint,
+checks them against the SLOs and exits 1 if any is missed.
+
+Offline, against a local server with the stubbed Gemini backend and SQLite:
+
+    export DATABASE_URL=sqlite:///./loadtest.db GEMINI_BACKEND=stub \\
+        GEMINI_STUB_FIXTURE=backend/benchmarks/fixtures/gemini_responses.json GEMINI_STUB_LATENCY=0.4 \\
+        GEMINI_RATE_PER_SECOND=1000 GEMINI_BURST=1000 OCR_CASCADE=false GEMINI_HEDGE_AFTER=0 \\
+        OCR_POOL_WARMUP_ENGINES=  # only needed without a tesseract binary
+    python -m backend.db_init
+    uvicorn backend.main:app --workers 2 &
+    python -m backend.benchmarks.load_test --seed-user --concurrency 32 --duration 60
+
+(--seed-user creates the load-test user through DATABASE_URL, so it needs
+the same settings as the server.) Uploads repeat an earlier image at
+--repeat-ratio, which is roughly the OCR cache hit rate; the rest get a few
+random trailing bytes so each is a distinct upload.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from backend.benchmarks.screenshots import VENDORS, generate_corpus
+
+logger = logging.getLogger("load_test")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+DEFAULT_MIX = "extract=5,extract-and-save=1,expenses=2,payments=1,summary=1,search=1"
+
+# endpoint (or "*" for every endpoint, "all" for the whole run) -> metric -> limit;
+# *_ms and error_rate are maxima, min_rps a minimum
+DEFAULT_SLOS = {
+    "*": {"error_rate": 0.01},
+    "extract": {"p95_ms": 3000, "p99_ms": 6000},
+    "extract-and-save": {"p95_ms": 1000, "p99_ms": 2000},
+    "expenses": {"p95_ms": 300, "p99_ms": 800},
+    "payments": {"p95_ms": 300, "p99_ms": 800},
+    "summary": {"p95_ms": 300, "p99_ms": 800},
+    "search": {"p95_ms": 500, "p99_ms": 1000},
+}
+MAX_METRICS = ("p50_ms", "p95_ms", "p99_ms", "error_rate")
+
+LOAD_TEST_EMAIL = "loadtest@dipex.local"
+
+
+class Workload:
+    """Builds each endpoint's requests for one user"""
+
+    def __init__(self, user_id: int, images: list[tuple[str, bytes, str]], repeat_ratio: float, rng: random.Random):
+        self.user_id = user_id
+        self.images = images
+        self.repeat_ratio = repeat_ratio
+        self.rng = rng
+        self.sent: list[tuple[str, bytes, str]] = []
+
+    def upload(self) -> tuple[str, bytes, str]:
+        if self.sent and self.rng.random() < self.repeat_ratio:
+            return self.rng.choice(self.sent)
+        name, data, mime = self.rng.choice(self.images)
+        # Decoders ignore bytes after the end marker; the OCR cache key doesn't
+        upload = (name, data + os.urandom(8), mime)
+        if len(self.sent) < 1000:
+            self.sent.append(upload)
+        return upload
+
+    def request(self, endpoint: str) -> tuple[str, str, dict]:
+        user = {"user_id": self.user_id}
+        if endpoint == "extract":
+            return "POST", "/api/v1/ocr/extract", {"files": {"file": self.upload()}, "data": user}
+        if endpoint == "extract-and-save":
+            return "POST", "/api/v1/ocr/extract-and-save", {"json": user}
+        if endpoint == "expenses":
+            return "GET", "/api/v1/expenses", {"params": {**user, "limit": 50}}
+        if endpoint == "payments":
+            return "GET", "/api/v1/payments", {"params": {**user, "limit": 50}}
+        if endpoint == "summary":
+            return "GET", "/api/v1/expenses/summary", {"params": {**user, "group_by": "category"}}
+        if endpoint == "search":
+            return "GET", "/api/v1/expenses/search", {"params": {**user, "q": self.rng.choice(VENDORS).split()[0]}}
+        raise ValueError(f"unknown endpoint {endpoint!r}")
+
+
+class Results:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)  # ms, successful or not
+        self.errors: dict[str, Counter] = defaultdict(Counter)
+        self.recording = False
+
+    def record(self, endpoint: str, ms: float, error: str | None) -> None:
+        if not self.recording:
+            return
+        self.latencies[endpoint].append(ms)
+        if error:
+            self.errors[endpoint][error] += 1
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))]
+
+
+def summarize(latencies: list[float], errors: Counter, seconds: float) -> dict:
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "rps": len(ordered) / seconds if seconds else 0.0,
+        "p50_ms": percentile(ordered, 0.50),
+        "p95_ms": percentile(ordered, 0.95),
+        "p99_ms": percentile(ordered, 0.99),
+        "error_rate": sum(errors.values()) / len(ordered) if ordered else 0.0,
+        "errors": dict(errors),
+    }
+
+
+def classify(endpoint: str, response: httpx.Response) -> str | None:
+    """Error label for a response, or None if it succeeded"""
+    if response.status_code >= 400:
+        return str(response.status_code)
+    if endpoint == "extract" and response.headers.get("content-type", "").startswith("application/json"):
+        if response.json().get("success") is False:
+            return "extraction_failed"
+    return None
+
+
+async def send(client: httpx.AsyncClient, workload: Workload, results: Results, endpoint: str, scheduled: float) -> None:
+    method, path, options = workload.request(endpoint)
+    error = None
+    try:
+        response = await client.request(method, path, **options)
+        error = classify(endpoint, response)
+    except httpx.TimeoutException:
+        error = "timeout"
+    except httpx.TransportError as e:
+        error = type(e).__name__
+    results.record(endpoint, (time.perf_counter() - scheduled) * 1000, error)
+
+
+async def closed_loop(client, workload, results, choose, concurrency: int, deadline: float) -> None:
+    async def user() -> None:
+        while time.perf_counter() < deadline:
+            await send(client, workload, results, choose(), time.perf_counter())
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+
+
+async def open_loop(client, workload, results, choose, rate: float, max_in_flight: int, deadline: float, rng) -> None:
+    in_flight: set[asyncio.Task] = set()
+    next_arrival = time.perf_counter()
+    while next_arrival < deadline:
+        await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+        endpoint = choose()
+        if len(in_flight) >= max_in_flight:
+            results.record(endpoint, 0.0, "client_overloaded")
+        else:
+            task = asyncio.create_task(send(client, workload, results, endpoint, next_arrival))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        next_arrival += rng.expovariate(rate)
+    if in_flight:
+        await asyncio.wait(in_flight)
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def parse_slos(overrides: list[str]) -> dict[str, dict[str, float]]:
+    """DEFAULT_SLOS with `endpoint.metric=value` overrides applied"""
+    slos = {endpoint: dict(limits) for endpoint, limits in DEFAULT_SLOS.items()}
+    for override in overrides:
+        target, _, value = override.partition("=")
+        endpoint, _, metric = target.rpartition(".")
+        if not endpoint or metric not in (*MAX_METRICS, "min_rps"):
+            raise ValueError(f"SLO must look like endpoint.metric=value with metric one of {MAX_METRICS + ('min_rps',)}: {override}")
+        slos.setdefault(endpoint, {})[metric] = float(value)
+    return slos
+
+
+def check_slos(report: dict[str, dict], slos: dict[str, dict[str, float]]) -> list[dict]:
+    checks = []
+    for endpoint, summary in report.items():
+        limits = {**slos.get("*", {}), **slos.get(endpoint, {})} if endpoint != "all" else slos.get("all", {})
+        for metric, limit in limits.items():
+            value = summary["rps"] if metric == "min_rps" else summary[metric]
+            passed = value >= limit if metric == "min_rps" else value <= limit
+            checks.append({"endpoint": endpoint, "metric": metric, "value": value, "limit": limit, "passed": passed})
+    return checks
+
+
+def load_images(count: int, seed: int) -> list[tuple[str, bytes, str]]:
+    corpus = generate_corpus(max(1, count // 12), ((720, 1600), (1080, 2400)), (0, 1), seed)
+    return [
+        (f"{shot.name}.{'png' if shot.noise == 0 else 'jpg'}", shot.data, "image/png" if shot.noise == 0 else "image/jpeg")
+        for shot in corpus
+    ]
+
+
+def seed_user() -> int:
+    """The load-test user's id, created if needed, through this process's DATABASE_URL"""
+    from sqlalchemy import select
+
+    from backend.db.session import SessionLocal
+    from backend.models.user import User
+
+    with SessionLocal() as db:
+        user = db.scalars(select(User).where(User.email == LOAD_TEST_EMAIL)).first()
+        if user is None:
+            user = User(email=LOAD_TEST_EMAIL, phone="+910000000000", password_hash="!", name="Load test")
+            db.add(user)
+            db.commit()
+        return user.id
+
+
+async def server_stats(client: httpx.AsyncClient) -> dict:
+    """Pool and cascade state after the run, for sizing; best effort"""
+    stats = {}
+    for name, path in (("db_pool", "/db-pool-stats"), ("cascade", "/api/v1/ocr/cascade-stats")):
+        try:
+            response = await client.get(path)
+            if response.status_code == 200:
+                stats[name] = response.json()
+        except httpx.HTTPError:
+            pass
+    return stats
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    slos = parse_slos(args.slo)
+    names, weights = list(mix), list(mix.values())
+
+    def choose() -> str:
+        return rng.choices(names, weights)[0]
+
+    user_id = seed_user() if args.seed_user else args.user_id
+    images = load_images(args.images, args.seed) if "extract" in mix else []
+    workload = Workload(user_id, images, args.repeat_ratio, rng)
+    results = Results()
+
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        try:
+            (await client.get("/")).raise_for_status()
+        except httpx.HTTPError as e:
+            raise ConnectionError(f"Cannot reach the backend at {args.base_url}: {e}") from e
+
+        logger.info(
+            "Load test against %s as user %s: %s for %ss (+%ss warm-up), mix %s",
+            args.base_url, user_id, f"{args.rate} req/s" if args.rate else f"{args.concurrency} clients",
+            args.duration, args.warmup, mix,
+        )
+        started = time.perf_counter()
+        measured_from = started + args.warmup
+        deadline = measured_from + args.duration
+
+        async def start_recording() -> None:
+            await asyncio.sleep(args.warmup)
+            results.recording = True
+
+        recorder = asyncio.create_task(start_recording())
+        if args.rate:
+            await open_loop(client, workload, results, choose, args.rate, args.max_in_flight, deadline, rng)
+        else:
+            await closed_loop(client, workload, results, choose, args.concurrency, deadline)
+        await recorder
+        elapsed = time.perf_counter() - measured_from
+        stats = await server_stats(client)
+
+    report = {endpoint: summarize(results.latencies[endpoint], results.errors[endpoint], elapsed) for endpoint in names}
+    every = [ms for endpoint in names for ms in results.latencies[endpoint]]
+    report["all"] = summarize(every, sum((results.errors[endpoint] for endpoint in names), Counter()), elapsed)
+    checks = check_slos(report, slos)
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "base_url": args.base_url,
+            "mode": "open" if args.rate else "closed",
+            "rate": args.rate,
+            "concurrency": None if args.rate else args.concurrency,
+            "duration": elapsed,
+            "mix": mix,
+            "repeat_ratio": args.repeat_ratio,
+        },
+        "endpoints": report,
+        "slo": checks,
+        "passed": all(check["passed"] for check in checks),
+        "server": stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--concurrency", type=int, default=16, help="closed loop: clients sending back to back")
+    load.add_argument("--rate", type=float, help="open loop: Poisson arrivals per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of load before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="endpoint=weight,... (extract, extract-and-save, expenses, payments, summary, search)")
+    parser.add_argument("--slo", action="append", default=[], help="endpoint.metric=limit, e.g. extract.p95_ms=2000 or all.min_rps=50")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--seed-user", action="store_true", help="create/use the load-test user via DATABASE_URL")
+    parser.add_argument("--images", type=int, default=24, help="distinct screenshots to upload")
+    parser.add_argument("--repeat-ratio", type=float, default=0.2, help="share of uploads repeating an earlier one")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per request, seconds")
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="open loop: arrivals beyond this count as errors")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write the report as JSON")
+    args = parser.parse_args()
+
+    try:
+        result = asyncio.run(run(args))
+    except (ConnectionError, ValueError) as e:
+        logger.error("❌ %s", e)
+        sys.exit(1)
+
+    for endpoint, summary in result["endpoints"].items():
+        logger.info(
+            "%-17s %6d req %8.1f req/s  p50 %7.1f ms  p95 %7.1f ms  p99 %7.1f ms  errors %5.1f%% %s",
+            endpoint, summary["requests"], summary["rps"], summary["p50_ms"], summary["p95_ms"], summary["p99_ms"],
+            summary["error_rate"] * 100, summary["errors"] or "",
+        )
+    for check in result["slo"]:
+        logger.log(
+            logging.INFO if check["passed"] else logging.WARNING, "%s %-17s %-10s %10.3f (limit %g)",
+            "PASS" if check["passed"] else "FAIL", check["endpoint"], check["metric"], check["value"], check["limit"],
+        )
+    if "db_pool" in result["server"]:
+        logger.info("Server DB pools: %s", result["server"]["db_pool"])
+
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        logger.info("Report written to %s", args.output)
+    if result["passed"]:
+        logger.info("✅ All SLOs met")
+    else:
+        logger.error("❌ SLOs missed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
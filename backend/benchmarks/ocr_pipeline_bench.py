@@ -0,0 +1,253 @@
+"""
+Per-stage throughput and field accuracy of the OCR path on synthetic screenshots
+
+    python -m backend.benchmarks.ocr_pipeline_bench [--output results.json] [--compare baseline.json]
+
+Times each stage of extract_expense_data's tesseract path on its own over
+the corpus from screenshots.py: decode (full-resolution load), preprocess
+(open + preprocess_image, as tesseract_text runs it), ocr (the warm
+tesseract engine on the preprocessed image) and parse. Accuracy is scored
+per field for the parser on perfect OCR text and, when tesseract is
+installed, end to end, broken down by resolution and noise level.
+
+--output writes the results as JSON (with the commit and corpus settings)
+and --compare reports the change against such a file; the exit status is 1
+when a stage slowed down by more than --max-regression. --preprocess
+overrides the deployment's preprocessing options, so two settings can be
+compared on the same corpus:
+
+    python -m backend.benchmarks.ocr_pipeline_bench --preprocess crop=true --output crop.json
+    python -m backend.benchmarks.ocr_pipeline_bench --preprocess crop=false --compare crop.json
+"""
+import argparse
+import dataclasses
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+import PIL
+
+from backend.benchmarks.screenshots import NOISE_LEVELS, RESOLUTIONS, Screenshot, generate_corpus
+from backend.services.ocr_engines import get_engine
+from backend.services.ocr_services import DEFAULT_PREPROCESS, PreprocessOptions, open_image, preprocess_image
+from backend.services.upi_parser import FIELDS, parse_transaction_text
+
+logger = logging.getLogger("ocr_pipeline_bench")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+TODAY = date(2025, 12, 31)  # after every generated date, so year-less dates resolve the same way each run
+SCORED_FIELDS = ("provider", *FIELDS)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def load_ocr_engine(probe):
+    """The warm tesseract engine, or None when neither tesserocr nor the binary is installed"""
+    try:
+        engine = get_engine("tesseract")
+        engine.image_to_data(probe)  # model load stays out of the timings
+        return engine
+    except Exception as e:
+        logger.warning("tesseract unavailable, skipping the ocr stage and end-to-end accuracy: %s", e)
+        return None
+
+
+def decode(shot: Screenshot):
+    image = open_image(shot.data)
+    image.load()
+    return image
+
+
+def preprocess_options(overrides: list[str]) -> PreprocessOptions:
+    """DEFAULT_PREPROCESS with name=value overrides, e.g. crop=false target_width=1000"""
+    changes = {}
+    for override in overrides:
+        name, _, value = override.partition("=")
+        current = getattr(DEFAULT_PREPROCESS, name)
+        if isinstance(current, bool):
+            changes[name] = value.lower() in ("1", "true", "yes", "on")
+        else:
+            changes[name] = type(current)(value)
+    return dataclasses.replace(DEFAULT_PREPROCESS, **changes)
+
+
+def time_stage(run, items: list, iterations: int) -> tuple[list, dict[int, float]]:
+    """Results of one pass, and total seconds spent per item (by index) over all passes"""
+    results = [None] * len(items)
+    seconds: dict[int, float] = defaultdict(float)
+    for _ in range(iterations):
+        for index, item in enumerate(items):
+            started = time.perf_counter()
+            results[index] = run(item)
+            seconds[index] += time.perf_counter() - started
+    return results, seconds
+
+
+def stage_summary(corpus: list[Screenshot], seconds: dict[int, float], iterations: int) -> dict:
+    """Images/sec overall and per resolution, and median ms per image"""
+    by_resolution: dict[str, list[float]] = defaultdict(list)
+    for index, shot in enumerate(corpus):
+        by_resolution[shot.resolution].append(seconds[index] / iterations)
+    per_image = sorted(value / iterations for value in seconds.values())
+    total = sum(per_image)
+    return {
+        "images_per_sec": len(per_image) / total if total else 0.0,
+        "median_ms": per_image[len(per_image) // 2] * 1000,
+        "by_resolution": {
+            resolution: len(values) / sum(values) if sum(values) else 0.0
+            for resolution, values in by_resolution.items()
+        },
+    }
+
+
+def score(corpus: list[Screenshot], parsed: list[dict], group_by=None) -> dict:
+    """Share of images with each field right, overall and optionally per group"""
+    def rates(indices: list[int]) -> dict[str, float]:
+        return {
+            field: sum(parsed[i].get(field) == corpus[i].expected[field] for i in indices) / len(indices)
+            for field in SCORED_FIELDS
+        }
+
+    result = {"fields": rates(list(range(len(corpus))))}
+    if group_by:
+        for name, key in group_by.items():
+            groups: dict[str, list[int]] = defaultdict(list)
+            for index, shot in enumerate(corpus):
+                groups[str(key(shot))].append(index)
+            result[f"by_{name}"] = {group: rates(indices) for group, indices in groups.items()}
+    return result
+
+
+def run_benchmark(args) -> dict:
+    resolutions = tuple(tuple(int(n) for n in value.split("x")) for value in args.resolutions)
+    started = time.perf_counter()
+    corpus = generate_corpus(args.per_provider, resolutions, tuple(args.noise), args.seed)
+    logger.info("Generated %d screenshots in %.1fs", len(corpus), time.perf_counter() - started)
+
+    options = preprocess_options(args.preprocess)
+
+    def preprocess(shot: Screenshot):
+        return preprocess_image(open_image(shot.data), options).image
+
+    def parse(text: str) -> dict:
+        return parse_transaction_text(text, today=TODAY)
+
+    stages = {}
+    _, seconds = time_stage(decode, corpus, args.iterations)
+    stages["decode"] = stage_summary(corpus, seconds, args.iterations)
+    prepared, seconds = time_stage(preprocess, corpus, args.iterations)
+    stages["preprocess"] = stage_summary(corpus, seconds, args.iterations)
+
+    perfect, seconds = time_stage(parse, [shot.text for shot in corpus], args.iterations)
+    accuracy = {"parse": score(corpus, perfect)}
+
+    engine = load_ocr_engine(prepared[0])
+    if engine is not None:
+        reads, ocr_seconds = time_stage(engine.image_to_data, prepared, args.iterations)
+        stages["ocr"] = stage_summary(corpus, ocr_seconds, args.iterations)
+        # Parse timing on real OCR output; perfect text is shorter and cleaner
+        end_to_end, seconds = time_stage(parse, [text for text, _ in reads], args.iterations)
+        accuracy["end_to_end"] = score(
+            corpus, end_to_end, {"resolution": lambda shot: shot.resolution, "noise": lambda shot: shot.noise},
+        )
+    stages["parse"] = stage_summary(corpus, seconds, args.iterations)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pillow": PIL.__version__,
+            "ocr_engine": type(engine).__name__ if engine is not None else None,
+            "preprocess": vars(options),
+            "corpus": {
+                "images": len(corpus), "per_provider": args.per_provider, "seed": args.seed,
+                "resolutions": args.resolutions, "noise": args.noise,
+            },
+            "iterations": args.iterations,
+        },
+        "stages": stages,
+        "accuracy": accuracy,
+    }
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> bool:
+    """Log the change per stage and field against a baseline; False if a stage regressed too far"""
+    logger.info("Against %s (%s)", baseline["meta"].get("commit"), baseline["meta"].get("timestamp"))
+    for setting in ("corpus", "preprocess", "ocr_engine", "platform"):
+        if results["meta"][setting] != baseline["meta"].get(setting):
+            logger.warning("%s differs from the baseline's; the numbers aren't like for like", setting)
+    ok = True
+    for stage, summary in results["stages"].items():
+        before = baseline["stages"].get(stage)
+        if not before or not before["images_per_sec"]:
+            continue
+        change = summary["images_per_sec"] / before["images_per_sec"] - 1
+        regressed = change < -max_regression
+        ok = ok and not regressed
+        logger.log(
+            logging.WARNING if regressed else logging.INFO, "%-10s %+6.1f%% images/sec%s",
+            stage, change * 100, "  REGRESSION" if regressed else "",
+        )
+    for kind, scores in results["accuracy"].items():
+        before = baseline["accuracy"].get(kind)
+        if before:
+            logger.info("%-10s accuracy change %s", kind, {
+                field: f"{(scores['fields'][field] - before['fields'][field]) * 100:+.0f}pt" for field in SCORED_FIELDS
+            })
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--per-provider", type=int, default=2, help="transactions drawn per app")
+    parser.add_argument("--resolutions", nargs="+", default=[f"{w}x{h}" for w, h in RESOLUTIONS])
+    parser.add_argument("--noise", nargs="+", type=int, default=list(NOISE_LEVELS), help="noise levels (0-2)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=3, help="timed passes over the corpus per stage")
+    parser.add_argument("--preprocess", nargs="+", default=[], metavar="NAME=VALUE",
+                        help="override a PreprocessOptions field, e.g. crop=true")
+    parser.add_argument("--output", type=Path, help="write results as JSON")
+    parser.add_argument("--compare", type=Path, help="earlier --output file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10, help="tolerated images/sec drop per stage")
+    args = parser.parse_args()
+
+    results = run_benchmark(args)
+    for stage, summary in results["stages"].items():
+        logger.info(
+            "%-10s %8.1f images/sec  median %7.2f ms  by resolution %s",
+            stage, summary["images_per_sec"], summary["median_ms"],
+            {resolution: round(rate, 1) for resolution, rate in summary["by_resolution"].items()},
+        )
+    for kind, scores in results["accuracy"].items():
+        logger.info("%-10s accuracy %s", kind, {field: f"{rate:.0%}" for field, rate in scores["fields"].items()})
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        logger.info("Results written to %s", args.output)
+    if args.compare:
+        if not compare(results, json.loads(args.compare.read_text(encoding="utf-8")), args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Accuracy and throughput of the UPI text parser on the fixture corpus
+
+    python -m backend.benchmarks.parser_bench [--seconds S]
+
+Reports per-field accuracy against backend/benchmarks/fixtures/upi_text.json
+and parses/sec for the provider-aware parser next to the old label regexes.
+"""
+import argparse
+import json
+import logging
+import re
+import time
+from datetime import date
+from pathlib import Path
+
+from backend.services.upi_parser import FIELDS, parse_transaction_text
+
+logger = logging.getLogger("parser_bench")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+CORPUS_PATH = Path(__file__).parent / "fixtures" / "upi_text.json"
+
+
+def legacy_parse(text: str) -> dict:
+    """The four label regexes extract_expense_data used before the parser module"""
+    vendor = re.search(r'Vendor Name:\s*(.*)', text)
+    amount = re.search(r'Amount:\s*([\d.,]+)', text)
+    txn_id = re.search(r'Transaction ID:\s*(.*)', text)
+    txn_date = re.search(r'Date of Transaction:\s*(.*)', text)
+    return {
+        "vendor": vendor.group(1).strip() if vendor else None,
+        "amount": amount.group(1).strip() if amount else None,
+        "id": txn_id.group(1).strip() if txn_id else None,
+        "date": txn_date.group(1).strip() if txn_date else None,
+    }
+
+
+def throughput(parse, texts: list[str], seconds: float) -> float:
+    parses = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for text in texts:
+            parse(text)
+        parses += len(texts)
+    return parses / (time.perf_counter() - started)
+
+
+def accuracy(parse, corpus: list[dict]) -> dict[str, float]:
+    correct = {field: 0 for field in FIELDS}
+    for case in corpus:
+        result = parse(case["text"])
+        for field in FIELDS:
+            correct[field] += result.get(field) == case["expected"][field]
+    return {field: correct[field] / len(corpus) for field in FIELDS}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0, help="time budget per parser")
+    args = parser.parse_args()
+
+    corpus = json.loads(CORPUS_PATH.read_text(encoding="utf-8"))
+    texts = [case["text"] for case in corpus]
+    today = date(2025, 12, 31)
+
+    def provider_parse(text: str) -> dict:
+        return parse_transaction_text(text, today=today)
+
+    for name, parse in (("legacy", legacy_parse), ("provider", provider_parse)):
+        scores = accuracy(parse, corpus)
+        rate = throughput(parse, texts, args.seconds)
+        logger.info(
+            "%-8s %9.0f parses/sec  accuracy %s",
+            name, rate, {field: f"{score:.0%}" for field, score in scores.items()},
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Before/after latency of the OCR preprocessing stage
+
+    python -m backend.benchmarks.preprocess_bench [--iterations N] [image ...]
+
+Without image arguments a synthetic 1080x2400 UPI screenshot is used. When
+the tesseract binary is not installed only decode/preprocess time is measured.
+"""
+import argparse
+import io
+import logging
+import statistics
+import time
+
+import pytesseract
+from PIL import Image, ImageDraw, ImageFont
+
+from backend.services.ocr_services import PreprocessOptions, open_image, preprocess_image
+
+logger = logging.getLogger("preprocess_bench")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def synthetic_screenshot(width: int = 1080, height: int = 2400) -> bytes:
+    """Render a GPay-like success screen as a JPEG"""
+    image = Image.new("RGB", (width, height), (246, 248, 252))
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=width // 22)
+    big = ImageFont.load_default(size=width // 10)
+    lines = [
+        (0.12, "Paid to", font),
+        (0.16, "Sharma General Store", font),
+        (0.24, "Rs 1,250.00", big),
+        (0.34, "Completed", font),
+        (0.40, "12 Oct 2025, 7:42 pm", font),
+        (0.50, "UPI transaction ID", font),
+        (0.54, "528412937710", font),
+        (0.62, "To: sharmastore@okaxis", font),
+        (0.66, "From: HDFC Bank 4421", font),
+    ]
+    for y, text, text_font in lines:
+        draw.text((width * 0.08, height * y), text, fill=(20, 20, 20), font=text_font)
+    draw.rectangle((0, height * 0.88, width, height), fill=(26, 115, 232))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def tesseract_available() -> bool:
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def time_pipeline(data: bytes, options: PreprocessOptions | None, run_ocr: bool) -> float:
+    started = time.perf_counter()
+    image = open_image(data)
+    if options is None:
+        image.load()
+    else:
+        image = preprocess_image(image, options).image
+    if run_ocr:
+        pytesseract.image_to_string(image)
+    return (time.perf_counter() - started) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("images", nargs="*", help="screenshot files (default: synthetic)")
+    parser.add_argument("--iterations", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = [open(path, "rb").read() for path in args.images] or [synthetic_screenshot()]
+    run_ocr = tesseract_available()
+    if not run_ocr:
+        logger.warning("tesseract not found; measuring decode + preprocessing only")
+
+    options = PreprocessOptions()
+    before = [time_pipeline(d, None, run_ocr) for d in corpus for _ in range(args.iterations)]
+    after = [time_pipeline(d, options, run_ocr) for d in corpus for _ in range(args.iterations)]
+
+    prepared = preprocess_image(open_image(corpus[0]), options)
+    logger.info("pixels: %s -> %s", open_image(corpus[0]).size, prepared.image.size)
+    logger.info("per-step ms: %s", {k: round(v, 2) for k, v in prepared.timings.items()})
+    logger.info("baseline   median %.1f ms", statistics.median(before))
+    logger.info("preprocess median %.1f ms", statistics.median(after))
+    logger.info("speedup x%.2f", statistics.median(before) / statistics.median(after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+Synthetic GPay / PhonePe / Paytm success screens with known ground truth
+
+    python -m backend.benchmarks.screenshots DIR [--per-provider N] [--seed S]
+
+Each screen is rendered with PIL from randomly drawn (but seeded, so
+reproducible) transaction fields, at several phone resolutions and noise
+levels. The lines drawn are exactly what a perfect OCR read would return,
+so the parser can be measured without tesseract too. From the command line
+the corpus is written to DIR as images plus a manifest.json.
+"""
+import argparse
+import io
+import json
+import logging
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+logger = logging.getLogger("screenshots")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+PROVIDERS = ("gpay", "phonepe", "paytm")
+RESOLUTIONS = ((720, 1600), (1080, 2400), (1440, 3200))
+# 0: lossless capture, 1: re-shared JPEG, 2: blurred, noisy, heavily compressed
+NOISE_LEVELS = (0, 1, 2)
+
+VENDORS = (
+    "Sharma General Store", "Annapurna Tiffins", "R K Motors", "Metro Cash and Carry", "Green Valley Pharmacy",
+    "Chai Point", "DMart Ready", "Zomato Ltd", "Indian Oil Petrol Pump", "Ramesh Tea Stall", "Anil Kumar",
+    "Sri Balaji Medicals", "Cafe Coffee Day", "Bharat Electricals", "Priya Sweets",
+)
+BANKS = ("HDFC Bank", "State Bank of India", "ICICI Bank", "Axis Bank", "Kotak Mahindra Bank")
+
+# The default font has no rupee glyph; "Rs" is also what the apps fall back to
+CURRENCY = {"gpay": "Rs ", "phonepe": "Rs ", "paytm": "Rs."}
+BACKGROUND = (246, 248, 252)
+INK = (20, 20, 20)
+BRAND = {"gpay": (26, 115, 232), "phonepe": (95, 37, 159), "paytm": (0, 186, 242)}
+
+
+@dataclass
+class Screenshot:
+    name: str
+    provider: str
+    size: tuple[int, int]
+    noise: int
+    data: bytes
+    text: str  # the lines drawn, i.e. a perfect OCR read
+    expected: dict = field(default_factory=dict)
+
+    @property
+    def resolution(self) -> str:
+        return f"{self.size[0]}x{self.size[1]}"
+
+
+def indian_grouping(amount: float) -> str:
+    """1234567.5 -> '12,34,567.50' (lakh/crore grouping, as the apps print it)"""
+    rupees, paise = f"{amount:.2f}".split(".")
+    head, tail = rupees[:-3], rupees[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    return ",".join(groups + [tail]) + "." + paise
+
+
+def random_transaction(rng: random.Random) -> dict:
+    amount = rng.choice((rng.randint(10, 999), rng.randint(1000, 20000), rng.randint(20000, 250000)))
+    if rng.random() < 0.3:
+        amount += rng.randint(1, 99) / 100
+    when = date(2025, 1, 1) + timedelta(days=rng.randrange(360))
+    hour, minute = rng.randint(1, 12), rng.randint(0, 59)
+    return {
+        "vendor": rng.choice(VENDORS),
+        "amount": float(amount),
+        "date": when,
+        "time": f"{hour}:{minute:02d} {rng.choice(('am', 'pm'))}",
+        "ref": str(rng.randint(10**11, 10**12 - 1)),
+        "phonepe_id": "T" + when.strftime("%y%m%d") + "".join(rng.choice("0123456789") for _ in range(16)),
+        "bank": rng.choice(BANKS),
+        "last4": f"{rng.randint(0, 9999):04d}",
+        "grouped": rng.random() < 0.7,  # some receipts print "₹1500" rather than "₹1,500"
+    }
+
+
+def screen_lines(provider: str, txn: dict) -> list[tuple[str, str]]:
+    """(style, text) per line, top to bottom; styles: body, amount, header"""
+    digits = indian_grouping(txn["amount"]) if txn["grouped"] else f"{txn['amount']:.2f}"
+    amount = CURRENCY[provider] + digits.removesuffix(".00")
+    day = txn["date"].strftime("%d %b %Y")
+    if provider == "gpay":
+        return [
+            ("body", "Paid to"), ("body", txn["vendor"]), ("amount", amount), ("body", "Completed"),
+            ("body", f"{day}, {txn['time']}"), ("body", "UPI transaction ID"), ("body", txn["ref"]),
+            ("body", f"To: {txn['vendor'].upper()}"), ("body", f"From: {txn['bank']} {txn['last4']}"),
+            ("body", "Google Pay"),
+        ]
+    if provider == "phonepe":
+        return [
+            ("header", "Transaction Successful"), ("body", f"{txn['time']} on {day}"), ("body", "Paid to"),
+            ("body", txn["vendor"]), ("amount", amount), ("body", "Transaction ID"), ("body", txn["phonepe_id"]),
+            ("body", "Debited from"), ("body", f"XXXXXX{txn['last4']}"), ("body", f"UTR: {txn['ref']}"),
+            ("body", "Powered by PhonePe"),
+        ]
+    return [
+        ("header", "paytm"), ("body", "Paid Successfully to"), ("body", txn["vendor"]), ("amount", amount),
+        ("body", f"UPI Ref No: {txn['ref']}"), ("body", f"{day}, {txn['time'].upper()}"),
+        ("body", f"From: {txn['bank']}"),
+    ]
+
+
+def expected_fields(provider: str, txn: dict) -> dict:
+    return {
+        "provider": provider,
+        "vendor": txn["vendor"],
+        "amount": f"{txn['amount']:.2f}",
+        "id": txn["ref"],  # PhonePe prints both; the parser prefers the UTR
+        "date": txn["date"].isoformat(),
+    }
+
+
+def render(provider: str, lines: list[tuple[str, str]], size: tuple[int, int]) -> Image.Image:
+    """Draw the lines inside the region preprocessing crops to (10%-75% of the height)"""
+    width, height = size
+    image = Image.new("RGB", size, BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    fonts = {
+        "body": ImageFont.load_default(size=width // 22),
+        "header": ImageFont.load_default(size=width // 18),
+        "amount": ImageFont.load_default(size=width // 10),
+    }
+    header_height = int(height * 0.09)
+    draw.rectangle((0, 0, width, header_height), fill=BRAND[provider])
+    y = height * 0.10
+    step = height * 0.65 / (len(lines) + 2)
+    for style, text in lines:
+        draw.text((width * 0.08, y), text, fill=INK, font=fonts[style])
+        y += step * (2 if style == "amount" else 1)
+    draw.rectangle((0, int(height * 0.88), width, height), fill=BRAND[provider])
+    return image
+
+
+def degrade(image: Image.Image, noise: int, rng: random.Random) -> bytes:
+    """Encode the screen as it might arrive: PNG when clean, JPEG with blur and sensor-like noise otherwise"""
+    buffer = io.BytesIO()
+    if noise == 0:
+        image.save(buffer, "PNG")
+        return buffer.getvalue()
+    if noise >= 2:
+        image = image.filter(ImageFilter.GaussianBlur(radius=image.width / 900))
+    grain = Image.effect_noise(image.size, 12 * noise).convert("RGB")
+    image = Image.blend(image, grain, 0.06 * noise)
+    quality = 80 if noise == 1 else 55
+    image.save(buffer, "JPEG", quality=quality + rng.randint(-5, 5))
+    return buffer.getvalue()
+
+
+def generate_corpus(
+    per_provider: int = 2,
+    resolutions: tuple[tuple[int, int], ...] = RESOLUTIONS,
+    noise_levels: tuple[int, ...] = NOISE_LEVELS,
+    seed: int = 0,
+) -> list[Screenshot]:
+    """Every drawn transaction at every resolution and noise level"""
+    rng = random.Random(seed)
+    corpus = []
+    for provider in PROVIDERS:
+        for index in range(per_provider):
+            txn = random_transaction(rng)
+            lines = screen_lines(provider, txn)
+            text = "\n".join(line for _, line in lines)
+            for size in resolutions:
+                image = render(provider, lines, size)
+                for noise in noise_levels:
+                    corpus.append(Screenshot(
+                        name=f"{provider}_{index}_{size[0]}x{size[1]}_n{noise}",
+                        provider=provider,
+                        size=size,
+                        noise=noise,
+                        data=degrade(image, noise, rng),
+                        text=text,
+                        expected=expected_fields(provider, txn),
+                    ))
+    return corpus
+
+
+def write_corpus(corpus: list[Screenshot], directory: Path) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = []
+    for shot in corpus:
+        filename = shot.name + (".png" if shot.noise == 0 else ".jpg")
+        (directory / filename).write_bytes(shot.data)
+        manifest.append({
+            "file": filename, "provider": shot.provider, "resolution": shot.resolution,
+            "noise": shot.noise, "text": shot.text, "expected": shot.expected,
+        })
+    (directory / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--per-provider", type=int, default=2, help="transactions drawn per app")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = generate_corpus(args.per_provider, seed=args.seed)
+    write_corpus(corpus, args.directory)
+    logger.info("Wrote %d screenshots to %s", len(corpus), args.directory)
+
+
+if __name__ == "__main__":
+    main()
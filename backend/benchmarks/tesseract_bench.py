@@ -0,0 +1,75 @@
+"""
+Per-image OCR latency: warm tesserocr API vs a pytesseract subprocess
+
+    python -m backend.benchmarks.tesseract_bench [--iterations N] [image ...]
+
+Without image arguments the synthetic screenshot from preprocess_bench is
+used. Images are preprocessed once up front so only the engine is timed.
+Engines that can't be loaded here (no tesserocr wheel, no tesseract binary)
+are reported and skipped.
+"""
+import argparse
+import logging
+import statistics
+import time
+
+from backend.benchmarks.preprocess_bench import synthetic_screenshot
+from backend.services.ocr_engines import PytesseractEngine, TesserocrEngine
+from backend.services.ocr_services import DEFAULT_PREPROCESS, open_image, preprocess_image
+
+logger = logging.getLogger("tesseract_bench")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+ENGINES = {"tesserocr": TesserocrEngine, "pytesseract": PytesseractEngine}
+
+
+def time_engine(factory, images: list, iterations: int) -> dict | None:
+    try:
+        started = time.perf_counter()
+        engine = factory()
+        engine.image_to_data(images[0])  # first call includes model load for both
+        first_ms = (time.perf_counter() - started) * 1000
+    except Exception as e:
+        logger.warning("%s unavailable: %s", factory.name, e)
+        return None
+
+    samples = []
+    for _ in range(iterations):
+        for image in images:
+            started = time.perf_counter()
+            engine.image_to_data(image)
+            samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "first_ms": first_ms,
+        "median_ms": statistics.median(samples),
+        "p95_ms": statistics.quantiles(samples, n=20)[-1] if len(samples) >= 2 else samples[0],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("images", nargs="*", help="screenshot files (default: synthetic)")
+    parser.add_argument("--iterations", type=int, default=10)
+    args = parser.parse_args()
+
+    corpus = [open(path, "rb").read() for path in args.images] or [synthetic_screenshot()]
+    images = [preprocess_image(open_image(data), DEFAULT_PREPROCESS).image for data in corpus]
+
+    results = {name: time_engine(factory, images, args.iterations) for name, factory in ENGINES.items()}
+    for name, result in results.items():
+        if result:
+            logger.info(
+                "%-11s first %.1f ms, median %.1f ms, p95 %.1f ms",
+                name, result["first_ms"], result["median_ms"], result["p95_ms"],
+            )
+    if results["tesserocr"] and results["pytesseract"]:
+        logger.info("speedup x%.2f", results["pytesseract"]["median_ms"] / results["tesserocr"]["median_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+from backend.db.session import SessionLocal, engine
+from backend.services.raw_text_services import prune_raw_texts, store_raw_texts
+from backend.models.raw_texts import RawText
+from sqlalchemy import inspect, text
+import argparse
+import logging
+
+logger = logging.getLogger("compact_raw_text")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+BATCH_SIZE = 1000
+TABLES = ("expenses", "payments")
+
+
+def migrate_table(db, table: str) -> int:
+    """Move a table's inline `raw_text` column into raw_texts, then drop it; returns rows moved"""
+    columns = {column["name"] for column in inspect(db.get_bind()).get_columns(table)}
+    if "raw_text" not in columns:
+        return 0
+    if "raw_text_digest" not in columns:
+        db.execute(text(f"ALTER TABLE {table} ADD COLUMN raw_text_digest VARCHAR(64) REFERENCES raw_texts (digest)"))
+        db.commit()
+
+    moved = 0
+    last_id = 0
+    # Keyset batches, committed one at a time, as in normalize_vendors
+    while rows := db.execute(
+        text(f"SELECT id, raw_text FROM {table} WHERE id > :last_id AND raw_text_digest IS NULL ORDER BY id LIMIT :limit"),
+        {"last_id": last_id, "limit": BATCH_SIZE},
+    ).all():
+        last_id = rows[-1].id
+        digests = store_raw_texts(db, [row.raw_text for row in rows])
+        changes = [{"id": row.id, "digest": digest} for row, digest in zip(rows, digests) if digest]
+        if changes:
+            db.execute(text(f"UPDATE {table} SET raw_text_digest = :digest WHERE id = :id"), changes)
+        db.commit()
+        moved += len(rows)
+
+    db.execute(text(f"ALTER TABLE {table} DROP COLUMN raw_text"))
+    db.commit()
+    return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move inline raw OCR text into the compressed raw_texts table")
+    parser.add_argument("--prune", action="store_true", help="also delete texts nothing refers to")
+    args = parser.parse_args()
+
+    RawText.__table__.create(engine, checkfirst=True)
+    with SessionLocal() as db:
+        for table in TABLES:
+            moved = migrate_table(db, table)
+            if moved:
+                logger.info("✅ %s: moved raw_text of %d row(s)", table, moved)
+        if args.prune:
+            logger.info("✅ Pruned %d unreferenced text(s)", prune_raw_texts(db))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,76 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-class Settings(BaseSettings):
+class OCRSettings(BaseSettings):
+    """OCR pipeline, result cache and Gemini tuning, and the services that
+    post-process and store extracted transactions (merchants, categories, raw text)
+
+    Every field has a default, so benchmarks and the OCR pool's worker
+    processes can load these without the database and JWT settings.
+    """
+
+    # Result cache (ocr_services.OCRResultCache); a SQLite path shares it across workers, empty = memory only
+    ocr_cache_max_entries: int = 1024
+    ocr_cache_ttl_seconds: float = 86400.0
+    ocr_cache_path: Optional[str] = None
+
+    # Image preprocessing ahead of tesseract (ocr_services.PreprocessOptions)
+    ocr_preprocess: bool = True
+    ocr_preprocess_draft: bool = True
+    ocr_preprocess_crop: bool = False  # one fixed box for every image; only for single-app deployments
+    ocr_preprocess_crop_region: str = "default"
+    ocr_preprocess_grayscale: bool = True
+    ocr_preprocess_downscale: bool = True
+    ocr_preprocess_target_width: int = 800
+    ocr_preprocess_binarize: bool = False
+    ocr_preprocess_binarize_threshold: int = 160
+
+    # Cascade: tesseract first, Gemini only for reads that can't be trusted
+    ocr_cascade: bool = True
+    ocr_cascade_min_confidence: float = 70.0
+    ocr_cascade_required_fields: str = "amount,date,id"  # comma-separated
+
+    # tesseract binding (ocr_engines.load_tesseract): auto (tesserocr if installed), tesserocr or pytesseract
+    ocr_tesseract_backend: str = "auto"
+    ocr_tesseract_lang: str = "eng"
+
+    # Gemini client (gemini_client.GeminiClient)
+    gemini_model: str = "gemini-2.5-flash"
+    gemini_backend: str = "genai"  # genai | stub
+    gemini_max_concurrency: int = 8
+    gemini_rate_per_second: float = 5.0
+    gemini_burst: int = 10
+    gemini_timeout: float = 15.0
+    gemini_hedge_after: float = 3.0  # 0 disables hedging
+    # GEMINI_BACKEND=stub plays back the fixture's replies (or the one text) after the latency
+    gemini_stub_fixture: Optional[str] = None
+    gemini_stub_text: str = "{}"
+    gemini_stub_latency: float = 0.0
+
+    # Merchant normalisation and search (vendor_services); thresholds are trigram similarity, 0-1
+    vendor_match_threshold: float = 0.6
+    vendor_search_threshold: float = 0.5
+    vendor_cache_users: int = 1024
+    vendor_cache_ttl_seconds: float = 300.0  # merchants other processes create are picked up after this
+
+    # Categorisation (categorizer, category_services)
+    category_dictionary_path: Optional[str] = None  # JSON {category: [keywords]}; replaces the default
+    category_override_ttl: float = 60.0  # seconds a user's cached overrides are trusted
+
+    # Raw OCR text compression (raw_text_services): auto (zstd if installed, else zlib), zstd or zlib
+    raw_text_codec: str = "auto"
+
+    @property
+    def cascade_required_fields(self) -> tuple[str, ...]:
+        return tuple(name.strip() for name in self.ocr_cascade_required_fields.split(",") if name.strip())
+
+    class Config:
+        env_file = ".env"
+        case_sensitive = False
+        extra = "ignore"  # .env also holds settings read elsewhere
+
+
+class Settings(OCRSettings):
     """Application settings"""
     
     # Database settings
@@ -17,6 +86,23 @@ class Settings(BaseSettings):
     database_name: str
     database_user: str
     database_password: str
+
+    # Connection pool settings (sync and async engines each get a pool this size,
+    # so one process can hold up to 2 * (db_pool_size + db_max_overflow) connections)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800  # seconds; keep below the server's / proxy's idle timeout, -1 disables
+    # A SELECT 1 round trip on every checkout, in exchange for never handing out a
+    # connection the server already closed; with a recycle below the idle timeout
+    # and a stable network it can be turned off
+    db_pool_pre_ping: bool = True
+    db_pool_slow_checkout: float = 0.1  # log checkouts that wait longer than this (seconds)
+    db_echo: bool = False  # log every SQL statement
+    db_statement_cache_size: int = 500  # compiled statements cached per engine
+    db_prepared_statement_cache_size: int = 100  # per asyncpg connection; 0 behind pgbouncer in transaction mode
+    # Sync sessions: expire loaded objects on commit (each is reloaded on next access)
+    db_expire_on_commit: bool = False
     
     # JWT settings
     secret_key: str
@@ -25,12 +111,50 @@ class Settings(BaseSettings):
     
     # App settings
     app_name: str = "Dipex"
-    debug: bool = True
+    debug: bool = False
+
+    # OCR execution settings
+    ocr_pool_size: int = 2
+    ocr_queue_depth: int = 8
+    ocr_job_timeout: float = 30.0
+    ocr_retry_after: int = 5
+    max_upload_bytes: int = 10 * 1024 * 1024
+    ocr_batch_concurrency: int = 4
+    ocr_batch_max_files: int = 50
+    # Comma-separated engines loaded at startup instead of on first use
+    ocr_warmup_engines: str = "gemini"
+    ocr_pool_warmup_engines: str = "tesseract"
+
+    # OCR job queue settings
+    ocr_job_max_attempts: int = 3
+    ocr_job_visibility_timeout: float = 120.0
+    ocr_job_retry_backoff: float = 5.0
+    ocr_job_poll_interval: float = 1.0
+
+    # Idempotency-Key settings
+    idempotency_ttl: float = 86400.0  # how long a stored response is replayed
+    idempotency_lease: float = 120.0  # how long an unfinished request holds its key
+
+    # Metrics settings
+    metrics_timing_headers: bool = False  # add a Server-Timing header to every response
+
+    # Export settings
+    export_chunk_size: int = 1000
     
     class Config:
         env_file = ".env"
         case_sensitive = False
+        extra = "ignore"
+
+
+# Create settings instances
+ocr_settings = OCRSettings()
 
 
-# Create settings instance
-settings = Settings()
+def __getattr__(name: str):
+    # `settings` is built on first import of it, so modules that only need
+    # ocr_settings don't require the database and JWT variables
+    if name == "settings":
+        value = globals()["settings"] = Settings()
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,163 @@
+"""In-process metrics rendered in the Prometheus text exposition format
+
+Histograms and counters are plain objects guarded by a lock; gauges are
+callbacks read at scrape time (pool sizes, queue depth). Stage timings
+observed while a request is being handled are also collected per request,
+so the middleware can echo them back as a Server-Timing header.
+"""
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Iterable
+
+# Seconds; spans a cache hit through a slow LLM call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label_names: Iterable[str] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = buckets
+        # label values -> (per-bucket counts incl. +Inf, sum, count)
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in self._series.items():
+                cumulative = 0
+                for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                    cumulative += bucket_count
+                    le = 'le="%s"' % (bound if bound == "+Inf" else repr(float(bound)))
+                    lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class Gauge:
+    """Read at scrape time from `collect`, which returns (label values, value) pairs"""
+
+    def __init__(self, name: str, help: str, label_names: Iterable[str], collect: Callable[[], Iterable[tuple[tuple[str, ...], float]]]):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.collect = collect
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for key, value in self.collect():
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list[Counter | Histogram | Gauge] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.register(Counter(
+    "dipex_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"),
+))
+http_request_duration = registry.register(Histogram(
+    "dipex_http_request_duration_seconds", "HTTP request latency", ("method", "route"),
+))
+stage_duration = registry.register(Histogram(
+    "dipex_stage_duration_seconds", "Time spent per request stage", ("stage", "engine"),
+))
+ocr_extractions = registry.register(Counter(
+    "dipex_ocr_extractions_total", "OCR extractions by outcome", ("outcome",),
+))
+gemini_calls = registry.register(Counter(
+    "dipex_gemini_calls_total", "Gemini extraction calls by outcome", ("outcome",),
+))
+gemini_tokens = registry.register(Counter(
+    "dipex_gemini_tokens_total", "Gemini tokens used", ("kind",),
+))
+db_pool_checkout = registry.register(Histogram(
+    "dipex_db_pool_checkout_seconds", "Time spent waiting for a pooled DB connection", ("engine",),
+))
+db_pool_timeouts = registry.register(Counter(
+    "dipex_db_pool_timeouts_total", "DB connection checkouts that gave up after pool_timeout", ("engine",),
+))
+
+# Stage timings for the request being handled (set by the metrics middleware)
+request_stages: ContextVar[list[tuple[str, str, float]] | None] = ContextVar("request_stages", default=None)
+
+
+def observe_stage(stage: str, seconds: float, engine: str = "") -> None:
+    stage_duration.observe(seconds, stage=stage, engine=engine)
+    stages = request_stages.get()
+    if stages is not None:
+        stages.append((stage, engine, seconds))
+
+
+def server_timing(stages: list[tuple[str, str, float]], total: float) -> str:
+    """Server-Timing header value; repeated stages (e.g. batch items) are summed"""
+    durations: dict[tuple[str, str], float] = {}
+    for stage, engine, seconds in stages:
+        durations[(stage, engine)] = durations.get((stage, engine), 0.0) + seconds
+    entries = [
+        f'{stage};desc="{engine}";dur={seconds * 1000:.1f}' if engine else f"{stage};dur={seconds * 1000:.1f}"
+        for (stage, engine), seconds in durations.items()
+    ]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
@@ -3,5 +3,11 @@ from sqlalchemy.ext.declarative import declarative_base
 Base = declarative_base()
 
 from ..models.user import User
+from ..models.raw_texts import RawText
 from ..models.expenses import Expense
 from ..models.payments import Payment
+from ..models.ocr_jobs import OCRJob
+from ..models.expense_rollups import ExpenseRollup
+from ..models.category_overrides import CategoryOverride
+from ..models.category_dictionary import CategoryDictionary
+from ..models.idempotency_keys import IdempotencyKey
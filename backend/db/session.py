@@ -1,18 +1,205 @@
+import logging
+import threading
+import time
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from .base import Base
 from ..core.config import settings
+from ..core.metrics import db_pool_checkout, db_pool_timeouts
+
+logger = logging.getLogger("db_session")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# At most one slow-checkout warning per pool this often, however saturated it is
+SLOW_CHECKOUT_LOG_INTERVAL = 10.0
+
+# Async drivers for each sync URL scheme we accept in DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str) -> str:
+    """Map DATABASE_URL onto its asyncio driver (asyncpg / aiosqlite)"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+class CheckoutStats:
+    """How long checkouts from one pool waited for a connection, and how full the pool got"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.checkouts = 0
+        self.waited = 0  # checkouts that found every connection in use
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.peak_checked_out = 0
+        self._last_warning = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, exhausted: bool, checked_out: int, capacity: int | None) -> None:
+        db_pool_checkout.observe(seconds, engine=self.name)
+        with self._lock:
+            self.checkouts += 1
+            self.waited += exhausted
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            warn = seconds >= settings.db_pool_slow_checkout and time.monotonic() - self._last_warning >= SLOW_CHECKOUT_LOG_INTERVAL
+            if warn:
+                self._last_warning = time.monotonic()
+        if warn:
+            logger.warning(
+                "Waited %.0fms for a %s DB connection (%d/%s checked out); pool may be undersized for this process",
+                seconds * 1000, self.name, checked_out, capacity if capacity is not None else "unbounded",
+            )
+
+    def timed_out(self) -> None:
+        db_pool_timeouts.inc(engine=self.name)
+        with self._lock:
+            self.timeouts += 1
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "waited": self.waited,
+                "timeouts": self.timeouts,
+                "mean_wait_ms": self.wait_seconds / self.checkouts * 1000 if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait_seconds * 1000,
+                "peak_checked_out": self.peak_checked_out,
+            }
+
+
+checkout_stats = {name: CheckoutStats(name) for name in ("sync", "async")}
+
+
+def pool_capacity(pool) -> int | None:
+    """Most connections a QueuePool will open; None when overflow is unlimited"""
+    return pool.size() + pool._max_overflow if pool._max_overflow >= 0 else None
+
+
+class TimedCheckout:
+    """QueuePool mixin recording how long each checkout waits in CheckoutStats
+
+    A pool that is often `waited` or near `peak_checked_out == capacity` is
+    too small for the concurrency of its process.
+    """
+
+    stats: CheckoutStats
+
+    def _do_get(self):
+        capacity = pool_capacity(self)
+        exhausted = capacity is not None and self.checkedout() >= capacity
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            self.stats.timed_out()
+            raise
+        self.stats.record(time.perf_counter() - started, exhausted, self.checkedout(), capacity)
+        return connection
+
+
+class TimedQueuePool(TimedCheckout, QueuePool):
+    stats = checkout_stats["sync"]
+
+
+class TimedAsyncAdaptedQueuePool(TimedCheckout, AsyncAdaptedQueuePool):
+    stats = checkout_stats["async"]
+
+
+def pool_options(url: str, poolclass: type) -> dict:
+    """Pool class, sizing and connection lifetime from settings
+
+    In-memory SQLite keeps its single-connection pool; file SQLite gets a
+    queue pool like Postgres.
+    """
+    parsed = make_url(url)
+    options = {"pool_pre_ping": settings.db_pool_pre_ping, "pool_recycle": settings.db_pool_recycle}
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return options
+    return {
+        **options,
+        "poolclass": poolclass,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+    }
+
+
+def async_connect_args(url: str) -> dict:
+    """asyncpg keeps its own prepared-statement cache per connection"""
+    if make_url(url).drivername == "postgresql+asyncpg":
+        return {"prepared_statement_cache_size": settings.db_prepared_statement_cache_size}
+    return {}
+
 
 # Create database engine
 engine = create_engine(
     settings.database_url,
-    echo=settings.debug,  # Set to True to see SQL queries in logs
-    pool_pre_ping=True,   # Verify connections before use
-    pool_recycle=300,     # Recycle connections every 5 minutes
+    echo=settings.db_echo,
+    query_cache_size=settings.db_statement_cache_size,
+    **pool_options(settings.database_url, TimedQueuePool),
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Service functions refresh what they return, so objects needn't be expired (and reloaded) after every commit
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=settings.db_expire_on_commit, bind=engine)
+
+# Async engine for endpoints that overlap DB I/O with OCR waits
+async_engine = create_async_engine(
+    async_database_url(settings.database_url),
+    echo=settings.db_echo,
+    query_cache_size=settings.db_statement_cache_size,
+    connect_args=async_connect_args(async_database_url(settings.database_url)),
+    **pool_options(settings.database_url, TimedAsyncAdaptedQueuePool),
+)
+
+# Objects stay readable after commit; async sessions cannot lazily refresh them
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
+def pool_stats() -> dict[str, dict[str, int]]:
+    """Connection counts for the sync and async engines' pools
+
+    QueuePool reports overflow as negative while below `pool_size`; it is
+    clamped to the number of overflow connections actually open.
+    """
+    stats = {}
+    for name, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        stats[name] = {
+            state: getattr(pool, state)()
+            for state in ("size", "checkedin", "checkedout", "overflow")
+            if hasattr(pool, state)
+        }
+        if "overflow" in stats[name]:
+            stats[name]["overflow"] = max(stats[name]["overflow"], 0)
+        if isinstance(pool, QueuePool) and pool_capacity(pool) is not None:
+            stats[name]["capacity"] = pool_capacity(pool)
+    return stats
+
+
+def pool_report() -> dict[str, dict]:
+    """Pool state plus checkout waits per engine, for sizing pools against worker processes"""
+    return {
+        name: {**state, **checkout_stats[name].as_dict()}
+        for name, state in pool_stats().items()
+    }
 
 
 def get_db():
@@ -24,6 +211,12 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Dependency to get an async database session"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def create_tables():
     """Create all tables in the database"""
     Base.metadata.create_all(bind=engine)
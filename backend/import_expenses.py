@@ -0,0 +1,108 @@
+from backend.db.session import SessionLocal
+from backend.models.payments import Payment
+from backend.schemas.expense import ExpenseCreate
+from backend.schemas.payments import PaymentCreate
+from backend.services.categorizer import categorize
+from backend.services.transactions_services import bulk_create_expenses_with_payments
+from sqlalchemy import select
+from datetime import date
+from pathlib import Path
+import argparse
+import csv
+import logging
+import time
+
+logger = logging.getLogger("import_expenses")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+BATCH_SIZE = 1000
+
+
+def read_pairs(path: Path):
+    """Expense/payment pairs from a CSV with date, vendor, amount, transaction_id and optional category, raw_text"""
+    with path.open(newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            vendor = row["vendor"].strip()
+            amount = float(row["amount"])
+            when = date.fromisoformat(row["date"].strip())
+            raw_text = row.get("raw_text") or ""
+            yield (
+                ExpenseCreate(
+                    vendor=vendor,
+                    amount=amount,
+                    expense_date=when,
+                    category=row.get("category") or categorize(vendor),
+                    raw_text=raw_text,
+                ),
+                PaymentCreate(
+                    amount=amount,
+                    payment_date=when,
+                    transanction_Id=(row.get("transaction_id") or "").strip(),
+                    raw_text=raw_text,
+                ),
+            )
+
+
+def new_pairs(db, user_id: int, pairs: list, seen: set[str]) -> list:
+    """Drop pairs whose transaction id is already recorded (or repeated in the file)"""
+    ids = {payment.transanction_Id for _, payment in pairs if payment.transanction_Id}
+    if ids:
+        seen.update(db.scalars(
+            select(Payment.transanction_Id).where(Payment.user_id == user_id, Payment.transanction_Id.in_(ids))
+        ))
+    fresh = []
+    for expense, payment in pairs:
+        if payment.transanction_Id:
+            if payment.transanction_Id in seen:
+                continue
+            seen.add(payment.transanction_Id)
+        fresh.append((expense, payment))
+    return fresh
+
+
+def import_file(db, user_id: int, path: Path, batch_size: int = BATCH_SIZE) -> tuple[int, int]:
+    """Insert the file's transactions in batches, one transaction each; returns (imported, skipped)"""
+    imported = skipped = 0
+    seen: set[str] = set()
+    batch = []
+
+    def flush():
+        nonlocal imported, skipped
+        fresh = new_pairs(db, user_id, batch, seen)
+        skipped += len(batch) - len(fresh)
+        imported += len(bulk_create_expenses_with_payments(db, user_id=user_id, pairs=fresh))
+        batch.clear()
+
+    for pair in read_pairs(path):
+        batch.append(pair)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return imported, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-import UPI transactions from a CSV as expenses and payments")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per INSERT and commit")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        imported, skipped = import_file(db, args.user_id, args.path, args.batch_size)
+    elapsed = time.perf_counter() - started
+    logger.info(
+        "✅ Imported %d transaction(s) in %.1fs (%.0f/s), skipped %d already recorded",
+        imported, elapsed, imported / elapsed if elapsed else 0.0, skipped,
+    )
+
+
+if __name__ == "__main__":
+    main()
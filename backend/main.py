@@ -1,10 +1,144 @@
-from fastapi import FastAPI, UploadFile, File
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, File, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from .app.api.v1.ocr import router as ocr_router
+from .app.api.v1.expenses import router as expenses_router
+from .app.api.v1.payments import router as payments_router
+from .core.config import settings
+from .core.metrics import Gauge, http_request_duration, http_requests, registry, request_stages, server_timing
+from .db.session import SessionLocal, async_engine, pool_report, pool_stats
+from .services.category_services import recategorize_if_dictionary_changed
+from .services.ocr_executor import ocr_executor
+from .services.ocr_engines import ocr_engines, parse_engine_names
+
+logger = logging.getLogger("main")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# Allowance for multipart boundaries and form fields on top of the image itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def recategorize_on_dictionary_change() -> None:
+    """Bring stored categories up to a changed keyword dictionary (one process does it)"""
+    try:
+        with SessionLocal() as db:
+            updated = recategorize_if_dictionary_changed(db)
+    except Exception:
+        logger.exception("Re-categorisation for the new category dictionary failed; it is retried on the next start")
+        return
+    if updated is not None:
+        logger.info(
+            "Category dictionary changed: re-categorised %d expense(s) across %d user(s)",
+            sum(updated.values()), len(updated),
+        )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ocr_executor.start()
+    await ocr_executor.check_workers()
+    pools = pool_stats()
+    logger.info(
+        "DB pools per process: sync %s, async %s (size + max overflow), pre_ping=%s, recycle=%ss",
+        pools["sync"].get("capacity", "unpooled"), pools["async"].get("capacity", "unpooled"),
+        settings.db_pool_pre_ping, settings.db_pool_recycle,
+    )
+    # Pay for heavy OCR imports before serving rather than on the first request
+    await asyncio.to_thread(ocr_engines.warmup, parse_engine_names(settings.ocr_warmup_engines))
+    # In the background: serving doesn't depend on old rows' categories
+    recategorizing = asyncio.create_task(asyncio.to_thread(recategorize_on_dictionary_change))
+    yield
+    if not recategorizing.done():
+        logger.warning("Shutting down mid re-categorisation; run `python -m backend.recategorize` to finish it")
+    ocr_executor.shutdown()
+    logger.info("DB pool checkouts: %s", pool_report())
+    await async_engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Refuse bodies that declare a size over the upload limit before they are read"""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        max_images = settings.ocr_batch_max_files if request.url.path.endswith("/extract-batch") else 1
+        if int(content_length) > settings.max_upload_bytes * max_images + MULTIPART_OVERHEAD_BYTES:
+            return JSONResponse(status_code=413, content={"detail": "Request body too large"})
+    return await call_next(request)
+
+def route_template(request: Request) -> str:
+    """The matched route's path template, so metrics aren't labelled per ID
+
+    Requests rejected before routing (404s, oversized uploads) share one label.
+    """
+    return getattr(request.scope.get("route"), "path", "unmatched")
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """Count requests by route and status, time them, and collect per-stage timings
+
+    Streaming responses are timed to their first byte.
+    """
+    stages: list[tuple[str, str, float]] = []
+    token = request_stages.set(stages)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        request_stages.reset(token)
+        elapsed = time.perf_counter() - started
+        route = route_template(request)
+        http_requests.inc(method=request.method, route=route, status=str(status))
+        http_request_duration.observe(elapsed, method=request.method, route=route)
+
+    if settings.metrics_timing_headers:
+        response.headers["Server-Timing"] = server_timing(stages, elapsed)
+    return response
+
+
+def collect_db_pool():
+    for engine_name, stats in pool_stats().items():
+        for state, value in stats.items():
+            yield (engine_name, state), value
+
+
+def collect_ocr_pool():
+    yield ("in_flight",), ocr_executor.in_flight
+    yield ("capacity",), ocr_executor.capacity
+
+
+registry.register(Gauge("dipex_db_pool_connections", "DB connection pool state", ("engine", "state"), collect_db_pool))
+registry.register(Gauge("dipex_ocr_pool_jobs", "OCR process pool admission", ("state",), collect_ocr_pool))
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/db-pool-stats", include_in_schema=False)
+async def db_pool_stats():
+    """Pool state and checkout waits per engine, for sizing DB_POOL_SIZE against worker processes"""
+    return pool_report()
 
-app = FastAPI()
 
 @app.get("/")
 async def root():
     return {"message" : "Dipex backend is running!"}
 
-app.include_router(ocr_router, prefix="/api/v1")
\ No newline at end of file
+app.include_router(ocr_router, prefix="/api/v1")
+app.include_router(expenses_router, prefix="/api/v1")
+app.include_router(payments_router, prefix="/api/v1")
\ No newline at end of file
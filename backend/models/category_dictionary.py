@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from ..db.base import Base
+
+
+class CategoryDictionary(Base):
+    """Version of the keyword dictionary that stored categories were computed with (a single row)"""
+    __tablename__ = "category_dictionary"
+
+    id = Column(Integer, primary_key=True)  # always 1
+    version = Column(String(12), nullable=False)  # categorizer.dictionary_version()
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<CategoryDictionary(version='{self.version}', updated_at='{self.updated_at}')>"
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from ..db.base import Base
+
+
+class CategoryOverride(Base):
+    """A user's own category for a merchant, applied before the keyword dictionary"""
+    __tablename__ = "category_overrides"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    vendor_key = Column(String, primary_key=True)  # normalization.vendor_key() of the merchant
+    category = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<CategoryOverride(user_id={self.user_id}, vendor_key='{self.vendor_key}', category='{self.category}')>"
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Numeric, Date
+from ..db.base import Base
+
+
+class ExpenseRollup(Base):
+    """Per-user spend totals by month, category and vendor
+
+    `vendor` holds the expense's canonical merchant, or the vendor as read
+    when it has none, so OCR spellings of one shop share a bucket.
+    Maintained incrementally alongside every expense write; rebuilt in bulk
+    from `expenses` by `python -m backend.rebuild_rollups`.
+    """
+    __tablename__ = "expense_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(Date, primary_key=True)  # first day of the month
+    category = Column(String, primary_key=True)
+    vendor = Column(String, primary_key=True)
+    total = Column(Numeric(14, 2), nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return (
+            f"<ExpenseRollup(user_id={self.user_id}, month='{self.month}', category='{self.category}', "
+            f"vendor='{self.vendor}', total={self.total}, count={self.count})>"
+        )
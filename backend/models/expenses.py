@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Numeric, Date
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Date, Index, DDL, Boolean, event, false
 from sqlalchemy.sql import func
 from ..db.base import Base
 
@@ -10,11 +10,34 @@ class Expense(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     vendor = Column(String, nullable=False)
+    merchant = Column(String, nullable=True)  # canonical name across OCR spellings of `vendor`
     amount = Column(Numeric(10,2), nullable=False)
     expense_date = Column(Date, nullable=False)
     category = Column(String, nullable=False)
-    raw_text = Column(Text, nullable=False)
+    category_locked = Column(Boolean, nullable=False, default=False, server_default=false())  # set by hand; re-categorisation skips it
+    raw_text_digest = Column(String(64), ForeignKey("raw_texts.digest"), nullable=True)  # None when there was no text
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
+    __table_args__ = (
+        # Serves per-user, date-ordered listing; id breaks ties for keyset pagination
+        Index("ix_expenses_user_id_expense_date", "user_id", "expense_date", "id"),
+        Index("ix_expenses_user_id_merchant", "user_id", "merchant"),
+        # Re-categorisation updates a user's rows vendor by vendor
+        Index("ix_expenses_user_id_vendor", "user_id", "vendor"),
+        # Trigram indexes for fuzzy search; other databases use the in-process index
+        *(
+            Index(f"ix_expenses_{column}_trgm", column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"})
+            .ddl_if(dialect="postgresql")
+            for column in ("merchant", "vendor")
+        ),
+    )
+
     def __repr__(self):
-        return f"<Expense(id={self.id}, user_id={self.user_id}, vendor='{self.vendor}', amount={self.amount}, expense_date='{self.expense_date}', category='{self.category}')>"
\ No newline at end of file
+        return f"<Expense(id={self.id}, user_id={self.user_id}, vendor='{self.vendor}', amount={self.amount}, expense_date='{self.expense_date}', category='{self.category}')>"
+
+
+event.listen(
+    Expense.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, JSON
+from sqlalchemy.sql import func
+from ..db.base import Base
+
+
+class IdempotencyKey(Base):
+    """The stored response for a client's Idempotency-Key, replayed on retries until it expires"""
+    __tablename__ = "idempotency_keys"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    endpoint = Column(String, nullable=False)
+    request_hash = Column(String(64), nullable=False)  # sha256 of the request, to reject a key reused for another request
+    status_code = Column(Integer, nullable=True)
+    response = Column(JSON, nullable=True)  # None while the first request is still running
+    expires_at = Column(Float, nullable=False)  # epoch seconds
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(user_id={self.user_id}, key='{self.key}', endpoint='{self.endpoint}', status_code={self.status_code})>"
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Float, LargeBinary, JSON, Index
+from sqlalchemy.sql import func
+from ..db.base import Base
+
+
+class OCRJob(Base):
+    """Queued OCR extraction, leased to one worker at a time"""
+    __tablename__ = "ocr_jobs"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued | running | done | failed
+    image = Column(LargeBinary, nullable=True)  # cleared once the job settles
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    # Epoch seconds when the job may next be claimed; for running jobs this is the lease expiry
+    visible_at = Column(Float, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_ocr_jobs_status_visible_at", "status", "visible_at"),
+    )
+
+    def __repr__(self):
+        return f"<OCRJob(id='{self.id}', user_id={self.user_id}, status='{self.status}', attempts={self.attempts})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Numeric, Date
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Date, Index
 from sqlalchemy.sql import func
 from ..db.base import Base
 
@@ -12,9 +12,16 @@ class Payment(Base):
     amount = Column(Numeric(10, 2), nullable=False)
     payement_date = Column(Date, nullable=False)
     transanction_Id = Column(String, nullable=True)
-    raw_text = Column(Text, nullable=False)
+    raw_text_digest = Column(String(64), ForeignKey("raw_texts.digest"), nullable=True)  # None when there was no text
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
+    __table_args__ = (
+        # Serves per-user, date-ordered listing; id breaks ties for keyset pagination
+        Index("ix_payments_user_id_payement_date", "user_id", "payement_date", "id"),
+        # A transaction is recorded once per user; also answers "already saved?" lookups
+        Index("ux_payments_user_id_transanction_id", "user_id", "transanction_Id", unique=True),
+    )
+
     def __repr__(self):
         return (
             f"<Payment(id={self.id}, user_id={self.user_id}, amount={self.amount}, "
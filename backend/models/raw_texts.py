@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy.sql import func
+from ..db.base import Base
+
+
+class RawText(Base):
+    """OCR output, stored once per distinct text and compressed
+
+    Expenses and payments reference it by digest, so a screenshot saved as
+    both keeps a single copy, and listings that don't ask for raw text
+    never read it.
+    """
+    __tablename__ = "raw_texts"
+
+    digest = Column(String(64), primary_key=True)  # sha256 of the UTF-8 text
+    codec = Column(String(8), nullable=False)  # zstd | zlib | plain
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)  # uncompressed bytes
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<RawText(digest='{self.digest[:12]}', codec='{self.codec}', size={self.size}, stored={len(self.data)})>"
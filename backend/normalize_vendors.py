@@ -0,0 +1,58 @@
+from backend.db.session import SessionLocal
+from backend.services.rollup_services import rebuild_rollups
+from backend.services.vendor_services import canonical_merchants, vendor_normalizer
+from backend.models.expenses import Expense
+from sqlalchemy import select, update
+import argparse
+import logging
+
+logger = logging.getLogger("normalize_vendors")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+BATCH_SIZE = 1000
+
+
+def backfill_merchants(db, user_id: int | None = None) -> int:
+    """Assign a canonical merchant to expenses that don't have one yet; returns rows updated"""
+    query = select(Expense.id, Expense.user_id, Expense.vendor).where(Expense.merchant.is_(None)).order_by(Expense.id)
+    if user_id is not None:
+        query = query.where(Expense.user_id == user_id)
+
+    updated = 0
+    last_id = 0
+    # Keyset batches, so each commit only holds one batch and no cursor stays open across it
+    while rows := db.execute(query.where(Expense.id > last_id).limit(BATCH_SIZE)).all():
+        last_id = rows[-1].id
+        changes = [
+            {"id": row.id, "merchant": canonical_merchants(db, row.user_id, [row.vendor])[0]}
+            for row in rows
+        ]
+        changes = [change for change in changes if change["merchant"] is not None]
+        if changes:
+            # Bulk UPDATE by primary key, one executemany per batch
+            db.execute(update(Expense), changes)
+            db.commit()
+            updated += len(changes)
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill in expenses.merchant from vendor names")
+    parser.add_argument("--user-id", type=int, help="only this user's expenses")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        updated = backfill_merchants(db, args.user_id)
+        logger.info("✅ Normalized %d expense(s): %s", updated, vendor_normalizer.stats())
+        if updated:
+            # Rollups are keyed on the merchant, so the normalized rows move buckets
+            logger.info("✅ Rebuilt %d rollup bucket(s)", rebuild_rollups(db, args.user_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+from backend.db.session import SessionLocal
+from backend.core.config import settings
+from backend.services.ocr_jobs_services import claim_next_job, complete_job, fail_job
+from backend.services.ocr_services import extract_expense_data, is_trusted, ocr_cache
+from backend.services.category_services import apply_overrides, user_overrides
+import logging
+import signal
+import time
+
+logger = logging.getLogger("ocr_worker")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+class Worker:
+    """Pulls jobs from the ocr_jobs table until stopped
+
+    Run as many of these processes as there are cores to spare; they
+    coordinate only through the table, so no broker is needed.
+    """
+
+    def __init__(self):
+        self.running = True
+
+    def stop(self, *_):
+        logger.info("Stopping after the current job")
+        self.running = False
+
+    def process(self, db, job) -> None:
+        cache_key = ocr_cache.key_for(job.image)
+        data = ocr_cache.get(cache_key)
+        if data is None:
+            data = extract_expense_data(job.image)
+            if data and is_trusted(data):
+                ocr_cache.put(cache_key, data)
+
+        if not data:
+            raise ValueError("Could not extract data from image")
+        data = apply_overrides(data, *user_overrides(db, job.user_id))
+        if not complete_job(db, job, data):
+            logger.warning("Lost lease on job %s, result discarded", job.id)
+
+    def run(self) -> None:
+        logger.info("OCR worker started (visibility_timeout=%ss)", settings.ocr_job_visibility_timeout)
+        while self.running:
+            with SessionLocal() as db:
+                job = claim_next_job(db, visibility_timeout=settings.ocr_job_visibility_timeout)
+                if job is None:
+                    time.sleep(settings.ocr_job_poll_interval)
+                    continue
+
+                logger.info("Processing job %s (attempt %d/%d)", job.id, job.attempts, job.max_attempts)
+                try:
+                    self.process(db, job)
+                except Exception as e:
+                    logger.exception("Job %s failed", job.id)
+                    db.rollback()
+                    fail_job(db, job, str(e), retry_backoff=settings.ocr_job_retry_backoff)
+
+
+if __name__ == "__main__":
+    worker = Worker()
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
@@ -0,0 +1,60 @@
+from backend.db.session import SessionLocal
+from backend.services.rollup_services import rebuild_rollups, expense_deltas
+from backend.models.expenses import Expense
+from backend.models.expense_rollups import ExpenseRollup
+from sqlalchemy import func, select
+import argparse
+import sys
+import logging
+
+logger = logging.getLogger("rebuild_rollups")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def check_rollups(db, user_id: int | None = None) -> int:
+    """Compare stored rollups with a fresh aggregation; returns the number of mismatched buckets"""
+    expenses = select(
+        Expense.user_id, Expense.expense_date, Expense.category,
+        func.coalesce(Expense.merchant, Expense.vendor), Expense.amount,
+    )
+    rollups = select(ExpenseRollup).where(ExpenseRollup.count != 0)
+    if user_id is not None:
+        expenses = expenses.where(Expense.user_id == user_id)
+        rollups = rollups.where(ExpenseRollup.user_id == user_id)
+
+    expected = expense_deltas(db.execute(expenses.execution_options(yield_per=10_000)))
+    stored = {
+        (r.user_id, r.month, r.category, r.vendor): [r.total, r.count]
+        for r in db.scalars(rollups)
+    }
+    mismatched = 0
+    for key in expected.keys() | stored.keys():
+        if expected.get(key) != stored.get(key):
+            mismatched += 1
+            logger.warning("Bucket %s: expected %s, stored %s", key, expected.get(key), stored.get(key))
+    return mismatched
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute expense_rollups from the expenses table")
+    parser.add_argument("--user-id", type=int, help="only this user's buckets")
+    parser.add_argument("--check", action="store_true", help="report drift instead of rebuilding")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        if args.check:
+            mismatched = check_rollups(db, args.user_id)
+            logger.info("%d mismatched bucket(s)", mismatched)
+            sys.exit(1 if mismatched else 0)
+
+        written = rebuild_rollups(db, args.user_id)
+        logger.info("✅ Rebuilt %d rollup bucket(s)", written)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+from backend.db.session import SessionLocal
+from backend.services.category_services import claim_dictionary_version, recategorize_all
+from backend.services.categorizer import category_matcher
+import argparse
+import logging
+
+logger = logging.getLogger("recategorize")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-apply the category dictionary and overrides to stored expenses "
+                    "(the API also does this for everyone at startup when the dictionary changed)"
+    )
+    parser.add_argument("--user-id", type=int, help="only this user's expenses")
+    args = parser.parse_args()
+
+    logger.info("Category dictionary version %s", category_matcher.version)
+    with SessionLocal() as db:
+        updated = recategorize_all(db, [args.user_id] if args.user_id is not None else None)
+        for user_id, count in updated.items():
+            logger.info("User %s: %d expense(s) re-categorised", user_id, count)
+        if args.user_id is None:
+            # Everyone is now on this version, so the API has nothing left to re-run
+            claim_dictionary_version(db, category_matcher.version)
+    logger.info("✅ Re-categorised %d expense(s) across %d user(s)", sum(updated.values()), len(updated))
+
+
+if __name__ == "__main__":
+    main()
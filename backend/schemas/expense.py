@@ -10,7 +10,8 @@ class Expense(BaseModel):
     amount: float
     expense_date: date
     category: str
-    raw_text: str
+    raw_text: Optional[str] = None  # only when asked for
+    merchant: Optional[str] = None
 
 class ExpenseCreate(BaseModel):
     """Schema for creating an expense"""
@@ -31,3 +32,8 @@ class ExpenseUpdate(BaseModel):
     class Config:
         from_attributes = True
 
+
+class CategoryOverrideSet(BaseModel):
+    """A user's category for every expense from a merchant"""
+    vendor: str
+    category: str
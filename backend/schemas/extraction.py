@@ -0,0 +1,57 @@
+import re
+from pydantic import BaseModel, ConfigDict, field_validator
+from typing import Optional
+
+from ..services.upi_parser import TEMPLATES, normalize_amount, normalize_date
+
+# Response schema sent to Gemini (its OpenAPI subset); keep in step with ExtractedTransaction
+RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "vendor": {"type": "STRING", "nullable": True, "description": "Payee name as shown"},
+        "amount": {"type": "NUMBER", "nullable": True, "description": "Rupees"},
+        "transaction_id": {"type": "STRING", "nullable": True, "description": "UPI ref / UTR / transaction ID"},
+        "date": {"type": "STRING", "nullable": True, "description": "YYYY-MM-DD"},
+        "payment_app": {"type": "STRING", "format": "enum", "enum": list(TEMPLATES)},
+    },
+    "required": ["vendor", "amount", "transaction_id", "date", "payment_app"],
+}
+
+
+class ExtractedTransaction(BaseModel):
+    """Gemini's structured reply for one screenshot; maps onto ExpenseCreate/PaymentCreate
+
+    Validators are lenient: a field the model got wrong becomes None (and is
+    reported as an issue downstream) rather than failing the whole reply.
+    """
+    model_config = ConfigDict(extra="ignore")
+
+    vendor: Optional[str] = None
+    amount: Optional[str] = None  # normalized, e.g. "1250.00"
+    transaction_id: Optional[str] = None
+    date: Optional[str] = None  # ISO
+    payment_app: str = "generic"
+
+    @field_validator("vendor", "transaction_id", mode="before")
+    @classmethod
+    def blank_to_none(cls, value):
+        if value is None:
+            return None
+        value = " ".join(str(value).split())
+        return value or None
+
+    @field_validator("amount", mode="before")
+    @classmethod
+    def parse_amount(cls, value):
+        # Numbers normally; tolerate "₹1,250" if the model returns a string anyway
+        return normalize_amount(re.sub(r"[^\d.,]", "", str(value))) if value is not None else None
+
+    @field_validator("date", mode="before")
+    @classmethod
+    def parse_date(cls, value):
+        return normalize_date(str(value).strip()) if value else None
+
+    @field_validator("payment_app", mode="before")
+    @classmethod
+    def known_app(cls, value):
+        return value if value in TEMPLATES else "generic"
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class OCRJob(BaseModel):
+    """Schema for an OCR job status"""
+    id: str
+    status: str
+    attempts: int
+    result: Optional[dict] = None
+    error: Optional[str] = None
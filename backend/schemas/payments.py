@@ -9,7 +9,7 @@ class Payment(BaseModel):
     amount: float
     payment_date: date
     transanction_Id: str
-    raw_text: str
+    raw_text: Optional[str] = None  # only when asked for
 
 class PaymentCreate(BaseModel):
     """Schema for creating a payment"""
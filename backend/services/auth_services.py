@@ -1,3 +1,4 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ..models.user import User
 
@@ -6,3 +7,7 @@ def get_user_by_id(db: Session, user_id: int) -> User | None:
     return db.query(User).filter(User.id == user_id).first()
 
 
+async def get_user_by_id_async(db: AsyncSession, user_id: int) -> User | None:
+    return await db.get(User, user_id)
+
+
@@ -0,0 +1,160 @@
+"""Keyword categorisation of expenses with an Aho-Corasick automaton
+
+Every keyword in the dictionary is compiled into one automaton, so a vendor
+name is categorised in a single pass over its characters however many
+keywords there are. Keywords match whole words only, and when several match
+the longest one wins ("indian oil" beats "indian"). When the vendor name
+matches nothing, only the OCR lines around the payee are tried: the rest of
+a screenshot is app chrome, offers and ads ("Recharge", "Zomato Gold").
+"""
+import hashlib
+import json
+from collections import deque
+
+from ..core.config import ocr_settings
+from .normalization import vendor_key
+
+DEFAULT_CATEGORY = "Other"
+
+# Earlier categories win ties between keywords of the same length
+DEFAULT_CATEGORY_KEYWORDS: dict[str, list[str]] = {
+    "Food": [
+        "swiggy", "zomato", "eatsure", "dominos", "pizza hut", "mcdonalds", "kfc", "burger king", "subway",
+        "starbucks", "chai point", "chaayos", "cafe coffee day", "ccd", "haldiram", "restaurant", "cafe",
+        "bakery", "dhaba", "hotel", "sweets", "canteen", "mess",
+    ],
+    "Groceries": [
+        "bigbasket", "blinkit", "zepto", "instamart", "dmart", "jiomart", "more supermarket", "reliance fresh",
+        "nature s basket", "supermarket", "kirana", "general store", "provision", "vegetables", "dairy",
+    ],
+    "Transport": [
+        "uber", "ola", "rapido", "namma yatri", "metro", "dmrc", "bmrcl", "fastag", "parking", "auto",
+        "taxi", "cab",
+    ],
+    "Fuel": ["indian oil", "iocl", "hpcl", "bpcl", "bharat petroleum", "hindustan petroleum", "shell", "petrol", "fuel"],
+    "Travel": [
+        "irctc", "makemytrip", "goibibo", "cleartrip", "yatra", "redbus", "indigo", "air india", "vistara",
+        "akasa", "spicejet", "oyo", "airbnb",
+    ],
+    "Shopping": [
+        "amazon", "flipkart", "myntra", "ajio", "meesho", "nykaa", "tata cliq", "decathlon", "croma",
+        "reliance digital", "ikea", "lifestyle", "westside", "zudio",
+    ],
+    "Bills": [
+        "airtel", "jio", "vodafone", "vi", "bsnl", "act fibernet", "tata play", "electricity", "bescom",
+        "tneb", "msedcl", "bses", "water board", "gas", "indane", "bharat gas", "recharge", "broadband",
+        "insurance", "lic", "rent", "maintenance",
+    ],
+    "Entertainment": [
+        "netflix", "hotstar", "prime video", "spotify", "youtube", "bookmyshow", "pvr", "inox", "cinepolis",
+        "steam", "playstation",
+    ],
+    "Health": [
+        "apollo", "medplus", "netmeds", "pharmeasy", "1mg", "practo", "pharmacy", "chemist", "medical",
+        "hospital", "clinic", "diagnostics", "lab", "dental",
+    ],
+}
+
+# Lines either side of the payee's name that the text fallback may match on
+PAYEE_CONTEXT_LINES = 1
+
+
+def load_dictionary(path: str | None = ocr_settings.category_dictionary_path) -> dict[str, list[str]]:
+    if not path:
+        return DEFAULT_CATEGORY_KEYWORDS
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def dictionary_version(dictionary: dict[str, list[str]]) -> str:
+    """Short fingerprint; when it changes, stored categories need a re-categorisation pass"""
+    return hashlib.sha256(json.dumps(dictionary, sort_keys=True).encode()).hexdigest()[:12]
+
+
+class CategoryMatcher:
+    """Aho-Corasick automaton over whole-word keywords
+
+    Text and keywords are normalised the same way as vendor names and padded
+    with a space each side, so " ola " can't match inside " kolar ". Each
+    node stores the best keyword ending there, including those reached
+    through its failure links, so matching never walks the failure chain.
+    """
+
+    def __init__(self, dictionary: dict[str, list[str]]):
+        self.version = dictionary_version(dictionary)
+        self._goto: list[dict[str, int]] = [{}]
+        # Per node: (keyword length, -category order, category) of the best keyword ending here
+        self._best: list[tuple[int, int, str] | None] = [None]
+        for order, (category, keywords) in enumerate(dictionary.items()):
+            for keyword in keywords:
+                normalized = vendor_key(keyword)
+                if normalized:
+                    self._add(f" {normalized} ", (len(normalized), -order, category))
+        self._link()
+
+    def _add(self, pattern: str, output: tuple[int, int, str]) -> None:
+        node = 0
+        for char in pattern:
+            following = self._goto[node].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto[node][char] = following
+                self._goto.append({})
+                self._best.append(None)
+            node = following
+        if self._best[node] is None or output > self._best[node]:
+            self._best[node] = output
+
+    def _link(self) -> None:
+        """Breadth-first failure links, then fold each node's best output with its fallback's"""
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                inherited = self._best[self._fail[child]]
+                if inherited is not None and (self._best[child] is None or inherited > self._best[child]):
+                    self._best[child] = inherited
+                queue.append(child)
+
+    def match(self, text: str) -> str | None:
+        """Category of the best keyword in `text`, or None if none match"""
+        goto, fail, best_at = self._goto, self._fail, self._best
+        node = 0
+        best = None
+        for char in f" {vendor_key(text)} ":
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            found = best_at[node]
+            if found is not None and (best is None or found > best):
+                best = found
+        return best[2] if best else None
+
+
+category_matcher = CategoryMatcher(load_dictionary())
+
+
+def payee_context(vendor: str | None, text: str | None, radius: int = PAYEE_CONTEXT_LINES) -> str:
+    """The lines of `text` around the first one naming `vendor`; empty if none does"""
+    key = vendor_key(vendor or "")
+    if not key or key == "unknown" or not text:
+        return ""
+    lines = text.splitlines()
+    for index, line in enumerate(lines):
+        if key in vendor_key(line):
+            return "\n".join(lines[max(0, index - radius):index + radius + 1])
+    return ""
+
+
+def categorize(vendor: str | None, text: str | None = None) -> str:
+    """Category for an expense: the vendor's keywords, then those next to it in the OCR text (user overrides: see category_services)"""
+    return (
+        (vendor and category_matcher.match(vendor))
+        or category_matcher.match(payee_context(vendor, text))
+        or DEFAULT_CATEGORY
+    )
@@ -0,0 +1,304 @@
+"""Per-user category overrides and batch re-categorisation of stored expenses
+
+New expenses are categorised as they are extracted (see categorizer.py).
+When the keyword dictionary or a user's overrides change, `recategorize`
+brings their stored expenses up to date: each distinct vendor is classified
+once and the result is written with one UPDATE per batch of vendors, rather
+than row by row. Expenses whose category was set by hand are left alone.
+The dictionary version the stored categories follow is kept in the
+database; the API re-runs the pass for everyone at startup when it differs.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import ocr_settings
+from ..models.category_dictionary import CategoryDictionary
+from ..models.category_overrides import CategoryOverride
+from ..models.expenses import Expense
+from ..models.raw_texts import RawText
+from .categorizer import DEFAULT_CATEGORY, category_matcher, payee_context
+from .normalization import vendor_key
+from .raw_text_services import decode
+from .rollup_services import rebuild_rollups
+from .vendor_services import UserMerchants, user_merchants, user_merchants_async, vendor_normalizer
+
+# Vendors per UPDATE ... CASE; keeps bound parameters well under SQLite's limit
+RECATEGORIZE_BATCH = 500
+TEXT_BATCH_SIZE = 1000
+TEXT_MEMO_SIZE = 100_000
+
+
+class OverrideCache:
+    """LRU of each user's overrides (vendor key -> category)
+
+    Writers in this process call `invalidate`; entries also expire after
+    `ttl` seconds so other processes (workers, other API replicas) pick up
+    changes.
+    """
+
+    def __init__(self, max_users: int = ocr_settings.vendor_cache_users, ttl: float = ocr_settings.category_override_ttl):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._users: OrderedDict[int, tuple[float, dict[str, str]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> dict[str, str] | None:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                return None
+            self._users.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, user_id: int, overrides: dict[str, str]) -> None:
+        with self._lock:
+            self._users[user_id] = (time.monotonic(), overrides)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+
+override_cache = OverrideCache()
+
+
+def _override_query(user_id: int):
+    return select(CategoryOverride.vendor_key, CategoryOverride.category).where(CategoryOverride.user_id == user_id)
+
+
+def get_overrides(db: Session, user_id: int) -> dict[str, str]:
+    overrides = override_cache.get(user_id)
+    if overrides is None:
+        overrides = dict(db.execute(_override_query(user_id)).all())
+        override_cache.put(user_id, overrides)
+    return overrides
+
+
+async def get_overrides_async(db: AsyncSession, user_id: int) -> dict[str, str]:
+    overrides = override_cache.get(user_id)
+    if overrides is None:
+        overrides = dict((await db.execute(_override_query(user_id))).all())
+        override_cache.put(user_id, overrides)
+    return overrides
+
+
+def user_overrides(db: Session, user_id: int) -> tuple[dict[str, str], UserMerchants | None]:
+    """The user's overrides and, when there are any, their merchants for `apply_overrides`"""
+    overrides = get_overrides(db, user_id)
+    return overrides, user_merchants(db, user_id) if overrides else None
+
+
+async def user_overrides_async(db: AsyncSession, user_id: int) -> tuple[dict[str, str], UserMerchants | None]:
+    overrides = await get_overrides_async(db, user_id)
+    return overrides, await user_merchants_async(db, user_id) if overrides else None
+
+
+def override_for(overrides: dict[str, str], vendor: str, merchant: str | None) -> str | None:
+    """The override stored under the vendor's spelling, else under its canonical merchant"""
+    for key in (vendor_key(vendor), vendor_key(merchant or "")):
+        if key in overrides:
+            return overrides[key]
+    return None
+
+
+def apply_overrides(data: dict, overrides: dict[str, str], merchants: UserMerchants | None = None) -> dict:
+    """Extraction result with the user's override for its vendor or merchant, if there is one
+
+    The merchant is the one the expense would be saved under (see
+    vendor_services), so an override applies to new extractions exactly as
+    `recategorize` applies it to stored ones.
+    """
+    if overrides:
+        vendor = data.get("vendor") or ""
+        merchant = vendor_normalizer.match(merchants, vendor) if merchants is not None else None
+        override = override_for(overrides, vendor, merchant)
+        if override:
+            return {**data, "category": override}
+    return data
+
+
+async def list_overrides_async(db: AsyncSession, user_id: int) -> list[dict]:
+    rows = await db.execute(_override_query(user_id).order_by(CategoryOverride.vendor_key))
+    return [{"vendor_key": key, "category": category} for key, category in rows]
+
+
+async def set_override_async(db: AsyncSession, user_id: int, vendor: str, category: str) -> str:
+    """Create or replace the user's category for `vendor`; returns the vendor key it is stored under"""
+    key = vendor_key(vendor)
+    if not key:
+        raise ValueError("vendor has no letters or digits to match on")
+    override = await db.get(CategoryOverride, (user_id, key))
+    if override is None:
+        db.add(CategoryOverride(user_id=user_id, vendor_key=key, category=category))
+    else:
+        override.category = category
+    await db.commit()
+    override_cache.invalidate(user_id)
+    return key
+
+
+async def delete_override_async(db: AsyncSession, user_id: int, vendor: str) -> bool:
+    result = await db.execute(
+        delete(CategoryOverride).where(CategoryOverride.user_id == user_id, CategoryOverride.vendor_key == vendor_key(vendor))
+    )
+    await db.commit()
+    override_cache.invalidate(user_id)
+    return result.rowcount > 0
+
+
+def _recategorize_vendors(db: Session, user_id: int, categories: dict[str, str]) -> int:
+    """Set each vendor's rows to its category, one UPDATE ... CASE per batch of vendors"""
+    updated = 0
+    vendors = list(categories)
+    for start in range(0, len(vendors), RECATEGORIZE_BATCH):
+        batch = {vendor: categories[vendor] for vendor in vendors[start:start + RECATEGORIZE_BATCH]}
+        category = case(batch, value=Expense.vendor)
+        updated += db.execute(
+            update(Expense)
+            .where(
+                Expense.user_id == user_id,
+                Expense.category_locked.is_(False),
+                Expense.vendor.in_(batch),
+                Expense.category != category,
+            )
+            .values(category=category)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    return updated
+
+
+def _recategorize_by_text(db: Session, user_id: int, vendors: list[str]) -> int:
+    """Rows whose vendor matches no keyword are categorised from the OCR text around the payee, as at extraction"""
+    query = (
+        select(Expense.id, Expense.vendor, Expense.raw_text_digest, Expense.category, RawText.codec, RawText.data)
+        .outerjoin(RawText, RawText.digest == Expense.raw_text_digest)
+        .where(Expense.user_id == user_id, Expense.category_locked.is_(False))
+        .order_by(Expense.id)
+    )
+    updated = 0
+    # (digest, vendor) -> category; texts are shared between rows
+    by_text: dict[tuple[str | None, str], str] = {}
+    for start in range(0, len(vendors), RECATEGORIZE_BATCH):
+        batch_query = query.where(Expense.vendor.in_(vendors[start:start + RECATEGORIZE_BATCH]))
+        last_id = 0
+        while rows := db.execute(batch_query.where(Expense.id > last_id).limit(TEXT_BATCH_SIZE)).all():
+            last_id = rows[-1].id
+            changes = []
+            for row in rows:
+                category = by_text.get((row.raw_text_digest, row.vendor))
+                if category is None:
+                    text = decode(row.codec, row.data) if row.data is not None else ""
+                    category = category_matcher.match(payee_context(row.vendor, text)) or DEFAULT_CATEGORY
+                    if len(by_text) < TEXT_MEMO_SIZE:
+                        by_text[(row.raw_text_digest, row.vendor)] = category
+                if category != row.category:
+                    changes.append({"id": row.id, "category": category})
+            if changes:
+                db.execute(update(Expense), changes)
+                updated += len(changes)
+    return updated
+
+
+def recategorize(db: Session, user_id: int) -> int:
+    """Re-apply the dictionary and the user's overrides to their stored expenses
+
+    Returns the number of expenses whose category changed. Categories and
+    rollups are rewritten in one transaction.
+    """
+    overrides = get_overrides(db, user_id)
+    pairs = db.execute(
+        select(Expense.vendor, Expense.merchant)
+        .where(Expense.user_id == user_id, Expense.category_locked.is_(False))
+        .distinct()
+    ).all()
+
+    by_vendor: dict[str, str] = {}
+    unmatched: set[str] = set()
+    for vendor, merchant in pairs:
+        if vendor in by_vendor:
+            continue
+        category = override_for(overrides, vendor, merchant) or category_matcher.match(vendor)
+        if category:
+            by_vendor[vendor] = category
+            unmatched.discard(vendor)
+        else:
+            unmatched.add(vendor)
+
+    try:
+        updated = _recategorize_vendors(db, user_id, by_vendor)
+        updated += _recategorize_by_text(db, user_id, sorted(unmatched))
+        if updated:
+            rebuild_rollups(db, user_id)  # commits
+        else:
+            db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return updated
+
+
+def recategorize_all(db: Session, user_ids: list[int] | None = None) -> dict[int, int]:
+    """`recategorize` for each user (everyone with expenses by default); user id -> expenses changed"""
+    if user_ids is None:
+        user_ids = db.scalars(select(Expense.user_id).distinct()).all()
+    return {user_id: recategorize(db, user_id) for user_id in user_ids}
+
+
+def claim_dictionary_version(db: Session, version: str) -> str | None:
+    """Record `version` as the dictionary stored categories follow
+
+    Returns the version it replaced ("" if none was stored) when this call
+    changed it, or None when it was already current or another process got
+    there first, so only one process re-categorises after a change.
+    """
+    stored = db.get(CategoryDictionary, 1)
+    if stored is None:
+        db.add(CategoryDictionary(id=1, version=version))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return None
+        return ""
+    previous = stored.version
+    if previous == version:
+        return None
+    claimed = db.execute(
+        update(CategoryDictionary)
+        .where(CategoryDictionary.id == 1, CategoryDictionary.version == previous)
+        .values(version=version)
+    ).rowcount
+    db.commit()
+    return previous if claimed else None
+
+
+def recategorize_if_dictionary_changed(db: Session) -> dict[int, int] | None:
+    """Re-categorise everyone if the dictionary changed since categories were stored
+
+    Returns expenses changed per user, or None when nothing was due. If the
+    pass fails the old version is put back, so the next start retries it.
+    """
+    version = category_matcher.version
+    previous = claim_dictionary_version(db, version)
+    if previous is None:
+        return None
+    try:
+        return recategorize_all(db)
+    except Exception:
+        db.rollback()
+        current = CategoryDictionary.id == 1, CategoryDictionary.version == version
+        if previous:
+            db.execute(update(CategoryDictionary).where(*current).values(version=previous))
+        else:
+            db.execute(delete(CategoryDictionary).where(*current))
+        db.commit()
+        raise
@@ -1,7 +1,27 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import date
 from ..models.expenses import Expense
-from ..schemas.expense import Expense as ExpenseSchema
+from ..schemas.expense import Expense as ExpenseSchema, ExpenseUpdate
+from .pagination import fetch_page
+from .rollup_services import apply_rollup_deltas, apply_rollup_deltas_async, expense_deltas, merge_deltas, rollup_vendor
+from .vendor_services import canonical_merchants, canonical_merchants_async, search_index
+from .raw_text_services import resolve_raw_text_async, store_raw_texts, store_raw_texts_async
+
+# Columns a listing may project, by response field name
+EXPENSE_COLUMNS = {
+    "id": Expense.id,
+    "user_id": Expense.user_id,
+    "vendor": Expense.vendor,
+    "merchant": Expense.merchant,
+    "amount": Expense.amount,
+    "expense_date": Expense.expense_date,
+    "category": Expense.category,
+    "raw_text": Expense.raw_text_digest,  # resolved to the text after the page is fetched
+    "created_at": Expense.created_at,
+}
+DEFAULT_EXPENSE_FIELDS = ("id", "vendor", "amount", "expense_date", "category")
+DEFAULT_SEARCH_FIELDS = ("id", "merchant", "vendor", "amount", "expense_date", "category")
 
 
 def create_expense(
@@ -17,26 +37,107 @@ def create_expense(
     expense = Expense(
         user_id=user_id,
         vendor=vendor,
+        merchant=canonical_merchants(db, user_id, [vendor])[0],
         amount=amount,
         expense_date=expense_date,
         category=category,
-        raw_text=raw_text,
+        raw_text_digest=store_raw_texts(db, [raw_text])[0],
     )
     db.add(expense)
+    apply_rollup_deltas(db, expense_deltas([_rollup_row(expense)]))
     db.commit()
     db.refresh(expense)
     return expense
 
 
-def to_schema(expense: Expense) -> ExpenseSchema:
+def _rollup_row(expense: Expense) -> tuple:
+    return (
+        expense.user_id, expense.expense_date, expense.category,
+        rollup_vendor(expense.merchant, expense.vendor), expense.amount,
+    )
+
+
+async def update_expense_async(db: AsyncSession, expense_id: int, changes: ExpenseUpdate) -> Expense | None:
+    """Apply a partial update, moving the amount between rollup buckets as needed"""
+    expense = await db.get(Expense, expense_id)
+    if expense is None:
+        return None
+    before = _rollup_row(expense)
+    updates = changes.model_dump(exclude_unset=True)
+    raw_text = updates.pop("raw_text", None)
+    if raw_text is not None:
+        expense.raw_text_digest = (await store_raw_texts_async(db, [raw_text]))[0]
+    for name, value in updates.items():
+        setattr(expense, name, value)
+    if "category" in updates:
+        expense.category_locked = True
+    if "vendor" in updates:
+        expense.merchant = (await canonical_merchants_async(db, expense.user_id, [expense.vendor]))[0]
+    await apply_rollup_deltas_async(
+        db, merge_deltas(expense_deltas([before], sign=-1), expense_deltas([_rollup_row(expense)]))
+    )
+    await db.commit()
+    search_index.invalidate(expense.user_id)
+    await db.refresh(expense)
+    return expense
+
+
+async def delete_expense_async(db: AsyncSession, expense_id: int) -> bool:
+    expense = await db.get(Expense, expense_id)
+    if expense is None:
+        return False
+    await apply_rollup_deltas_async(db, expense_deltas([_rollup_row(expense)], sign=-1))
+    await db.delete(expense)
+    await db.commit()
+    search_index.invalidate(expense.user_id)
+    return True
+
+
+async def list_expenses(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    fields: list[str],
+    start_date: date | None = None,
+    end_date: date | None = None,
+    category: str | None = None,
+    vendor: str | None = None,
+    cursor: str | None = None,
+    limit: int = 50,
+) -> tuple[list[dict], str | None]:
+    criteria = [Expense.user_id == user_id]
+    if start_date:
+        criteria.append(Expense.expense_date >= start_date)
+    if end_date:
+        criteria.append(Expense.expense_date <= end_date)
+    if category:
+        criteria.append(Expense.category == category)
+    if vendor:
+        criteria.append(Expense.vendor == vendor)
+
+    items, next_cursor = await fetch_page(
+        db,
+        {name: EXPENSE_COLUMNS[name] for name in fields},
+        criteria,
+        sort_column=Expense.expense_date,
+        id_column=Expense.id,
+        cursor=cursor,
+        limit=limit,
+    )
+    return await resolve_raw_text_async(db, items), next_cursor
+
+
+def to_schema(expense: Expense, raw_text: str | None = None) -> ExpenseSchema:
+    """`raw_text` is left out unless the caller already has it (it lives in raw_texts)"""
     return ExpenseSchema(
         id=expense.id,
         user_id=expense.user_id,
         vendor=expense.vendor,
+        merchant=expense.merchant,
         amount=float(expense.amount),
         expense_date=expense.expense_date,
         category=expense.category,
-        raw_text=expense.raw_text,
+        raw_text=raw_text,
     )
 
 
@@ -0,0 +1,151 @@
+import csv
+import importlib.util
+import io
+from typing import AsyncIterator
+from sqlalchemy import select
+from ..db.session import AsyncSessionLocal
+from ..models.expenses import Expense
+from ..models.payments import Payment
+from ..models.raw_texts import RawText
+from .raw_text_services import decode
+
+EXPORT_FORMATS = ("csv", "parquet")
+
+# Export column name -> (model column, arrow type name)
+EXPORT_COLUMNS = {
+    "expenses": {
+        "id": (Expense.id, "int64"),
+        "vendor": (Expense.vendor, "string"),
+        "amount": (Expense.amount, "decimal"),
+        "expense_date": (Expense.expense_date, "date"),
+        "category": (Expense.category, "string"),
+        "created_at": (Expense.created_at, "timestamp"),
+        "raw_text": (RawText.data, "string"),
+    },
+    "payments": {
+        "id": (Payment.id, "int64"),
+        "amount": (Payment.amount, "decimal"),
+        "payment_date": (Payment.payement_date, "date"),
+        "transanction_Id": (Payment.transanction_Id, "string"),
+        "created_at": (Payment.created_at, "timestamp"),
+        "raw_text": (RawText.data, "string"),
+    },
+}
+ORDER_COLUMNS = {"expenses": Expense.id, "payments": Payment.id}
+USER_COLUMNS = {"expenses": Expense.user_id, "payments": Payment.user_id}
+DIGEST_COLUMNS = {"expenses": Expense.raw_text_digest, "payments": Payment.raw_text_digest}
+
+
+def parquet_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def export_columns(dataset: str, include_raw_text: bool) -> list[str]:
+    return [name for name in EXPORT_COLUMNS[dataset] if include_raw_text or name != "raw_text"]
+
+
+async def iter_row_chunks(dataset: str, user_id: int, columns: list[str], chunk_size: int) -> AsyncIterator[list[tuple]]:
+    """Yield a user's rows `chunk_size` at a time from a server-side cursor
+
+    Opens its own session: the request's dependency session is closed before
+    a streaming response body starts. Only one chunk is held in memory.
+    """
+    spec = EXPORT_COLUMNS[dataset]
+    query = (
+        select(*(spec[name][0] for name in columns))
+        .where(USER_COLUMNS[dataset] == user_id)
+        .order_by(ORDER_COLUMNS[dataset])
+        .execution_options(yield_per=chunk_size)
+    )
+    raw_text_at = columns.index("raw_text") if "raw_text" in columns else None
+    if raw_text_at is not None:
+        # Compressed text comes back with its codec as an extra trailing column
+        query = query.outerjoin(RawText, RawText.digest == DIGEST_COLUMNS[dataset]).add_columns(RawText.codec)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            if raw_text_at is None:
+                yield [tuple(row) for row in partition]
+                continue
+            rows = []
+            for row in partition:
+                *values, codec = row
+                data = values[raw_text_at]
+                values[raw_text_at] = decode(codec, data) if data is not None else ""
+                rows.append(tuple(values))
+            yield rows
+
+
+async def csv_stream(columns: list[str], chunks: AsyncIterator[list[tuple]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the caller between row groups"""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+async def parquet_stream(dataset: str, columns: list[str], chunks: AsyncIterator[list[tuple]]) -> AsyncIterator[bytes]:
+    """Encode each chunk as one Parquet row group and yield the bytes as they are produced"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_types = {
+        "int64": pa.int64(),
+        "string": pa.string(),
+        "decimal": pa.decimal128(12, 2),
+        "date": pa.date32(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }
+    spec = EXPORT_COLUMNS[dataset]
+    schema = pa.schema([(name, arrow_types[spec[name][1]]) for name in columns])
+
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        async for rows in chunks:
+            writer.write_batch(pa.RecordBatch.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)],
+                schema=schema,
+            ))
+            yield sink.drain()
+    yield sink.drain()
+
+
+MEDIA_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+def export_stream(dataset: str, user_id: int, fmt: str, *, include_raw_text: bool, chunk_size: int) -> AsyncIterator[bytes]:
+    columns = export_columns(dataset, include_raw_text)
+    chunks = iter_row_chunks(dataset, user_id, columns, chunk_size)
+    if fmt == "parquet":
+        return parquet_stream(dataset, columns, chunks)
+    return csv_stream(columns, chunks)
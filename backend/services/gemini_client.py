@@ -0,0 +1,363 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Protocol, TypeVar
+
+from pydantic import ValidationError
+
+from ..core.config import ocr_settings
+from ..core.metrics import gemini_calls, gemini_tokens
+from ..schemas.extraction import RESPONSE_SCHEMA, ExtractedTransaction
+
+logger = logging.getLogger("gemini_client")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# The response schema carries the field definitions, so the prompt stays short
+EXTRACTION_PROMPT = "UPI payment screenshot. Fill each field from the image; null if not shown."
+
+T = TypeVar("T")
+
+
+class GeminiTimeout(Exception):
+    """Raised when a Gemini call misses its deadline (including time spent queued)"""
+
+
+@dataclass
+class GeminiReply:
+    text: str
+    prompt_tokens: int = 0
+    output_tokens: int = 0
+
+
+@dataclass
+class GeminiExtraction:
+    """A validated structured reply and what it cost"""
+    transaction: ExtractedTransaction
+    text: str
+    prompt_tokens: int
+    output_tokens: int
+    latency_ms: float
+    validate_ms: float
+
+
+class GeminiBackend(Protocol):
+    def generate(self, parts: list) -> GeminiReply: ...
+
+    async def generate_async(self, parts: list) -> GeminiReply: ...
+
+
+class GenaiBackend:
+    """google-generativeai model, configured and constructed once per process
+
+    Replies are constrained to RESPONSE_SCHEMA JSON, so there is no free
+    text to parse and the output is a few dozen tokens.
+    """
+
+    def __init__(self, api_key: str, model_name: str):
+        # Imported here: the SDK alone takes most of a second to import
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(
+            model_name,
+            generation_config={
+                "response_mime_type": "application/json",
+                "response_schema": RESPONSE_SCHEMA,
+                "temperature": 0,
+            },
+        )
+
+    @staticmethod
+    def _reply(response) -> GeminiReply:
+        usage = getattr(response, "usage_metadata", None)
+        return GeminiReply(
+            text=getattr(response, "text", ""),
+            prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+            output_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+        )
+
+    def generate(self, parts: list) -> GeminiReply:
+        return self._reply(self.model.generate_content(parts, request_options={"timeout": ocr_settings.gemini_timeout}))
+
+    async def generate_async(self, parts: list) -> GeminiReply:
+        return self._reply(await self.model.generate_content_async(parts, request_options={"timeout": ocr_settings.gemini_timeout}))
+
+
+class StubGeminiBackend:
+    """Offline stand-in that plays back canned replies, in turn, after a fixed latency"""
+
+    def __init__(self, replies: list[GeminiReply], latency: float = 0.0):
+        self.replies = replies or [GeminiReply(text="{}")]
+        self.latency = latency
+        self.calls = 0
+
+    @classmethod
+    def from_fixture(cls, path: str, latency: float = 0.0) -> "StubGeminiBackend":
+        """Replies recorded as [{"response": {...} or "...", "prompt_tokens": n, "output_tokens": n}, ...]"""
+        with open(path, encoding="utf-8") as f:
+            recorded = json.load(f)
+        return cls([
+            GeminiReply(
+                text=item["response"] if isinstance(item["response"], str) else json.dumps(item["response"]),
+                prompt_tokens=item.get("prompt_tokens", 0),
+                output_tokens=item.get("output_tokens", 0),
+            )
+            for item in recorded
+        ], latency)
+
+    def _next(self) -> GeminiReply:
+        reply = self.replies[self.calls % len(self.replies)]
+        self.calls += 1
+        return reply
+
+    def generate(self, parts: list) -> GeminiReply:
+        time.sleep(self.latency)
+        return self._next()
+
+    async def generate_async(self, parts: list) -> GeminiReply:
+        await asyncio.sleep(self.latency)
+        return self._next()
+
+
+class TokenBucket:
+    """Token bucket for async and blocking callers alike: `rate` calls per second with bursts up to `capacity`
+
+    A caller reserves the next token, going into debt if there is none, and
+    then sleeps until it is due, so waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token; returns the seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    async def acquire(self) -> None:
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+
+class GeminiClient:
+    """Shared, rate-limited entry point for Gemini calls
+
+    One backend (and so one model object) is reused for every call. Calls
+    are capped by a concurrency semaphore and a token bucket shared by sync
+    and async callers, and the deadline covers both waiting for a slot and
+    the call itself. Blocking callers queue on a thread semaphore of the
+    same size, as they can't wait on the event loop's.
+    """
+
+    def __init__(
+        self,
+        backend: GeminiBackend,
+        *,
+        max_concurrency: int = ocr_settings.gemini_max_concurrency,
+        rate_per_second: float = ocr_settings.gemini_rate_per_second,
+        burst: int = ocr_settings.gemini_burst,
+        timeout: float = ocr_settings.gemini_timeout,
+    ):
+        self.backend = backend
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._thread_slots = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_per_second, burst)
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.invalid = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.latency_ms = 0.0
+
+    def _validated(self, reply: GeminiReply, started: float) -> GeminiExtraction:
+        """Validate the reply JSON in one pass and record what the call cost"""
+        latency_ms = (time.perf_counter() - started) * 1000
+        self.prompt_tokens += reply.prompt_tokens
+        self.output_tokens += reply.output_tokens
+        self.latency_ms += latency_ms
+        gemini_tokens.inc(reply.prompt_tokens, kind="prompt")
+        gemini_tokens.inc(reply.output_tokens, kind="output")
+        validating = time.perf_counter()
+        try:
+            transaction = ExtractedTransaction.model_validate_json(reply.text or "{}")
+        except ValidationError:
+            self.invalid += 1
+            gemini_calls.inc(outcome="invalid")
+            raise
+        gemini_calls.inc(outcome="ok")
+        return GeminiExtraction(
+            transaction, reply.text, reply.prompt_tokens, reply.output_tokens,
+            latency_ms, (time.perf_counter() - validating) * 1000,
+        )
+
+    def _timed_out(self) -> GeminiTimeout:
+        self.timeouts += 1
+        gemini_calls.inc(outcome="timeout")
+        return GeminiTimeout(f"Gemini call exceeded {self.timeout}s")
+
+    def extract(self, image: Any, prompt: str = EXTRACTION_PROMPT) -> GeminiExtraction:
+        """Blocking call for synchronous callers (scripts, pool workers), under the same limits"""
+        self.calls += 1
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.timeout
+        if not self._thread_slots.acquire(timeout=self.timeout):
+            raise self._timed_out()
+        try:
+            wait = self._bucket.reserve()
+            if time.monotonic() + wait > deadline:
+                raise self._timed_out()
+            time.sleep(wait)
+            reply = self.backend.generate([prompt, image])
+        except GeminiTimeout:
+            raise
+        except Exception:
+            self.errors += 1
+            gemini_calls.inc(outcome="error")
+            raise
+        finally:
+            self._thread_slots.release()
+        return self._validated(reply, started)
+
+    async def _call(self, parts: list) -> GeminiReply:
+        async with self._semaphore:
+            await self._bucket.acquire()
+            return await self.backend.generate_async(parts)
+
+    async def extract_async(self, image: Any, prompt: str = EXTRACTION_PROMPT) -> GeminiExtraction:
+        self.calls += 1
+        started = time.perf_counter()
+        try:
+            reply = await asyncio.wait_for(self._call([prompt, image]), self.timeout)
+        except asyncio.TimeoutError:
+            raise self._timed_out()
+        except Exception:
+            self.errors += 1
+            gemini_calls.inc(outcome="error")
+            raise
+        return self._validated(reply, started)
+
+    def stats(self) -> dict:
+        answered = self.calls - self.timeouts - self.errors
+        return {
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "invalid": self.invalid,
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "mean_latency_ms": self.latency_ms / answered if answered else 0.0,
+        }
+
+
+class HedgeStats:
+    """Fallback starts, split by cause: `hedged` when the primary was slow,
+    `escalated` when it finished (or failed) without a valid result"""
+
+    def __init__(self):
+        self.hedged = 0
+        self.escalated = 0
+        self.fallback_wins = 0
+
+    def as_dict(self) -> dict:
+        return {"hedged": self.hedged, "escalated": self.escalated, "fallback_wins": self.fallback_wins}
+
+
+hedge_stats = HedgeStats()
+
+
+async def hedged(
+    primary: Callable[[], Awaitable[T]],
+    fallback: Callable[[], Awaitable[T]],
+    *,
+    hedge_after: float | None,
+    is_valid: Callable[[T], bool],
+    score: Callable[[T], int] | None = None,
+) -> T:
+    """Run `primary`, starting `fallback` if it is slow, fails or returns junk
+
+    The fallback starts once `primary` has been running for `hedge_after`
+    seconds (never, if None) or as soon as it finishes without a valid
+    result. The first valid result wins and the other task is cancelled. If
+    neither is valid, the primary's result is returned unless the fallback's
+    has a strictly higher `score`; if neither finished, the error is re-raised.
+    """
+    primary_task = asyncio.create_task(primary())
+    fallback_task: asyncio.Task | None = None
+    pending = {primary_task}
+    invalid: dict[asyncio.Task, T] = {}
+    error: BaseException | None = None
+
+    try:
+        while pending:
+            timeout = hedge_after if fallback_task is None else None
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    logger.warning("%s extraction failed: %r", "Fallback" if task is fallback_task else "Primary", error)
+                    continue
+                result = task.result()
+                if is_valid(result):
+                    if task is fallback_task:
+                        hedge_stats.fallback_wins += 1
+                    return result
+                invalid[task] = result
+
+            if fallback_task is None:
+                # Primary is slow (timeout elapsed) or finished without a usable result
+                if done:
+                    hedge_stats.escalated += 1
+                else:
+                    hedge_stats.hedged += 1
+                fallback_task = asyncio.create_task(fallback())
+                pending.add(fallback_task)
+
+        if primary_task in invalid and fallback_task in invalid:
+            if score is not None and score(invalid[fallback_task]) > score(invalid[primary_task]):
+                return invalid[fallback_task]
+            return invalid[primary_task]
+        if invalid:
+            return next(iter(invalid.values()))
+        raise error
+    finally:
+        for task in (primary_task, fallback_task):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+_client: GeminiClient | None = None
+
+
+def get_gemini_client() -> GeminiClient | None:
+    """Process-wide client, or None when Gemini isn't configured"""
+    global _client
+    if _client is None:
+        if ocr_settings.gemini_backend == "stub":
+            latency = ocr_settings.gemini_stub_latency
+            if ocr_settings.gemini_stub_fixture:
+                _client = GeminiClient(StubGeminiBackend.from_fixture(ocr_settings.gemini_stub_fixture, latency))
+            else:
+                _client = GeminiClient(StubGeminiBackend([GeminiReply(text=ocr_settings.gemini_stub_text)], latency))
+        elif os.getenv("GOOGLE_API_KEY"):
+            _client = GeminiClient(GenaiBackend(os.environ["GOOGLE_API_KEY"], ocr_settings.gemini_model))
+    return _client
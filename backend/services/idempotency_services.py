@@ -0,0 +1,92 @@
+"""Idempotency-Key support for endpoints that mobile clients retry
+
+The first request with a key claims it by inserting a row (the primary key
+makes that atomic across API processes) and stores its response when it
+finishes. A retry with the same key gets the stored response back without
+doing the work again. While the first request is running, retries get 409
+instead of running in parallel. The claim is a short lease, so a request
+that died mid-way doesn't block the key for the whole TTL.
+"""
+import hashlib
+import time
+
+from sqlalchemy import delete, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.idempotency_keys import IdempotencyKey
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request"""
+
+
+class IdempotencyInProgress(Exception):
+    """The request that claimed the key hasn't finished yet"""
+
+
+def request_fingerprint(*parts: bytes | str) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode() if isinstance(part, str) else part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+async def begin_async(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    key: str,
+    endpoint: str,
+    fingerprint: str,
+    lease: float,
+) -> IdempotencyKey | None:
+    """Claim `key` for this request
+
+    Returns None when the caller should handle the request (and then call
+    `finish_async` or `release_async`), or the finished record to replay.
+    """
+    now = time.time()
+    await db.execute(delete(IdempotencyKey).where(IdempotencyKey.user_id == user_id, IdempotencyKey.expires_at < now))
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    claimed = (await db.execute(
+        dialect.insert(IdempotencyKey)
+        .values(user_id=user_id, key=key, endpoint=endpoint, request_hash=fingerprint, expires_at=now + lease)
+        .on_conflict_do_nothing(index_elements=["user_id", "key"])
+    )).rowcount == 1
+    await db.commit()
+    if claimed:
+        return None
+
+    record = await db.get(IdempotencyKey, (user_id, key), populate_existing=True)
+    if record is None:
+        raise IdempotencyInProgress(key)
+    if record.endpoint != endpoint or record.request_hash != fingerprint:
+        raise IdempotencyConflict(key)
+    if record.response is None:
+        raise IdempotencyInProgress(key)
+    return record
+
+
+async def finish_async(db: AsyncSession, *, user_id: int, key: str, status_code: int, response: dict, ttl: float) -> None:
+    """Store the response to replay for `ttl` seconds"""
+    await db.execute(
+        update(IdempotencyKey)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        .values(status_code=status_code, response=response, expires_at=time.time() + ttl)
+    )
+    await db.commit()
+
+
+async def release_async(db: AsyncSession, *, user_id: int, key: str) -> None:
+    """Give the key up without storing a response, so a retry runs the request again"""
+    await db.rollback()
+    await db.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.response.is_(None)
+        )
+    )
+    await db.commit()
@@ -0,0 +1,35 @@
+"""Text keys shared by merchant matching and categorisation
+
+Kept free of database imports so OCR pool workers can use it.
+"""
+import re
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+# Legal-form words that OCR keeps or drops at random
+_STOP_WORDS = {"pvt", "private", "ltd", "limited", "llp", "inc", "co"}
+# Digits OCR reads in place of look-alike letters, fixed only inside words that also have letters
+_LOOKALIKE_DIGITS = str.maketrans("0158", "olsb")
+
+
+def _fold_word(word: str) -> str:
+    return word.translate(_LOOKALIKE_DIGITS) if not word.isdigit() and not word.isalpha() else word
+
+
+def vendor_key(name: str) -> str:
+    """'Sharma Genera1 Store Pvt. Ltd.' -> 'sharma general store'"""
+    words = _NON_ALNUM.sub(" ", name.casefold()).split()
+    return " ".join(_fold_word(word) for word in words if word not in _STOP_WORDS)
+
+
+def trigrams(value: str) -> set[str]:
+    """pg_trgm-style trigrams: each word padded with two spaces in front and one behind"""
+    grams = set()
+    for word in _NON_ALNUM.sub(" ", value.casefold()).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: set[str], b: set[str]) -> float:
+    """Shared trigrams over all trigrams, as pg_trgm's similarity()"""
+    return len(a & b) / len(a | b) if a and b else 0.0
@@ -0,0 +1,190 @@
+"""Registry of OCR engines that are imported and initialised on first use
+
+Importing this module is cheap: `tesserocr`/`pytesseract` and
+`google.generativeai` are only imported when an engine is first requested,
+or when `warmup` is called from application (or pool worker) startup.
+"""
+import importlib.util
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+from ..core.config import ocr_settings
+
+logger = logging.getLogger("ocr_engines")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+class OCREngineError(Exception):
+    """An engine couldn't be loaded or failed on an image
+
+    Carries only a message, so it always pickles back from pool workers
+    (pytesseract's own exceptions don't, and break the pool instead).
+    """
+
+
+class TesserocrEngine:
+    """A tesseract API instance kept warm for the life of the process
+
+    The language model is loaded once, and images are handed over from
+    memory instead of through a temp file and a `tesseract` subprocess.
+    The API is not thread-safe, so calls are serialised.
+    """
+    name = "tesserocr"
+
+    def __init__(self, lang: str = ocr_settings.ocr_tesseract_lang):
+        import tesserocr
+
+        self._api = tesserocr.PyTessBaseAPI(lang=lang)
+        self._lock = threading.Lock()
+
+    def image_to_string(self, image) -> str:
+        try:
+            with self._lock:
+                self._api.SetImage(image)
+                return self._api.GetUTF8Text()
+        except Exception as e:
+            raise OCREngineError(f"tesserocr failed: {e}") from None
+
+    def image_to_data(self, image) -> tuple[str, float | None]:
+        """Text and the mean word confidence (0-100)"""
+        try:
+            with self._lock:
+                self._api.SetImage(image)
+                text = self._api.GetUTF8Text()
+                confidences = [conf for conf in self._api.AllWordConfidences() if conf >= 0]
+        except Exception as e:
+            raise OCREngineError(f"tesserocr failed: {e}") from None
+        return text, sum(confidences) / len(confidences) if confidences else None
+
+
+class PytesseractEngine:
+    """Runs the `tesseract` binary per image; used when tesserocr isn't installed"""
+    name = "pytesseract"
+
+    def __init__(self, lang: str = ocr_settings.ocr_tesseract_lang):
+        import pytesseract
+
+        try:
+            pytesseract.get_tesseract_version()
+        except Exception as e:
+            raise OCREngineError(f"tesseract binary not usable: {e}") from None
+        self._pytesseract = pytesseract
+        self.lang = lang
+
+    def image_to_string(self, image) -> str:
+        try:
+            return self._pytesseract.image_to_string(image, lang=self.lang)
+        except Exception as e:
+            raise OCREngineError(f"pytesseract failed: {e}") from None
+
+    def image_to_data(self, image) -> tuple[str, float | None]:
+        """Text rebuilt line by line from word boxes, and the mean word confidence (0-100)"""
+        try:
+            data = self._pytesseract.image_to_data(image, lang=self.lang, output_type=self._pytesseract.Output.DICT)
+        except Exception as e:
+            raise OCREngineError(f"pytesseract failed: {e}") from None
+        lines: dict[tuple[int, int, int], list[str]] = {}
+        confidences = []
+        for word, conf, block, paragraph, line in zip(
+            data["text"], data["conf"], data["block_num"], data["par_num"], data["line_num"]
+        ):
+            if not word.strip():
+                continue
+            lines.setdefault((block, paragraph, line), []).append(word)
+            if float(conf) >= 0:
+                confidences.append(float(conf))
+        text = "\n".join(" ".join(words) for words in lines.values())
+        return text, sum(confidences) / len(confidences) if confidences else None
+
+
+def load_tesseract(backend: str = ocr_settings.ocr_tesseract_backend) -> TesserocrEngine | PytesseractEngine:
+    """tesserocr when it is installed (or required), else pytesseract"""
+    if backend == "tesserocr" or (backend == "auto" and importlib.util.find_spec("tesserocr")):
+        try:
+            return TesserocrEngine()
+        except Exception:
+            if backend == "tesserocr":
+                raise
+            logger.exception("tesserocr failed to initialise, falling back to pytesseract")
+    return PytesseractEngine()
+
+
+def load_gemini():
+    """The shared Gemini client, or None when Gemini isn't configured"""
+    from .gemini_client import get_gemini_client
+
+    client = get_gemini_client()
+    if client is None:
+        logger.warning("GOOGLE_API_KEY not found. Gemini integration will be disabled for local/dev runs.")
+    return client
+
+
+class OCREngineRegistry:
+    """Named engine loaders; each engine is built at most once per process"""
+
+    def __init__(self):
+        self._loaders: dict[str, Callable[[], Any]] = {}
+        self._engines: dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.load_ms: dict[str, float] = {}
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        self._loaders[name] = loader
+
+    def get(self, name: str) -> Any:
+        """Return the engine, importing and initialising it on first use"""
+        if name in self._engines:
+            return self._engines[name]
+        with self._lock:
+            if name not in self._engines:
+                started = time.perf_counter()
+                self._engines[name] = self._loaders[name]()
+                self.load_ms[name] = (time.perf_counter() - started) * 1000
+                logger.info(
+                    "Loaded OCR engine %s (%s) in %.1fms",
+                    name, getattr(self._engines[name], "name", type(self._engines[name]).__name__), self.load_ms[name],
+                )
+        return self._engines[name]
+
+    def loaded(self) -> list[str]:
+        return list(self._engines)
+
+    def warmup(self, names: list[str], strict: bool = False) -> None:
+        """Load engines ahead of the first request; failures are logged, and raised if `strict`"""
+        for name in names:
+            try:
+                self.get(name)
+            except Exception:
+                logger.exception("Failed to warm up OCR engine %s", name)
+                if strict:
+                    raise
+
+
+ocr_engines = OCREngineRegistry()
+ocr_engines.register("tesseract", load_tesseract)
+ocr_engines.register("gemini", load_gemini)
+
+
+def get_engine(name: str) -> Any:
+    return ocr_engines.get(name)
+
+
+def parse_engine_names(value: str | None) -> list[str]:
+    """'tesseract, gemini' -> ['tesseract', 'gemini']"""
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def warmup_worker(names: list[str]) -> None:
+    """Process pool initializer: load engines before the worker takes jobs
+
+    A worker that can't load its engines fails here, which breaks the pool
+    (see OCRExecutor.check_workers) rather than failing every job.
+    """
+    ocr_engines.warmup(names, strict=True)
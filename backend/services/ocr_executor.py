@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from ..core.config import settings
+from .ocr_engines import parse_engine_names, warmup_worker
+
+logger = logging.getLogger("ocr_executor")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+class OCRQueueFull(Exception):
+    """Raised when the OCR pool already has `max_queue` jobs waiting"""
+
+    def __init__(self, retry_after: int):
+        super().__init__("OCR queue is full")
+        self.retry_after = retry_after
+
+
+class OCRJobTimeout(Exception):
+    """Raised when an OCR job does not finish within the per-job timeout"""
+
+
+class OCRExecutor:
+    """Bounded process pool for blocking OCR work
+
+    At most `max_workers + max_queue` jobs are admitted at once; anything
+    beyond that is rejected immediately with `OCRQueueFull` so callers can
+    shed load instead of queueing unbounded work behind slow images.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue: int,
+        job_timeout: float,
+        retry_after: int,
+        warmup_engines: list[str] | None = None,
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.job_timeout = job_timeout
+        self.retry_after = retry_after
+        self.warmup_engines = warmup_engines or []
+        self._pool: ProcessPoolExecutor | None = None
+        self._in_flight = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def start(self) -> None:
+        if self._pool is None:
+            # spawn rather than fork: the parent is a running event loop with threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warmup_worker,
+                initargs=(self.warmup_engines,),
+            )
+            logger.info("OCR pool started (workers=%d, queue=%d)", self.max_workers, self.max_queue)
+
+    async def check_workers(self) -> None:
+        """Start a worker and wait for its engines to load; raises if they can't
+
+        Called at startup so a missing tesseract binary stops the app there,
+        instead of every OCR job failing later.
+        """
+        try:
+            await self.run(warmup_worker, self.warmup_engines)
+        except BrokenProcessPool as e:
+            raise RuntimeError(
+                f"OCR pool workers could not load {', '.join(self.warmup_engines) or 'their engines'} (see the log above)"
+            ) from e
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            logger.info("OCR pool stopped")
+
+    def _release(self, _future: Future) -> None:
+        self._in_flight -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run `fn(*args)` in the pool and await its result"""
+        if self._in_flight >= self.capacity:
+            raise OCRQueueFull(self.retry_after)
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        try:
+            job = self._pool.submit(fn, *args)
+        except BrokenProcessPool:
+            self._in_flight -= 1
+            logger.error("OCR pool is broken, it will be restarted on the next job")
+            self.shutdown()
+            raise
+        # The slot is held until the worker actually finishes, even if the
+        # caller gave up on it, so timed-out jobs still count against capacity.
+        job.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release, f))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job)), self.job_timeout)
+        except asyncio.TimeoutError:
+            job.cancel()
+            raise OCRJobTimeout(f"OCR job exceeded {self.job_timeout}s")
+        except BrokenProcessPool:
+            logger.error("OCR worker died, the pool will be restarted on the next job")
+            self.shutdown()
+            raise
+
+
+ocr_executor = OCRExecutor(
+    max_workers=settings.ocr_pool_size,
+    max_queue=settings.ocr_queue_depth,
+    job_timeout=settings.ocr_job_timeout,
+    retry_after=settings.ocr_retry_after,
+    warmup_engines=parse_engine_names(settings.ocr_pool_warmup_engines),
+)
@@ -0,0 +1,99 @@
+import time
+import uuid
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..models.ocr_jobs import OCRJob
+from ..schemas.ocr_job import OCRJob as OCRJobSchema
+
+CLAIMABLE = ("queued", "running")
+CLAIM_BATCH = 10
+
+
+def _new_job(user_id: int, image: bytes, max_attempts: int) -> OCRJob:
+    return OCRJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        status="queued",
+        image=image,
+        max_attempts=max_attempts,
+        visible_at=time.time(),
+    )
+
+
+async def enqueue_job_async(db: AsyncSession, *, user_id: int, image: bytes, max_attempts: int) -> OCRJob:
+    job = _new_job(user_id, image, max_attempts)
+    db.add(job)
+    await db.commit()
+    return job
+
+
+async def get_job_async(db: AsyncSession, job_id: str) -> OCRJob | None:
+    return await db.get(OCRJob, job_id, populate_existing=True)
+
+
+def claim_next_job(db: Session, *, visibility_timeout: float) -> OCRJob | None:
+    """Lease the oldest visible job to the caller
+
+    Queued jobs and running jobs whose lease expired are both claimable. The
+    conditional UPDATE is the actual lock, so this is safe across processes on
+    SQLite; on Postgres SKIP LOCKED also keeps workers off each other's rows.
+    """
+    now = time.time()
+    candidates = db.execute(
+        select(OCRJob.id)
+        .where(OCRJob.status.in_(CLAIMABLE), OCRJob.visible_at <= now)
+        .order_by(OCRJob.visible_at)
+        .limit(CLAIM_BATCH)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+
+    for job_id in candidates:
+        claimed = db.execute(
+            update(OCRJob)
+            .where(OCRJob.id == job_id, OCRJob.status.in_(CLAIMABLE), OCRJob.visible_at <= now)
+            .values(status="running", visible_at=now + visibility_timeout, attempts=OCRJob.attempts + 1)
+        )
+        db.commit()
+        if claimed.rowcount == 1:
+            return db.get(OCRJob, job_id, populate_existing=True)
+    db.commit()
+    return None
+
+
+def complete_job(db: Session, job: OCRJob, result: dict) -> bool:
+    """Store the result; returns False if the lease was lost to another worker"""
+    settled = db.execute(
+        update(OCRJob)
+        .where(OCRJob.id == job.id, OCRJob.status == "running", OCRJob.attempts == job.attempts)
+        .values(status="done", result=result, image=None, error=None)
+    )
+    db.commit()
+    return settled.rowcount == 1
+
+
+def fail_job(db: Session, job: OCRJob, error: str, *, retry_backoff: float) -> bool:
+    """Requeue with backoff, or mark failed once attempts are exhausted"""
+    exhausted = job.attempts >= job.max_attempts
+    values = (
+        {"status": "failed", "error": error, "image": None}
+        if exhausted
+        else {"status": "queued", "error": error, "visible_at": time.time() + retry_backoff * job.attempts}
+    )
+    settled = db.execute(
+        update(OCRJob)
+        .where(OCRJob.id == job.id, OCRJob.status == "running", OCRJob.attempts == job.attempts)
+        .values(**values)
+    )
+    db.commit()
+    return settled.rowcount == 1
+
+
+def to_schema(job: OCRJob) -> OCRJobSchema:
+    return OCRJobSchema(
+        id=job.id,
+        status=job.status,
+        attempts=job.attempts,
+        result=job.result,
+        error=job.error,
+    )
@@ -1,14 +1,22 @@
+import asyncio
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
 from datetime import date
-import pytesseract
-from PIL import Image
-import re
+import hashlib
+import io
+import json
+from PIL import Image, ImageOps
 import os
-import google.generativeai as genai
-from dotenv import load_dotenv
+import sqlite3
+import threading
+import time
+from typing import BinaryIO
+from ..core.config import ocr_settings
+from .ocr_engines import OCREngineError, get_engine
+from .upi_parser import FIELDS, parse_transaction_text, validate_transaction
+from .categorizer import categorize
 import logging
 
-load_dotenv()
-
 logger = logging.getLogger("ocr_services")
 if not logger.handlers:
     handler = logging.StreamHandler()
@@ -17,82 +25,507 @@ if not logger.handlers:
     logger.addHandler(handler)
     logger.setLevel(logging.INFO)
 
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-if not GOOGLE_API_KEY:
-    logger.warning("GOOGLE_API_KEY not found. Gemini integration will be disabled for local/dev runs.")
-else:
-    genai.configure(api_key=GOOGLE_API_KEY)
 
+class OCRResultCache:
+    """Content-addressed cache of extraction results
 
-def extract_expense_data(image_path: str | None = None) -> dict:
-    """Main function to extract expense data from image
+    Results are keyed by the SHA-256 of the uploaded bytes, so a hit never
+    needs the image to be decoded or OCR'd. An in-memory LRU tier sits in
+    front of an optional SQLite tier that survives restarts and is shared
+    between worker processes. Async callers reach the SQLite tier through
+    a thread, so a locked database never stalls the event loop; expired
+    rows are pruned every `prune_every` writes rather than on each one.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 86400, path: str | None = None, prune_every: int = 256):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.prune_every = prune_every
+        self._memory: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS ocr_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS ix_ocr_cache_created_at ON ocr_cache (created_at)")
+
+    @staticmethod
+    def key_for(data: bytes | memoryview) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _memory_get(self, key: str, now: float) -> dict | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, value = entry
+                if now - created_at < self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return dict(value)
+                del self._memory[key]
+            if not self.path:
+                self.misses += 1
+        return None
+
+    def _disk_get(self, key: str, now: float) -> dict | None:
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT value, created_at FROM ocr_cache WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error:
+            logger.exception("OCR cache read failed")
+            row = None
+        with self._lock:
+            if row is not None and now - row[1] < self.ttl_seconds:
+                value = json.loads(row[0])
+                self._remember(key, row[1], value)
+                self.hits += 1
+                self.disk_hits += 1
+                return dict(value)
+            self.misses += 1
+        return None
+
+    def _memory_put(self, key: str, value: dict) -> float:
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, dict(value))
+            self._puts += 1
+        return now
+
+    def _disk_put(self, key: str, value: dict, now: float) -> None:
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO ocr_cache (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), now),
+                )
+                if self._puts % self.prune_every == 0:
+                    conn.execute("DELETE FROM ocr_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        except sqlite3.Error:
+            logger.exception("OCR cache write failed")
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is None and self.path:
+            value = self._disk_get(key, now)
+        return value
+
+    async def get_async(self, key: str) -> dict | None:
+        now = time.time()
+        value = self._memory_get(key, now)
+        if value is None and self.path:
+            value = await asyncio.to_thread(self._disk_get, key, now)
+        return value
+
+    def put(self, key: str, value: dict) -> None:
+        now = self._memory_put(key, value)
+        if self.path:
+            self._disk_put(key, value, now)
+
+    async def put_async(self, key: str, value: dict) -> None:
+        now = self._memory_put(key, value)
+        if self.path:
+            await asyncio.to_thread(self._disk_put, key, value, now)
 
-    If `image_path` is None or Tesseract not available, this function may return
-    simulated/example data for local development.
+    def _remember(self, key: str, created_at: float, value: dict) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+
+ocr_cache = OCRResultCache(
+    max_entries=ocr_settings.ocr_cache_max_entries,
+    ttl_seconds=ocr_settings.ocr_cache_ttl_seconds,
+    path=ocr_settings.ocr_cache_path or None,
+)
+
+
+ImageSource = str | os.PathLike | bytes | bytearray | memoryview | BinaryIO
+
+# Leading bytes of the formats PIL can decode that phones actually produce
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+)
+SNIFF_BYTES = 12
+
+
+def sniff_image_type(head: bytes | memoryview) -> str | None:
+    """Return the image format from its magic bytes, or None if unrecognised"""
+    head = bytes(head[:SNIFF_BYTES])
+    for signature, kind in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def open_image(source: ImageSource) -> Image.Image:
+    """Open an image from a path, an in-memory buffer or a binary file object
+
+    Buffers are decoded in place through a BytesIO view, so uploads never
+    need to be written to disk first.
     """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return Image.open(io.BytesIO(source))
+    return Image.open(source)
 
-    # If no image provided, return simulated data for development
-    if not image_path or not os.path.exists(image_path):
-        logger.info("No image provided or file doesn't exist, returning simulated data")
+
+# Fractional (left, top, right, bottom) boxes holding payee, amount and
+# transaction ID on each app's success screen; status bar and the
+# share/done buttons at the bottom are cut away. The app isn't known until
+# after OCR, so cropping is off unless every upload comes from one app.
+CROP_REGIONS = {
+    "gpay": (0.0, 0.08, 1.0, 0.80),
+    "phonepe": (0.0, 0.06, 1.0, 0.70),
+    "paytm": (0.0, 0.08, 1.0, 0.75),
+    "default": (0.0, 0.05, 1.0, 0.80),
+}
+
+
+@dataclass
+class PreprocessOptions:
+    """Toggles for the image preprocessing stage that runs ahead of tesseract
+
+    Screenshots carry no meaningful DPI, so downscaling targets a pixel
+    width instead; ~800px keeps UPI screen text at the 20-30px glyph
+    height tesseract reads best. JPEG draft decoding only scales by 1/2,
+    1/4 or 1/8 without going under the target, so it saves work from
+    1600px wide up; 1080px screens are decoded in full and resized.
+    """
+    draft: bool = True
+    crop: bool = False
+    crop_region: str = "default"
+    grayscale: bool = True
+    downscale: bool = True
+    target_width: int = 800
+    binarize: bool = False
+    binarize_threshold: int = 160
+
+    @classmethod
+    def from_settings(cls, config=ocr_settings) -> "PreprocessOptions":
+        return cls(
+            draft=config.ocr_preprocess_draft,
+            crop=config.ocr_preprocess_crop,
+            crop_region=config.ocr_preprocess_crop_region,
+            grayscale=config.ocr_preprocess_grayscale,
+            downscale=config.ocr_preprocess_downscale,
+            target_width=config.ocr_preprocess_target_width,
+            binarize=config.ocr_preprocess_binarize,
+            binarize_threshold=config.ocr_preprocess_binarize_threshold,
+        )
+
+
+@dataclass
+class PreprocessResult:
+    image: Image.Image
+    timings: dict[str, float] = field(default_factory=dict)  # step name -> milliseconds
+
+
+def preprocess_image(image: Image.Image, options: PreprocessOptions | None = None) -> PreprocessResult:
+    """Shrink and simplify a screenshot before OCR, timing each enabled step
+
+    `image` should come straight from `open_image` (not yet loaded) so that
+    JPEG draft mode can decode at reduced scale instead of full resolution.
+    """
+    options = options or DEFAULT_PREPROCESS
+    timings: dict[str, float] = {}
+
+    def timed(step: str, fn):
+        started = time.perf_counter()
+        result = fn()
+        timings[step] = (time.perf_counter() - started) * 1000
+        return result
+
+    if options.draft and image.format == "JPEG" and options.downscale:
+        # DCT scaling picks the smallest 1/2, 1/4 or 1/8 size still >= the request
+        scale = options.target_width / image.width
+        timed("draft", lambda: image.draft("L" if options.grayscale else "RGB",
+                                           (options.target_width, int(image.height * scale))))
+    image = timed("decode", lambda: ImageOps.exif_transpose(image))
+
+    if options.crop:
+        left, top, right, bottom = CROP_REGIONS.get(options.crop_region, CROP_REGIONS["default"])
+        w, h = image.size
+        box = (int(left * w), int(top * h), int(right * w), int(bottom * h))
+        image = timed("crop", lambda: image.crop(box))
+
+    if options.grayscale and image.mode != "L":
+        image = timed("grayscale", lambda: image.convert("L"))
+
+    if options.downscale and image.width > options.target_width:
+        height = round(image.height * options.target_width / image.width)
+        image = timed("downscale", lambda: image.resize((options.target_width, height), Image.Resampling.BILINEAR, reducing_gap=2.0))
+
+    if options.binarize:
+        threshold = options.binarize_threshold
+        image = timed("binarize", lambda: image.convert("L").point(lambda p: 255 if p > threshold else 0, mode="1"))
+
+    return PreprocessResult(image=image, timings=timings)
+
+
+DEFAULT_PREPROCESS = PreprocessOptions.from_settings()
+
+
+def simulated_expense_data() -> dict:
+    return {
+        "vendor": "Demo Merchant",
+        "amount": "350.00",
+        "id": "TXN123456789",
+        "date": date.today().isoformat(),
+        "category": "Other",
+        "payment_method": "UPI",
+        "raw_text": "Simulated OCR output"
+    }
+
+
+def tesseract_text(image: Image.Image, timings: dict[str, float]) -> tuple[str, float | None]:
+    """Preprocess (if enabled) and OCR an opened image, recording step timings
+
+    Returns the text and tesseract's mean word confidence.
+    """
+    if ocr_settings.ocr_preprocess:
+        prepared = preprocess_image(image)
+        timings.update(prepared.timings)
+        image = prepared.image
+    started = time.perf_counter()
+    text, confidence = get_engine("tesseract").image_to_data(image)
+    timings["tesseract"] = (time.perf_counter() - started) * 1000
+    return text, confidence
+
+
+def _expense_data(parsed: dict, text: str | None, timings: dict[str, float], engine: str, confidence: float | None) -> dict:
+    """The expense data dict for parsed fields, with fallbacks for the missing ones"""
+    return {
+        "vendor": parsed["vendor"] or "Unknown",
+        "amount": parsed["amount"] or "0.00",
+        "id": parsed["id"] or "",
+        "date": parsed["date"] or date.today().isoformat(),
+        "provider": parsed["provider"],
+        "category": categorize(parsed["vendor"], text),
+        "payment_method": "UPI",
+        "raw_text": text,
+        "engine": engine,
+        "confidence": confidence,
+        "issues": validate_transaction(parsed),
+        "timings": timings
+    }
+
+
+def expense_data_from_text(text: str | None, timings: dict[str, float], engine: str, confidence: float | None = None) -> dict:
+    """Parse OCR text into the expense data dict, with fallbacks for missing fields
+
+    `issues` lists the fields that were missing or implausible before the
+    fallbacks were applied.
+    """
+    logger.info("Extracted text length=%d (engine=%s)", len(text) if text else 0, engine)
+
+    # Provider-aware parsing (may miss fields on some screenshots)
+    try:
+        started = time.perf_counter()
+        parsed = parse_transaction_text(text or "")
+        data = _expense_data(parsed, text, timings, engine, confidence)
+        timings["parse"] = (time.perf_counter() - started) * 1000
+        return data
+    except Exception:
+        logger.exception("Error parsing OCR text")
         return {
-            "vendor": "Demo Merchant",
-            "amount": "350.00",
-            "id": "TXN123456789",
+            "vendor": "Unknown",
+            "amount": "0.00",
+            "id": "",
             "date": date.today().isoformat(),
             "category": "Other",
             "payment_method": "UPI",
-            "raw_text": "Simulated OCR output"
+            "raw_text": text,
+            "engine": engine,
+            "confidence": confidence,
+            "issues": list(FIELDS),
+            "timings": timings
+        }
+
+
+def expense_data_from_extraction(extraction, timings: dict[str, float]) -> dict:
+    """Expense data from Gemini's structured reply (a GeminiExtraction)
+
+    The reply was validated against the schema when it arrived, so there is
+    no text to parse; the JSON itself is kept as the raw text.
+    """
+    timings["gemini"] = extraction.latency_ms
+    timings["parse"] = extraction.validate_ms
+    transaction = extraction.transaction
+    parsed = {
+        "provider": transaction.payment_app,
+        "vendor": transaction.vendor,
+        "amount": transaction.amount,
+        "id": transaction.transaction_id,
+        "date": transaction.date,
+    }
+    data = _expense_data(parsed, extraction.text, timings, "gemini", None)
+    data["tokens"] = {"prompt": extraction.prompt_tokens, "output": extraction.output_tokens}
+    return data
+
+
+def has_required_fields(data: dict) -> bool:
+    """Whether an extraction found an amount, i.e. is worth keeping over a fallback"""
+    return bool(data) and data.get("amount") not in (None, "", "0.00")
+
+
+# Cascade: tesseract reads every image; the LLM only sees the ones it can't be trusted on
+
+
+class CascadeStats:
+    def __init__(self):
+        self.accepted = 0
+        self.escalated = 0
+        self.reasons: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, reasons: list[str]) -> None:
+        with self._lock:
+            if reasons:
+                self.escalated += 1
+                self.reasons.update(reasons)
+            else:
+                self.accepted += 1
+
+    def as_dict(self) -> dict:
+        total = self.accepted + self.escalated
+        return {
+            "accepted": self.accepted,
+            "escalated": self.escalated,
+            "escalation_rate": self.escalated / total if total else 0.0,
+            "reasons": dict(self.reasons),
         }
 
+
+cascade_stats = CascadeStats()
+
+
+def escalation_reasons(data: dict) -> list[str]:
+    """Why a tesseract result shouldn't be returned without asking the LLM; empty if it can"""
+    if not data:
+        return ["tesseract_failed"]
+    reasons = [f"invalid_{name}" for name in data.get("issues", ()) if name in ocr_settings.cascade_required_fields]
+    confidence = data.get("confidence")
+    if confidence is None or confidence < ocr_settings.ocr_cascade_min_confidence:
+        reasons.append("low_confidence")
+    return reasons
+
+
+def required_field_count(data: dict) -> int:
+    """How many of the cascade's required fields an extraction read cleanly"""
+    if not data:
+        return 0
+    issues = set(data.get("issues", ()))
+    return sum(name not in issues for name in ocr_settings.cascade_required_fields)
+
+
+def is_trusted(data: dict) -> bool:
+    """A clean tesseract read, or an LLM read that found an amount"""
+    if data.get("engine") == "tesseract":
+        return not escalation_reasons(data)
+    return has_required_fields(data)
+
+
+def tesseract_expense_data(image: Image.Image, timings: dict[str, float]) -> dict:
+    text, confidence = tesseract_text(image, timings)
+    return expense_data_from_text(text, timings, "tesseract", confidence)
+
+
+def extract_with_tesseract(image: ImageSource) -> dict:
+    """Decode, OCR with tesseract and parse; never calls the LLM
+
+    Top-level so it can run in the OCR process pool; failures come back
+    as OCREngineError, which always unpickles in the parent.
+    """
+    try:
+        image = open_image(image)
+    except Exception:
+        logger.exception("Error opening image for OCR")
+        return {}
+    try:
+        return tesseract_expense_data(image, {})
+    except OCREngineError:
+        raise
+    except Exception as e:
+        # Whatever failed, send back something the parent can unpickle
+        raise OCREngineError(f"{type(e).__name__}: {e}") from None
+
+
+def extract_expense_data(image: ImageSource | None = None) -> dict:
+    """Main function to extract expense data from image
+
+    `image` may be a file path, raw bytes/memoryview or a binary file object.
+    If it is None (or a path that doesn't exist) or Tesseract not available,
+    this function may return simulated/example data for local development.
+    """
+
+    # If no image provided, return simulated data for development
+    if image is None or (isinstance(image, (str, os.PathLike)) and not os.path.exists(image)):
+        logger.info("No image provided or file doesn't exist, returning simulated data")
+        return simulated_expense_data()
+
     # Try to open the image and run OCR
     try:
-        image = Image.open(image_path)
+        image = open_image(image)
     except Exception as e:
         logger.exception("Error opening image for OCR")
         return {}
 
-    # If Google generative model is configured, prefer it (experimental)
-    if GOOGLE_API_KEY:
+    timings: dict[str, float] = {}
+
+    client = get_engine("gemini")
+    if client is None:
+        return tesseract_expense_data(image, timings)
+
+    data: dict = {}
+    if ocr_settings.ocr_cascade:
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
-            prompt = (
-                "Extract vendor, amount, transaction id and date from this payment confirmation image."
-            )
-            response = model.generate_content([prompt, image])
-            text = getattr(response, 'text', '')
-            logger.info("Gemini response received")
+            data = tesseract_expense_data(image, timings)
         except Exception:
-            logger.exception("Gemini extraction failed, falling back to pytesseract")
-            text = pytesseract.image_to_string(image)
-    else:
-        text = pytesseract.image_to_string(image)
-
-    logger.info("Extracted text length=%d", len(text) if text else 0)
+            logger.exception("Tesseract extraction failed, escalating to Gemini")
+        reasons = escalation_reasons(data)
+        cascade_stats.record(reasons)
+        if not reasons:
+            return data
+        logger.info("Escalating to Gemini: %s", ", ".join(reasons))
 
-    # Best-effort regex parsing (may fail for some screenshots)
     try:
-        vendor = re.search(r'Vendor Name:\s*(.*)', text)
-        amount = re.search(r'Amount:\s*([\d.,]+)', text)
-        txn_id = re.search(r'Transaction ID:\s*(.*)', text)
-        txn_date = re.search(r'Date of Transaction:\s*(.*)', text)
-
-        return {
-            "vendor": vendor.group(1).strip() if vendor else "Unknown",
-            "amount": amount.group(1).strip() if amount else "0.00",
-            "id": txn_id.group(1).strip() if txn_id else "",
-            "date": txn_date.group(1).strip() if txn_date else date.today().isoformat(),
-            "category": "Other",
-            "payment_method": "UPI",
-            "raw_text": text
-        }
+        llm_data = expense_data_from_extraction(client.extract(image), timings)
+        logger.info("Gemini response received")
+        if has_required_fields(llm_data) or not data:
+            return llm_data
     except Exception:
-        logger.exception("Error parsing OCR text")
-        return {
-            "vendor": "Unknown",
-            "amount": "0.00",
-            "id": "",
-            "date": date.today().isoformat(),
-            "category": "Other",
-            "payment_method": "UPI",
-            "raw_text": text
-        }
\ No newline at end of file
+        logger.exception("Gemini extraction failed, falling back to pytesseract")
+
+    # Cascade mode already has the tesseract read (or knows it failed)
+    return data if ocr_settings.ocr_cascade else tesseract_expense_data(image, timings)
@@ -0,0 +1,68 @@
+import base64
+import json
+from datetime import date
+from sqlalchemy import ColumnElement, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor can't be decoded"""
+
+
+def encode_cursor(sort_value: date, row_id: int) -> str:
+    """Opaque cursor for the last row of a page ordered by (date DESC, id DESC)"""
+    raw = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[date, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        return date.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid pagination cursor") from e
+
+
+def parse_fields(fields: str | None, allowed: tuple[str, ...], default: tuple[str, ...]) -> list[str]:
+    """Validate a comma-separated `fields` projection against the allowed columns"""
+    if not fields:
+        return list(default)
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(requested) - set(allowed))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(requested))
+
+
+async def fetch_page(
+    db: AsyncSession,
+    columns: dict[str, ColumnElement],
+    criteria: list[ColumnElement],
+    *,
+    sort_column: ColumnElement,
+    id_column: ColumnElement,
+    cursor: str | None,
+    limit: int,
+) -> tuple[list[dict], str | None]:
+    """Fetch one keyset page of `columns`, newest first
+
+    Seeking past the cursor with a row-value comparison lets the
+    (user_id, date, id) index serve every page at the same cost, unlike OFFSET.
+    """
+    query = select(
+        *(column.label(name) for name, column in columns.items()),
+        sort_column.label("_cursor_date"),
+        id_column.label("_cursor_id"),
+    ).where(*criteria)
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        query = query.where(tuple_(sort_column, id_column) < tuple_(after_date, after_id))
+    query = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+
+    rows = (await db.execute(query)).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last["_cursor_date"], last["_cursor_id"])
+    return [{name: row[name] for name in columns} for row in rows[:limit]], next_cursor
@@ -1,7 +1,22 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import date
 from ..models.payments import Payment
 from ..schemas.payments import Payment as PaymentSchema
+from .pagination import fetch_page
+from .raw_text_services import resolve_raw_text_async, store_raw_texts
+
+# Columns a listing may project, by response field name
+PAYMENT_COLUMNS = {
+    "id": Payment.id,
+    "user_id": Payment.user_id,
+    "amount": Payment.amount,
+    "payment_date": Payment.payement_date,
+    "transanction_Id": Payment.transanction_Id,
+    "raw_text": Payment.raw_text_digest,  # resolved to the text after the page is fetched
+    "created_at": Payment.created_at,
+}
+DEFAULT_PAYMENT_FIELDS = ("id", "amount", "payment_date", "transanction_Id")
 
 
 def create_payment(
@@ -10,17 +25,15 @@ def create_payment(
     user_id: int,
     amount: float,
     payment_date: date,
-    payment_method: str,
-    payment_status: str,
+    transaction_id: str | None,
     raw_text: str,
 ) -> Payment:
     payment = Payment(
         user_id=user_id,
         amount=amount,
-        payment_date=payment_date,
-        payment_method=payment_method,
-        payment_status=payment_status,
-        raw_text=raw_text,
+        payement_date=payment_date,
+        transanction_Id=transaction_id or None,
+        raw_text_digest=store_raw_texts(db, [raw_text])[0],
     )
     db.add(payment)
     db.commit()
@@ -28,15 +41,42 @@ def create_payment(
     return payment
 
 
-def to_schema(payment: Payment) -> PaymentSchema:
+async def list_payments(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    fields: list[str],
+    start_date: date | None = None,
+    end_date: date | None = None,
+    cursor: str | None = None,
+    limit: int = 50,
+) -> tuple[list[dict], str | None]:
+    criteria = [Payment.user_id == user_id]
+    if start_date:
+        criteria.append(Payment.payement_date >= start_date)
+    if end_date:
+        criteria.append(Payment.payement_date <= end_date)
+
+    items, next_cursor = await fetch_page(
+        db,
+        {name: PAYMENT_COLUMNS[name] for name in fields},
+        criteria,
+        sort_column=Payment.payement_date,
+        id_column=Payment.id,
+        cursor=cursor,
+        limit=limit,
+    )
+    return await resolve_raw_text_async(db, items), next_cursor
+
+
+def to_schema(payment: Payment, raw_text: str | None = None) -> PaymentSchema:
+    """`raw_text` is left out unless the caller already has it (it lives in raw_texts)"""
     return PaymentSchema(
         id=payment.id,
         user_id=payment.user_id,
         amount=float(payment.amount),
-        payment_date=payment.payment_date,
-        payment_method=payment.payment_method,
-        payment_status=payment.payment_status,
-        raw_text=payment.raw_text,
+        payment_date=payment.payement_date,
+        transanction_Id=payment.transanction_Id or "",
+        raw_text=raw_text,
     )
 
-
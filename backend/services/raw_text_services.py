@@ -0,0 +1,143 @@
+"""Content-addressed, compressed storage for raw OCR text
+
+Rows in `expenses` and `payments` carry the sha256 digest of their OCR text
+instead of the text itself. Texts are written once per distinct digest
+(INSERT ... ON CONFLICT DO NOTHING) and are only read and decompressed when
+a caller asks for them.
+
+zstd is used when the `zstandard` package is installed, zlib otherwise;
+each row records its codec, so both can be read back whatever the writer
+used.
+"""
+import hashlib
+import importlib.util
+import zlib
+from typing import Iterable
+
+from sqlalchemy import delete, select, union
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import ocr_settings
+from ..models.expenses import Expense
+from ..models.payments import Payment
+from ..models.raw_texts import RawText
+
+ZSTD_LEVEL = 3
+ZLIB_LEVEL = 6
+
+
+def _zstd():
+    import zstandard
+    return zstandard
+
+
+def default_codec() -> str:
+    if ocr_settings.raw_text_codec != "auto":
+        return ocr_settings.raw_text_codec
+    return "zstd" if importlib.util.find_spec("zstandard") is not None else "zlib"
+
+
+def digest_of(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def encode(text: str, codec: str | None = None) -> tuple[str, bytes]:
+    """(codec, stored bytes); short texts that don't shrink are kept as-is"""
+    raw = text.encode("utf-8")
+    codec = codec or default_codec()
+    if codec == "zstd":
+        data = _zstd().ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    else:
+        codec, data = "zlib", zlib.compress(raw, ZLIB_LEVEL)
+    if len(data) >= len(raw):
+        return "plain", raw
+    return codec, data
+
+
+def decode(codec: str, data: bytes) -> str:
+    if codec == "zstd":
+        raw = _zstd().ZstdDecompressor().decompress(data)
+    elif codec == "zlib":
+        raw = zlib.decompress(data)
+    else:
+        raw = data
+    return raw.decode("utf-8")
+
+
+def _blob_rows(texts: Iterable[str | None]) -> tuple[list[str | None], list[dict]]:
+    """Digest per text (None for empty) and one row per distinct text"""
+    digests, rows = [], {}
+    for text in texts:
+        if not text:
+            digests.append(None)
+            continue
+        digest = digest_of(text)
+        digests.append(digest)
+        if digest not in rows:
+            codec, data = encode(text)
+            rows[digest] = {"digest": digest, "codec": codec, "data": data, "size": len(text.encode("utf-8"))}
+    return digests, list(rows.values())
+
+
+def _insert_missing(dialect_name: str):
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    return dialect.insert(RawText).on_conflict_do_nothing(index_elements=["digest"])
+
+
+def store_raw_texts(db: Session, texts: Iterable[str | None]) -> list[str | None]:
+    """Write any texts not already stored, inside the caller's transaction (no commit); returns their digests"""
+    digests, rows = _blob_rows(texts)
+    if rows:
+        db.execute(_insert_missing(db.get_bind().dialect.name), rows)
+    return digests
+
+
+async def store_raw_texts_async(db: AsyncSession, texts: Iterable[str | None]) -> list[str | None]:
+    """Async variant of `store_raw_texts`"""
+    digests, rows = _blob_rows(texts)
+    if rows:
+        await db.execute(_insert_missing(db.bind.dialect.name), rows)
+    return digests
+
+
+def _load_query(digests: set[str]):
+    return select(RawText.digest, RawText.codec, RawText.data).where(RawText.digest.in_(digests))
+
+
+async def load_raw_texts_async(db: AsyncSession, digests: Iterable[str | None]) -> dict[str, str]:
+    """Digest -> text for the given digests, in one query"""
+    wanted = {digest for digest in digests if digest}
+    if not wanted:
+        return {}
+    return {digest: decode(codec, data) for digest, codec, data in await db.execute(_load_query(wanted))}
+
+
+async def resolve_raw_text_async(db: AsyncSession, items: list[dict]) -> list[dict]:
+    """Replace the digests in listed rows' `raw_text` field with the text itself"""
+    if not items or "raw_text" not in items[0]:
+        return items
+    texts = await load_raw_texts_async(db, (item["raw_text"] for item in items))
+    for item in items:
+        item["raw_text"] = texts.get(item["raw_text"], "")
+    return items
+
+
+def prune_raw_texts(db: Session) -> int:
+    """Delete texts no expense or payment refers to any more; returns rows removed
+
+    A save that reuses a text between its INSERT and its commit can race
+    with this, so run it from maintenance jobs, not request handlers.
+    """
+    referenced = union(
+        select(Expense.raw_text_digest).where(Expense.raw_text_digest.is_not(None)),
+        select(Payment.raw_text_digest).where(Payment.raw_text_digest.is_not(None)),
+    )
+    try:
+        removed = db.execute(delete(RawText).where(RawText.digest.not_in(referenced))).rowcount
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return removed
@@ -0,0 +1,147 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+from typing import Iterable
+from sqlalchemy import delete, func, insert, literal_column, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..models.expenses import Expense
+from ..models.expense_rollups import ExpenseRollup
+
+RollupKey = tuple[int, date, str, str]  # user_id, month, category, merchant (or vendor)
+GROUP_COLUMNS = {
+    "month": ExpenseRollup.month,
+    "category": ExpenseRollup.category,
+    "vendor": ExpenseRollup.vendor,
+}
+
+
+def month_of(day: date) -> date:
+    return day.replace(day=1)
+
+
+def rollup_vendor(merchant: str | None, vendor: str) -> str:
+    """What an expense is bucketed under: its canonical merchant, else the vendor as read"""
+    return merchant or vendor
+
+
+def expense_deltas(
+    expenses: Iterable[tuple[int, date, str, str, float | Decimal]],
+    sign: int = 1,
+) -> dict[RollupKey, list]:
+    """Fold (user_id, expense_date, category, rollup vendor, amount) rows into per-bucket deltas"""
+    deltas: dict[RollupKey, list] = defaultdict(lambda: [Decimal("0"), 0])
+    for user_id, expense_date, category, vendor, amount in expenses:
+        bucket = deltas[(user_id, month_of(expense_date), category, vendor)]
+        bucket[0] += sign * Decimal(str(amount))
+        bucket[1] += sign
+    return deltas
+
+
+def merge_deltas(*parts: dict[RollupKey, list]) -> dict[RollupKey, list]:
+    merged: dict[RollupKey, list] = defaultdict(lambda: [Decimal("0"), 0])
+    for part in parts:
+        for key, (total, count) in part.items():
+            merged[key][0] += total
+            merged[key][1] += count
+    return merged
+
+
+def _upsert(dialect_name: str, deltas: dict[RollupKey, list]):
+    """INSERT ... ON CONFLICT DO UPDATE adding each delta to its bucket"""
+    dialect = postgresql if dialect_name == "postgresql" else sqlite
+    statement = dialect.insert(ExpenseRollup)
+    statement = statement.on_conflict_do_update(
+        index_elements=["user_id", "month", "category", "vendor"],
+        set_={
+            "total": ExpenseRollup.total + statement.excluded.total,
+            "count": ExpenseRollup.count + statement.excluded.count,
+        },
+    )
+    params = [
+        {"user_id": user_id, "month": month, "category": category, "vendor": vendor, "total": total, "count": count}
+        for (user_id, month, category, vendor), (total, count) in deltas.items()
+        if count or total
+    ]
+    return statement, params
+
+
+def apply_rollup_deltas(db: Session, deltas: dict[RollupKey, list]) -> None:
+    """Add deltas to the rollup table inside the caller's transaction (no commit)"""
+    statement, params = _upsert(db.get_bind().dialect.name, deltas)
+    if params:
+        db.execute(statement, params)
+
+
+async def apply_rollup_deltas_async(db: AsyncSession, deltas: dict[RollupKey, list]) -> None:
+    """Async variant of `apply_rollup_deltas`"""
+    statement, params = _upsert(db.bind.dialect.name, deltas)
+    if params:
+        await db.execute(statement, params)
+
+
+def rebuild_rollups(db: Session, user_id: int | None = None) -> int:
+    """Recompute rollups from `expenses` with one INSERT ... SELECT ... GROUP BY
+
+    Buckets are keyed on coalesce(merchant, vendor), as `rollup_vendor`
+    does for incremental updates. Returns the number of buckets written. Runs in a single transaction, so
+    readers never see a half-built table.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        month = func.date_trunc("month", Expense.expense_date).cast(ExpenseRollup.month.type)
+    else:
+        month = func.date(Expense.expense_date, literal_column("'start of month'"))
+
+    vendor = func.coalesce(Expense.merchant, Expense.vendor)
+    source = select(
+        Expense.user_id,
+        month.label("month"),
+        Expense.category,
+        vendor.label("vendor"),
+        func.sum(Expense.amount),
+        func.count(),
+    ).group_by(Expense.user_id, month, Expense.category, vendor)
+
+    clear = delete(ExpenseRollup)
+    if user_id is not None:
+        source = source.where(Expense.user_id == user_id)
+        clear = clear.where(ExpenseRollup.user_id == user_id)
+
+    try:
+        db.execute(clear)
+        written = db.execute(
+            insert(ExpenseRollup).from_select(
+                ["user_id", "month", "category", "vendor", "total", "count"], source
+            )
+        ).rowcount
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return written
+
+
+async def get_spend_summary(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    group_by: str,
+    start_month: date | None = None,
+    end_month: date | None = None,
+) -> list[dict]:
+    """Spend totals grouped by month, category or vendor, read from the rollups only"""
+    column = GROUP_COLUMNS[group_by]
+    query = (
+        select(column.label("key"), func.sum(ExpenseRollup.total).label("total"),
+               func.sum(ExpenseRollup.count).label("count"))
+        .where(ExpenseRollup.user_id == user_id, ExpenseRollup.count > 0)
+        .group_by(column)
+        .order_by(column)
+    )
+    if start_month:
+        query = query.where(ExpenseRollup.month >= month_of(start_month))
+    if end_month:
+        query = query.where(ExpenseRollup.month <= month_of(end_month))
+    rows = (await db.execute(query)).mappings().all()
+    return [{"key": row["key"], "total": float(row["total"]), "count": row["count"]} for row in rows]
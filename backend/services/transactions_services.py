@@ -0,0 +1,204 @@
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..models.expenses import Expense
+from ..models.payments import Payment
+from ..schemas.expense import ExpenseCreate, Expense as ExpenseSchema
+from ..schemas.payments import PaymentCreate, Payment as PaymentSchema
+from .rollup_services import apply_rollup_deltas, apply_rollup_deltas_async, expense_deltas, rollup_vendor
+from .vendor_services import canonical_merchants, canonical_merchants_async
+from .raw_text_services import load_raw_texts_async, store_raw_texts, store_raw_texts_async
+
+
+def _expense_row(user_id: int, expense: ExpenseCreate, merchant: str | None, raw_text_digest: str | None) -> dict:
+    return {
+        "user_id": user_id,
+        "vendor": expense.vendor,
+        "merchant": merchant,
+        "amount": expense.amount,
+        "expense_date": expense.expense_date,
+        "category": expense.category,
+        "raw_text_digest": raw_text_digest,
+    }
+
+
+def _payment_row(user_id: int, payment: PaymentCreate, raw_text_digest: str | None) -> dict:
+    return {
+        "user_id": user_id,
+        "amount": payment.amount,
+        "payement_date": payment.payment_date,
+        "transanction_Id": payment.transanction_Id or None,
+        "raw_text_digest": raw_text_digest,
+    }
+
+
+def _saved_pair(
+    user_id: int,
+    expense: ExpenseCreate,
+    payment: PaymentCreate,
+    expense_id: int,
+    payment_id: int,
+    merchant: str | None,
+) -> tuple[ExpenseSchema, PaymentSchema]:
+    return (
+        ExpenseSchema(id=expense_id, user_id=user_id, merchant=merchant, **expense.model_dump()),
+        PaymentSchema(
+            id=payment_id,
+            user_id=user_id,
+            **payment.model_dump(exclude={"transanction_Id"}),
+            transanction_Id=payment.transanction_Id or "",
+        ),
+    )
+
+
+def _raw_texts(pairs: list[tuple[ExpenseCreate, PaymentCreate]]) -> list[str]:
+    """Expense and payment text of each pair, interleaved; usually the same screenshot, stored once"""
+    return [text for expense, payment in pairs for text in (expense.raw_text, payment.raw_text)]
+
+
+def _deltas(user_id: int, expenses: list[ExpenseCreate], merchants: list[str | None]) -> dict:
+    return expense_deltas(
+        (user_id, expense.expense_date, expense.category, rollup_vendor(merchant, expense.vendor), expense.amount)
+        for expense, merchant in zip(expenses, merchants)
+    )
+
+
+def create_expense_with_payment(
+    db: Session,
+    *,
+    user_id: int,
+    expense: ExpenseCreate,
+    payment: PaymentCreate,
+) -> tuple[ExpenseSchema, PaymentSchema]:
+    """Insert an expense and its payment atomically
+
+    One INSERT ... RETURNING per table and a single commit; either both rows
+    exist afterwards or neither does.
+    """
+    try:
+        merchant = canonical_merchants(db, user_id, [expense.vendor])[0]
+        expense_text, payment_text = store_raw_texts(db, [expense.raw_text, payment.raw_text])
+        saved_expense = db.execute(
+            insert(Expense).returning(Expense.id), _expense_row(user_id, expense, merchant, expense_text)
+        ).scalar_one()
+        saved_payment = db.execute(
+            insert(Payment).returning(Payment.id), _payment_row(user_id, payment, payment_text)
+        ).scalar_one()
+        apply_rollup_deltas(db, _deltas(user_id, [expense], [merchant]))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return _saved_pair(user_id, expense, payment, saved_expense, saved_payment, merchant)
+
+
+async def create_expense_with_payment_async(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    expense: ExpenseCreate,
+    payment: PaymentCreate,
+) -> tuple[ExpenseSchema, PaymentSchema]:
+    """Async variant of `create_expense_with_payment`"""
+    try:
+        merchant = (await canonical_merchants_async(db, user_id, [expense.vendor]))[0]
+        expense_text, payment_text = await store_raw_texts_async(db, [expense.raw_text, payment.raw_text])
+        saved_expense = (await db.execute(
+            insert(Expense).returning(Expense.id), _expense_row(user_id, expense, merchant, expense_text)
+        )).scalar_one()
+        saved_payment = (await db.execute(
+            insert(Payment).returning(Payment.id), _payment_row(user_id, payment, payment_text)
+        )).scalar_one()
+        await apply_rollup_deltas_async(db, _deltas(user_id, [expense], [merchant]))
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return _saved_pair(user_id, expense, payment, saved_expense, saved_payment, merchant)
+
+
+def bulk_create_expenses_with_payments(
+    db: Session,
+    *,
+    user_id: int,
+    pairs: list[tuple[ExpenseCreate, PaymentCreate]],
+) -> list[tuple[int, int]]:
+    """Insert many expense/payment pairs in one transaction
+
+    Rows go out as multi-row INSERT ... VALUES ... RETURNING batches, and
+    the returned ids come back in the order of `pairs`.
+    """
+    if not pairs:
+        return []
+    try:
+        merchants = canonical_merchants(db, user_id, [expense.vendor for expense, _ in pairs])
+        digests = store_raw_texts(db, _raw_texts(pairs))
+        expense_ids = db.scalars(
+            insert(Expense).returning(Expense.id, sort_by_parameter_order=True),
+            [
+                _expense_row(user_id, expense, merchant, digest)
+                for (expense, _), merchant, digest in zip(pairs, merchants, digests[0::2])
+            ],
+        ).all()
+        payment_ids = db.scalars(
+            insert(Payment).returning(Payment.id, sort_by_parameter_order=True),
+            [_payment_row(user_id, payment, digest) for (_, payment), digest in zip(pairs, digests[1::2])],
+        ).all()
+        apply_rollup_deltas(db, _deltas(user_id, [expense for expense, _ in pairs], merchants))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return list(zip(expense_ids, payment_ids))
+
+
+async def find_recorded_transaction_async(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    transaction_id: str | None,
+) -> tuple[ExpenseSchema | None, PaymentSchema] | None:
+    """The expense/payment pair already saved for a UPI transaction id, if any
+
+    The payment is a unique-index lookup on (user_id, transanction_Id). The
+    expense saved alongside it shares its OCR text, amount and date.
+    """
+    if not transaction_id:
+        return None
+    payment = await db.scalar(
+        select(Payment).where(Payment.user_id == user_id, Payment.transanction_Id == transaction_id)
+    )
+    if payment is None:
+        return None
+    expense = await db.scalar(
+        select(Expense)
+        .where(
+            Expense.user_id == user_id,
+            Expense.raw_text_digest == payment.raw_text_digest,
+            Expense.amount == payment.amount,
+            Expense.expense_date == payment.payement_date,
+        )
+        .order_by(Expense.id)
+        .limit(1)
+    )
+    raw_text = (await load_raw_texts_async(db, [payment.raw_text_digest])).get(payment.raw_text_digest, "")
+    payment_schema = PaymentSchema(
+        id=payment.id,
+        user_id=user_id,
+        amount=float(payment.amount),
+        payment_date=payment.payement_date,
+        transanction_Id=payment.transanction_Id,
+        raw_text=raw_text,
+    )
+    if expense is None:
+        return None, payment_schema
+    return ExpenseSchema(
+        id=expense.id,
+        user_id=user_id,
+        vendor=expense.vendor,
+        merchant=expense.merchant,
+        amount=float(expense.amount),
+        expense_date=expense.expense_date,
+        category=expense.category,
+        raw_text=raw_text,
+    ), payment_schema
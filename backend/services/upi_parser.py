@@ -0,0 +1,202 @@
+"""Provider-aware parsing of OCR text from UPI payment screenshots
+
+Every pattern is compiled once at import. A parse detects the provider with
+a single search, then walks the text once with that provider's combined
+field regex, keeping the highest-priority match for each field.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+FIELDS = ("vendor", "amount", "id", "date")
+
+# OCR routinely reads the rupee sign as one of these
+CURRENCY = r"(?:₹|Rs\.?|INR|Z|%)"
+# Grouped amounts need at least one comma and can't stop inside a longer number; "1500" takes the plain branch
+NUMBER = r"\d{1,3}(?:,\d{2,3})+(?:\.\d{1,2})?(?![\d,])|\d+(?:\.\d{1,2})?"
+MONTHS = {
+    name: index
+    for index, names in enumerate(
+        (("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+         ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+         ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"), ("dec", "december")),
+        start=1,
+    )
+    for name in names
+}
+MONTH = r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sept?(?:ember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+DATE_TEXT = (
+    rf"\d{{1,2}}\s+{MONTH}\b\.?,?(?:\s+\d{{4}})?"   # 12 Oct 2025 / 12 Oct
+    rf"|\b{MONTH}\.?\s+\d{{1,2}},?\s+\d{{4}}"       # Oct 12, 2025
+    r"|\d{4}-\d{2}-\d{2}"                            # 2025-10-12
+    r"|\d{1,2}[/-]\d{1,2}[/-]\d{2,4}"                # 12/10/2025
+)
+
+# UPI refs are 12 digits, PhonePe ids start with T, other apps use long alphanumerics
+# with at least one digit (so words like "Transaction" aren't ids)
+TRANSACTION_ID = re.compile(r"\d{12}|T\d{10,}|(?=[A-Z0-9]*\d)[A-Z0-9]{10,35}", re.IGNORECASE)
+MAX_AMOUNT = 1_000_000
+MAX_AGE_DAYS = 3650
+
+_DAY_MONTH_YEAR = re.compile(rf"(\d{{1,2}})\s+({MONTH})\.?,?(?:\s+(\d{{4}}))?", re.IGNORECASE)
+_MONTH_DAY_YEAR = re.compile(rf"({MONTH})\.?\s+(\d{{1,2}}),?\s+(\d{{4}})", re.IGNORECASE)
+_ISO = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+_NUMERIC = re.compile(r"(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})")
+
+
+@dataclass(frozen=True)
+class ProviderTemplate:
+    """Compiled field patterns for one payment app
+
+    `compile` takes each field's alternatives in priority order and joins
+    them into one regex. Every alternative has exactly one capturing group,
+    `(?P<value>...)`, which is renamed so the match tells us its field.
+    """
+    name: str
+    pattern: re.Pattern
+    group_fields: dict[str, tuple[str, int]]  # group name -> (field, priority)
+
+    @classmethod
+    def compile(cls, name: str, fields: dict[str, list[str]]) -> "ProviderTemplate":
+        alternatives = []
+        group_fields = {}
+        for field, patterns in fields.items():
+            for priority, pattern in enumerate(patterns):
+                group = f"{field}_{priority}"
+                alternatives.append(pattern.replace("(?P<value>", f"(?P<{group}>"))
+                group_fields[group] = (field, priority)
+        combined = re.compile("|".join(alternatives), re.IGNORECASE | re.MULTILINE)
+        return cls(name=name, pattern=combined, group_fields=group_fields)
+
+
+# Shared alternatives, tried after each provider's own labels
+_AMOUNT = rf"{CURRENCY}\s?(?P<value>{NUMBER})"
+_DATE = rf"(?P<value>{DATE_TEXT})"
+_UPI_REF = r"(?<!\d)(?P<value>\d{12})(?!\d)"
+_LEGACY = {
+    "vendor": r"Vendor Name:[ \t]*(?P<value>[^\n]+)",
+    "amount": rf"Amount:[ \t]*{CURRENCY}?\s?(?P<value>{NUMBER})",
+    "id": r"Transaction ID:[ \t]*(?P<value>[A-Z0-9]+)",
+    "date": rf"Date of Transaction:[ \t]*(?P<value>{DATE_TEXT})",
+}
+
+TEMPLATES = {
+    "gpay": ProviderTemplate.compile("gpay", {
+        "vendor": [r"(?:Paid|Payment|Sent) to\s*\n?[ \t]*(?P<value>[^\n]+)", r"^To:?[ \t]+(?P<value>[^\n@]+)$"],
+        "amount": [_AMOUNT],
+        "id": [r"UPI transaction ID\s*:?\s*(?P<value>\d{12})", _UPI_REF],
+        "date": [_DATE],
+    }),
+    "phonepe": ProviderTemplate.compile("phonepe", {
+        "vendor": [r"Paid to\s*\n?[ \t]*(?P<value>[^\n]+)", r"Sent to\s*\n?[ \t]*(?P<value>[^\n]+)"],
+        "amount": [_AMOUNT],
+        "id": [r"UTR\s*(?:No\.?)?\s*:?\s*(?P<value>\d{12})", r"Transaction ID\s*:?\s*(?P<value>T\d{10,})", _UPI_REF],
+        "date": [_DATE],
+    }),
+    "paytm": ProviderTemplate.compile("paytm", {
+        "vendor": [r"(?:Paid|Sent|Money sent)\s+Successfully\s+to\s*\n?[ \t]*(?P<value>[^\n]+)", r"Paid to\s*\n?[ \t]*(?P<value>[^\n]+)", r"^To:?[ \t]+(?P<value>[^\n@]+)$"],
+        "amount": [_AMOUNT],
+        "id": [r"UPI Ref(?:erence)?\.?\s*(?:No|ID)\.?\s*:?\s*(?P<value>\d{12})", _UPI_REF],
+        "date": [_DATE],
+    }),
+    "generic": ProviderTemplate.compile("generic", {
+        "vendor": [_LEGACY["vendor"], r"(?:Paid|Payment|Sent) to\s*\n?[ \t]*(?P<value>[^\n]+)"],
+        "amount": [_LEGACY["amount"], _AMOUNT],
+        "id": [_LEGACY["id"], r"(?:UTR|UPI Ref(?:erence)?\.? No\.?|Transaction ID)\s*:?\s*(?P<value>[A-Z0-9]{10,})", _UPI_REF],
+        "date": [_LEGACY["date"], _DATE],
+    }),
+}
+
+# Tokens that only appear on one app's screens; the first one found wins
+_PROVIDER_MARKERS = re.compile(
+    r"(?P<phonepe>phonepe|Debited from|Transaction Successful)"
+    r"|(?P<paytm>paytm|UPI Ref(?:erence)?\.? No|Paid Successfully to|Money sent successfully)"
+    r"|(?P<gpay>Google Pay|G ?Pay|UPI transaction ID|Google transaction ID)",
+    re.IGNORECASE,
+)
+
+
+def detect_provider(text: str) -> str:
+    match = _PROVIDER_MARKERS.search(text)
+    return match.lastgroup if match else "generic"
+
+
+def normalize_amount(value: str) -> str | None:
+    """'1,23,456' / '1,250.5' -> '123456.00' / '1250.50'; grouping style doesn't matter"""
+    digits = value.replace(",", "").strip()
+    try:
+        return f"{float(digits):.2f}"
+    except ValueError:
+        return None
+
+
+def normalize_date(value: str, today: date | None = None) -> str | None:
+    """Parse the date styles UPI apps print into an ISO date string
+
+    Numeric dates are read day-first, as the apps print them in India. A
+    missing year means the most recent such date not after `today`.
+    """
+    today = today or date.today()
+    try:
+        if match := _ISO.fullmatch(value):
+            parsed = date(int(match[1]), int(match[2]), int(match[3]))
+        elif match := _NUMERIC.fullmatch(value):
+            year = int(match[3])
+            parsed = date(year + 2000 if year < 100 else year, int(match[2]), int(match[1]))
+        elif match := _MONTH_DAY_YEAR.fullmatch(value):
+            parsed = date(int(match[3]), MONTHS[match[1].lower()], int(match[2]))
+        elif match := _DAY_MONTH_YEAR.fullmatch(value.rstrip(",. ")):
+            month, day = MONTHS[match[2].lower()], int(match[1])
+            if match[3]:
+                parsed = date(int(match[3]), month, day)
+            else:
+                parsed = date(today.year, month, day)
+                if parsed > today:
+                    parsed = date(today.year - 1, month, day)
+        else:
+            return None
+    except ValueError:
+        return None
+    return parsed.isoformat()
+
+
+def parse_transaction_text(text: str, today: date | None = None) -> dict:
+    """Extract provider, vendor, amount, id and date from OCR text
+
+    Fields that could not be found are None; callers choose the fallbacks.
+    """
+    provider = detect_provider(text)
+    template = TEMPLATES[provider]
+    best: dict[str, tuple[int, str]] = {}
+
+    for match in template.pattern.finditer(text):
+        field, priority = template.group_fields[match.lastgroup]
+        if field not in best or priority < best[field][0]:
+            best[field] = (priority, match.group(match.lastgroup).strip())
+
+    values = {field: best[field][1] if field in best else None for field in FIELDS}
+    return {
+        "provider": provider,
+        "vendor": values["vendor"],
+        "amount": normalize_amount(values["amount"]) if values["amount"] else None,
+        "id": values["id"],
+        "date": normalize_date(values["date"], today) if values["date"] else None,
+    }
+
+
+def validate_transaction(parsed: dict, today: date | None = None) -> list[str]:
+    """Fields of a `parse_transaction_text` result that are missing or implausible"""
+    today = today or date.today()
+    issues = []
+    if not parsed.get("vendor"):
+        issues.append("vendor")
+    if parsed.get("amount") is None or not 0 < float(parsed["amount"]) <= MAX_AMOUNT:
+        issues.append("amount")
+    # One day of slack for screenshots taken ahead of the server's timezone
+    if parsed.get("date") is None or not (
+        today - timedelta(days=MAX_AGE_DAYS) <= date.fromisoformat(parsed["date"]) <= today + timedelta(days=1)
+    ):
+        issues.append("date")
+    if not parsed.get("id") or not TRANSACTION_ID.fullmatch(parsed["id"]):
+        issues.append("id")
+    return issues
@@ -0,0 +1,290 @@
+"""Merchant normalisation and trigram search over a user's expenses
+
+OCR spells the same merchant many ways ("SHARMA GENERAL STORE",
+"Sharma Genera1 Store", "Sharma General Store Pvt Ltd"). Each expense keeps
+the vendor as read and also a canonical `merchant`, chosen by fuzzy
+matching against the merchants the user already has.
+
+Search matches trigrams of the merchant and vendor, as pg_trgm does. On
+Postgres it runs against GIN trigram indexes; elsewhere (SQLite, tests)
+against an in-process inverted index. It never falls back to a
+`LIKE '%...%'` scan. Raw OCR text is stored compressed (see
+raw_text_services.py), so it isn't searchable.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Iterable
+
+from sqlalchemy import event, func, literal, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from ..core.config import ocr_settings
+from ..models.expenses import Expense
+from .normalization import similarity, trigrams, vendor_key
+from .raw_text_services import resolve_raw_text_async
+
+
+@dataclass
+class UserMerchants:
+    aliases: dict[str, str]  # spelling key -> canonical name
+    grams: dict[str, set[str]]  # canonical name -> trigrams
+    loaded_at: float
+
+
+class VendorNormalizer:
+    """Maps OCR spellings of a merchant onto one canonical name per user
+
+    A user's merchants are loaded once and kept in an LRU of users, reloaded
+    after `ttl_seconds`. A known spelling is a dict lookup. A new one is
+    compared with every canonical merchant by trigram similarity and joins
+    the closest if it clears `threshold`, otherwise it becomes a new
+    merchant. New spellings are staged on the caller's session and only
+    remembered once it commits, so a rolled-back insert leaves no trace.
+    """
+
+    def __init__(
+        self,
+        threshold: float = ocr_settings.vendor_match_threshold,
+        max_users: int = ocr_settings.vendor_cache_users,
+        ttl_seconds: float = ocr_settings.vendor_cache_ttl_seconds,
+    ):
+        self.threshold = threshold
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._users: OrderedDict[int, UserMerchants] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.fuzzy_matches = 0
+        self.new_merchants = 0
+
+    def cached(self, user_id: int) -> UserMerchants | None:
+        """The user's merchants if loaded and fresh, else None"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or time.monotonic() - entry.loaded_at > self.ttl_seconds:
+                return None
+            self._users.move_to_end(user_id)
+            return entry
+
+    def load(self, user_id: int, merchants: Iterable[str]) -> UserMerchants:
+        entry = UserMerchants({}, {}, time.monotonic())
+        for name in merchants:
+            entry.aliases[vendor_key(name)] = name
+            entry.grams[name] = trigrams(vendor_key(name))
+        with self._lock:
+            self._users[user_id] = entry
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return entry
+
+    def resolve(self, entry: UserMerchants, staged: UserMerchants, vendors: list[str]) -> list[str | None]:
+        """Canonical merchant per vendor (None when there's nothing to match on)
+
+        New spellings and merchants are added to `staged` rather than `entry`;
+        `apply` merges them in once they are committed.
+        """
+        names = []
+        with self._lock:
+            for vendor in vendors:
+                key = vendor_key(vendor)
+                if not key or key == "unknown":
+                    names.append(None)
+                    continue
+                known = entry.aliases.get(key) or staged.aliases.get(key)
+                if known is not None:
+                    self.hits += 1
+                    names.append(known)
+                    continue
+
+                key_grams = trigrams(key)
+                candidates = (*entry.grams.items(), *staged.grams.items())
+                score, best = max(((similarity(key_grams, g), name) for name, g in candidates), default=(0.0, None))
+                if best is not None and score >= self.threshold:
+                    self.fuzzy_matches += 1
+                else:
+                    self.new_merchants += 1
+                    best = " ".join(vendor.split())
+                    staged.grams[best] = key_grams
+                staged.aliases[key] = best
+                names.append(best)
+        return names
+
+    def match(self, entry: UserMerchants, vendor: str) -> str | None:
+        """The existing merchant `vendor` would be saved under, without staging anything"""
+        key = vendor_key(vendor)
+        if not key or key == "unknown":
+            return None
+        with self._lock:
+            known = entry.aliases.get(key)
+            if known is not None:
+                return known
+            key_grams = trigrams(key)
+            score, best = max(((similarity(key_grams, g), name) for name, g in entry.grams.items()), default=(0.0, None))
+        return best if score >= self.threshold else None
+
+    def apply(self, user_id: int, staged: UserMerchants) -> None:
+        """Remember committed spellings; a user no longer cached picks them up from the database"""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None:
+                entry.aliases.update(staged.aliases)
+                entry.grams.update(staged.grams)
+
+    def stats(self) -> dict:
+        return {"users": len(self._users), "hits": self.hits, "fuzzy_matches": self.fuzzy_matches, "new_merchants": self.new_merchants}
+
+
+vendor_normalizer = VendorNormalizer()
+
+STAGED_KEY = "staged_merchants"
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_staged_merchants(session: Session) -> None:
+    for user_id, staged in session.info.pop(STAGED_KEY, {}).items():
+        vendor_normalizer.apply(user_id, staged)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_staged_merchants(session: Session) -> None:
+    session.info.pop(STAGED_KEY, None)
+
+
+def _staged(db: Session | AsyncSession, user_id: int) -> UserMerchants:
+    # AsyncSession.info is its sync session's, so both reach the listeners above
+    return db.info.setdefault(STAGED_KEY, {}).setdefault(user_id, UserMerchants({}, {}, 0.0))
+
+
+def _known_merchants(user_id: int):
+    return select(Expense.merchant).where(Expense.user_id == user_id, Expense.merchant.is_not(None)).distinct()
+
+
+def user_merchants(db: Session, user_id: int) -> UserMerchants:
+    entry = vendor_normalizer.cached(user_id)
+    if entry is None:
+        entry = vendor_normalizer.load(user_id, db.scalars(_known_merchants(user_id)))
+    return entry
+
+
+async def user_merchants_async(db: AsyncSession, user_id: int) -> UserMerchants:
+    entry = vendor_normalizer.cached(user_id)
+    if entry is None:
+        entry = vendor_normalizer.load(user_id, await db.scalars(_known_merchants(user_id)))
+    return entry
+
+
+def canonical_merchants(db: Session, user_id: int, vendors: list[str]) -> list[str | None]:
+    return vendor_normalizer.resolve(user_merchants(db, user_id), _staged(db, user_id), vendors)
+
+
+async def canonical_merchants_async(db: AsyncSession, user_id: int, vendors: list[str]) -> list[str | None]:
+    return vendor_normalizer.resolve(await user_merchants_async(db, user_id), _staged(db, user_id), vendors)
+
+
+class TrigramSearchIndex:
+    """In-process inverted trigram index per user, for databases without pg_trgm
+
+    Built from the user's rows on first search. It is rebuilt when the
+    user's row count or highest id changes (inserts and deletes from any
+    process); edits made through this process call `invalidate`.
+    """
+
+    def __init__(self, max_users: int = ocr_settings.vendor_cache_users):
+        self.max_users = max_users
+        # user id -> ((count, max id), trigram -> expense ids)
+        self._users: OrderedDict[int, tuple[tuple, dict[str, list[int]]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def current(self, user_id: int, signature: tuple) -> dict[str, list[int]] | None:
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None or entry[0] != signature:
+                return None
+            self._users.move_to_end(user_id)
+            return entry[1]
+
+    def build(self, user_id: int, signature: tuple, rows: Iterable[tuple]) -> dict[str, list[int]]:
+        """Index (id, *searchable text) rows"""
+        postings: dict[str, list[int]] = {}
+        for expense_id, *values in rows:
+            for gram in trigrams(" ".join(value for value in values if value)):
+                postings.setdefault(gram, []).append(expense_id)
+        with self._lock:
+            self._users[user_id] = (signature, postings)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+        return postings
+
+    @staticmethod
+    def search(postings: dict[str, list[int]], query: str, threshold: float, limit: int) -> list[tuple[int, float]]:
+        """(expense id, score) best first; score is the share of the query's trigrams a row contains"""
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+        counts = Counter()
+        for gram in query_grams:
+            counts.update(postings.get(gram, ()))
+        scored = [(expense_id, count / len(query_grams)) for expense_id, count in counts.items()]
+        scored = [item for item in scored if item[1] >= threshold]
+        scored.sort(key=lambda item: (-item[1], -item[0]))
+        return scored[:limit]
+
+
+search_index = TrigramSearchIndex()
+
+SEARCH_COLUMNS = (Expense.merchant, Expense.vendor)
+
+
+async def search_expenses(
+    db: AsyncSession,
+    *,
+    user_id: int,
+    query: str,
+    columns: dict,
+    limit: int = 20,
+    threshold: float = ocr_settings.vendor_search_threshold,
+) -> list[dict]:
+    """A user's expenses whose merchant or vendor fuzzily contains `query`, best first"""
+    if db.bind.dialect.name == "postgresql":
+        # `<%` (word similarity) is answered from the GIN trigram indexes
+        await db.execute(
+            text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+            {"threshold": str(threshold)},
+        )
+        score = func.greatest(*(func.word_similarity(query, column) for column in SEARCH_COLUMNS))
+        stmt = (
+            select(*(column.label(name) for name, column in columns.items()), score.label("score"))
+            .where(Expense.user_id == user_id, or_(*(literal(query).op("<%")(column) for column in SEARCH_COLUMNS)))
+            .order_by(score.desc(), Expense.id.desc())
+            .limit(limit)
+        )
+        items = [dict(row) for row in (await db.execute(stmt)).mappings()]
+        return await resolve_raw_text_async(db, items)
+
+    signature = tuple((await db.execute(
+        select(func.count(Expense.id), func.max(Expense.id)).where(Expense.user_id == user_id)
+    )).one())
+    postings = search_index.current(user_id, signature)
+    if postings is None:
+        rows = await db.execute(select(Expense.id, *SEARCH_COLUMNS).where(Expense.user_id == user_id))
+        postings = search_index.build(user_id, signature, rows)
+
+    matches = TrigramSearchIndex.search(postings, query, threshold, limit)
+    if not matches:
+        return []
+    rows = (await db.execute(
+        select(*(column.label(name) for name, column in columns.items()), Expense.id.label("_search_id"))
+        .where(Expense.id.in_([expense_id for expense_id, _ in matches]))
+    )).mappings()
+    by_id = {row["_search_id"]: {name: row[name] for name in columns} for row in rows}
+    items = [{**by_id[expense_id], "score": score} for expense_id, score in matches if expense_id in by_id]
+    return await resolve_raw_text_async(db, items)
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# Settings are read at import, so point them at a scratch database before any backend module loads
+SCRATCH = tempfile.mkdtemp(prefix="dipex-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{SCRATCH}/test.db"
+for name, value in {
+    "DATABASE_HOST": "localhost",
+    "DATABASE_NAME": "dipex_test",
+    "DATABASE_USER": "test",
+    "DATABASE_PASSWORD": "test",
+    "SECRET_KEY": "test",
+    "OCR_CACHE_PATH": "",
+    "OCR_POOL_WARMUP_ENGINES": "",
+    "OCR_WARMUP_ENGINES": "",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+@pytest.fixture(scope="session")
+def tables():
+    from backend.db.session import create_tables
+
+    create_tables()
+
+
+@pytest.fixture
+def make_user(tables):
+    """Creates fresh users, so tests never see each other's rows"""
+    from backend.db.session import SessionLocal
+    from backend.models.user import User
+
+    def make_user() -> int:
+        token = uuid.uuid4().hex[:12]
+        with SessionLocal() as db:
+            user = User(email=f"{token}@example.com", phone=token, password_hash="-", name="test")
+            db.add(user)
+            db.commit()
+            return user.id
+    return make_user
+
+
+@pytest.fixture
+def user_id(make_user) -> int:
+    return make_user()
+
+
+@pytest.fixture
+def client(tables):
+    """The API routers without the app's lifespan (no OCR pool or warmup)"""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from backend.app.api.v1.expenses import router as expenses_router
+    from backend.app.api.v1.ocr import router as ocr_router
+
+    app = FastAPI()
+    app.include_router(ocr_router, prefix="/api/v1")
+    app.include_router(expenses_router, prefix="/api/v1")
+    with TestClient(app) as test_client:
+        yield test_client
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from backend.services import gemini_client
+from backend.services.gemini_client import (
+    GeminiClient,
+    GeminiReply,
+    GeminiTimeout,
+    HedgeStats,
+    StubGeminiBackend,
+    TokenBucket,
+    hedged,
+)
+
+FIXTURE = Path(__file__).parents[1] / "benchmarks" / "fixtures" / "gemini_responses.json"
+
+
+class CountingBackend(StubGeminiBackend):
+    """Stub that records how many calls were in flight at once"""
+
+    def __init__(self, replies, latency=0.0):
+        super().__init__(replies, latency)
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def generate(self, parts):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            return super().generate(parts)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def reply(**fields) -> GeminiReply:
+    return GeminiReply(text=json.dumps(fields), prompt_tokens=10, output_tokens=5)
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    fresh = HedgeStats()
+    monkeypatch.setattr(gemini_client, "hedge_stats", fresh)
+    return fresh
+
+
+# Token bucket
+
+def test_token_bucket_allows_a_burst_then_spaces_calls():
+    bucket = TokenBucket(rate=10, capacity=3)
+    waits = [bucket.reserve() for _ in range(5)]
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(0.1, abs=0.01)
+    assert waits[4] == pytest.approx(0.2, abs=0.01)
+
+
+def test_token_bucket_refills_at_its_rate_up_to_capacity():
+    bucket = TokenBucket(rate=2, capacity=2)
+    bucket.reserve()
+    bucket.reserve()
+    bucket.updated -= 0.5  # one token's worth of time
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() > 0
+
+    bucket = TokenBucket(rate=2, capacity=2)
+    bucket.updated -= 100  # idle for a long time: still only `capacity` tokens
+    assert [bucket.reserve() == 0.0 for _ in range(3)] == [True, True, False]
+
+
+def test_token_bucket_acquire_waits_for_the_next_token():
+    async def run():
+        bucket = TokenBucket(rate=20, capacity=1)
+        started = time.perf_counter()
+        await bucket.acquire()
+        await bucket.acquire()
+        return time.perf_counter() - started
+
+    assert asyncio.run(run()) >= 0.04
+
+
+# hedged()
+
+async def after(seconds: float, value):
+    await asyncio.sleep(seconds)
+    return value
+
+
+async def fails(seconds: float = 0.0):
+    await asyncio.sleep(seconds)
+    raise RuntimeError("boom")
+
+
+def run_hedged(primary, fallback, hedge_after=None, score=None):
+    return asyncio.run(hedged(primary, fallback, hedge_after=hedge_after, is_valid=lambda r: r > 0, score=score))
+
+
+def test_hedged_returns_a_fast_valid_primary_without_starting_the_fallback(stats):
+    started = []
+
+    async def fallback():
+        started.append(True)
+        return 2
+
+    assert run_hedged(lambda: after(0, 1), fallback, hedge_after=1.0) == 1
+    assert started == []
+    assert stats.as_dict() == {"hedged": 0, "escalated": 0, "fallback_wins": 0}
+
+
+def test_hedged_fallback_wins_when_the_primary_is_slow_and_the_loser_is_cancelled(stats):
+    cancelled = []
+
+    async def slow_primary():
+        try:
+            return await after(1.0, 1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    assert run_hedged(slow_primary, lambda: after(0, 2), hedge_after=0.01) == 2
+    assert cancelled == [True]
+    assert stats.as_dict() == {"hedged": 1, "escalated": 0, "fallback_wins": 1}
+
+
+def test_hedged_slow_primary_still_wins_if_it_finishes_first(stats):
+    assert run_hedged(lambda: after(0.05, 1), lambda: after(1.0, 2), hedge_after=0.01) == 1
+    assert stats.as_dict() == {"hedged": 1, "escalated": 0, "fallback_wins": 0}
+
+
+@pytest.mark.parametrize("primary", [lambda: after(0, -1), fails], ids=["invalid", "error"])
+def test_hedged_escalates_when_the_primary_has_no_valid_result(stats, primary):
+    assert run_hedged(primary, lambda: after(0, 2)) == 2
+    assert stats.as_dict() == {"hedged": 0, "escalated": 1, "fallback_wins": 1}
+
+
+def test_hedged_keeps_the_primary_when_neither_is_valid_unless_the_fallback_scores_higher(stats):
+    score = abs
+    assert run_hedged(lambda: after(0, -3), lambda: after(0, -3), score=score) == -3
+    assert run_hedged(lambda: after(0, -3), lambda: after(0, -1), score=score) == -3
+    assert run_hedged(lambda: after(0, -1), lambda: after(0, -3), score=score) == -3
+    # Without a score the primary's result is kept, whichever finished last
+    assert run_hedged(lambda: after(0, -1), lambda: after(0.01, -2)) == -1
+
+
+def test_hedged_returns_the_only_result_when_the_other_fails(stats):
+    assert run_hedged(fails, lambda: after(0, -2)) == -2
+    assert run_hedged(lambda: after(0, -1), fails) == -1
+
+
+def test_hedged_raises_when_both_fail(stats):
+    with pytest.raises(RuntimeError, match="boom"):
+        run_hedged(fails, fails)
+
+
+# Replies that don't fit the schema
+
+def test_replies_that_are_not_json_are_counted_invalid():
+    client = GeminiClient(StubGeminiBackend([GeminiReply(text="Paid to Sharma, Rs 120")]))
+    with pytest.raises(ValidationError):
+        asyncio.run(client.extract_async(None))
+    with pytest.raises(ValidationError):
+        client.extract(None)
+    assert client.stats()["calls"] == 2
+    assert client.invalid == 2
+
+
+def test_wrong_fields_become_none_instead_of_failing_the_reply():
+    client = GeminiClient(StubGeminiBackend([
+        reply(vendor="  Sharma   Store ", amount="₹1,250", date="yesterday", transaction_id="", payment_app="bhim"),
+    ]))
+    transaction = client.extract(None).transaction
+    assert transaction.vendor == "Sharma Store"
+    assert transaction.amount == "1250.00"
+    assert transaction.date is None
+    assert transaction.transaction_id is None
+    assert transaction.payment_app == "generic"
+    assert client.invalid == 0
+
+
+def test_recorded_replies_validate_to_the_expected_fields():
+    cases = json.loads(FIXTURE.read_text(encoding="utf-8"))
+    client = GeminiClient(StubGeminiBackend.from_fixture(str(FIXTURE)), rate_per_second=1000, burst=len(cases))
+    for case in cases:
+        transaction = client.extract(None).transaction
+        expected = case["expected"]
+        assert (transaction.payment_app, transaction.vendor, transaction.amount, transaction.transaction_id,
+                transaction.date) == (expected["provider"], expected["vendor"], expected["amount"], expected["id"],
+                                      expected["date"]), case["name"]
+
+
+# Sync extract() goes through the same limits as extract_async()
+
+def test_sync_extract_is_rate_limited():
+    client = GeminiClient(StubGeminiBackend([reply(vendor="A")]), rate_per_second=20, burst=1)
+    started = time.perf_counter()
+    client.extract(None)
+    client.extract(None)
+    assert time.perf_counter() - started >= 0.04
+
+
+def test_sync_extract_is_capped_at_max_concurrency():
+    backend = CountingBackend([reply(vendor="A")], latency=0.05)
+    client = GeminiClient(backend, max_concurrency=2, rate_per_second=1000, burst=100)
+    threads = [threading.Thread(target=client.extract, args=(None,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend.calls == 6
+    assert backend.peak == 2
+
+
+def test_sync_extract_times_out_waiting_for_a_slot():
+    client = GeminiClient(StubGeminiBackend([reply(vendor="A")], latency=0.3), max_concurrency=1, timeout=0.05)
+    holder = threading.Thread(target=client.extract, args=(None,))
+    holder.start()
+    time.sleep(0.02)
+    with pytest.raises(GeminiTimeout):
+        client.extract(None)
+    holder.join()
+    assert client.timeouts == 1
+
+
+def test_sync_extract_times_out_rather_than_wait_past_its_deadline_for_a_token():
+    client = GeminiClient(StubGeminiBackend([reply(vendor="A")]), rate_per_second=1, burst=1, timeout=0.1)
+    client.extract(None)
+    started = time.perf_counter()
+    with pytest.raises(GeminiTimeout):
+        client.extract(None)
+    assert time.perf_counter() - started < 0.1
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from backend.app.api.v1 import ocr
+from backend.db.session import AsyncSessionLocal
+from backend.services.idempotency_services import (
+    REPLAYED_HEADER,
+    IdempotencyConflict,
+    IdempotencyInProgress,
+    begin_async,
+    finish_async,
+    release_async,
+)
+from backend.services.ocr_executor import OCRQueueFull
+
+PNG = b"\x89PNG\r\n\x1a\n"
+EXTRACTED = {"vendor": "Sharma General Store", "amount": "1250.00", "id": "528412937710", "date": "2025-10-12"}
+
+
+@pytest.fixture
+def extractions(monkeypatch):
+    """Replaces OCR; append results (or exceptions) to `queue`, read `calls` afterwards"""
+    state = {"calls": 0, "queue": []}
+
+    async def run_extraction(content):
+        state["calls"] += 1
+        result = state["queue"].pop(0) if state["queue"] else EXTRACTED
+        if isinstance(result, Exception):
+            raise result
+        return dict(result)
+
+    monkeypatch.setattr(ocr, "run_extraction", run_extraction)
+    return state
+
+
+def extract(client, user_id: int, key: str | None, content: bytes = PNG):
+    headers = {"Idempotency-Key": key} if key else {}
+    return client.post(
+        "/api/v1/ocr/extract",
+        files={"file": ("receipt.png", content, "image/png")},
+        data={"user_id": str(user_id)},
+        headers=headers,
+    )
+
+
+def test_a_retry_replays_the_first_response(client, user_id, extractions):
+    first = extract(client, user_id, "key-1")
+    retry = extract(client, user_id, "key-1")
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert first.json()["data"]["amount"] == "1250.00"
+    assert REPLAYED_HEADER not in first.headers
+    assert retry.headers[REPLAYED_HEADER] == "true"
+    assert extractions["calls"] == 1
+
+
+def test_without_a_key_every_request_runs(client, user_id, extractions):
+    extract(client, user_id, None)
+    extract(client, user_id, None)
+    assert extractions["calls"] == 2
+
+
+def test_keys_are_per_user(client, user_id, make_user, extractions):
+    extract(client, user_id, "shared")
+    response = extract(client, make_user(), "shared")
+    assert REPLAYED_HEADER not in response.headers
+    assert extractions["calls"] == 2
+
+
+def test_a_key_reused_for_another_image_is_rejected(client, user_id, extractions):
+    extract(client, user_id, "key-2")
+    response = extract(client, user_id, "key-2", content=PNG + b"other")
+    assert response.status_code == 422
+    assert extractions["calls"] == 1
+
+
+@pytest.mark.parametrize("failure", [{}, OCRQueueFull(5)], ids=["empty", "queue-full"])
+def test_failed_requests_release_the_key(client, user_id, extractions, failure):
+    extractions["queue"].append(failure)
+    first = extract(client, user_id, "key-3")
+    assert first.status_code == (503 if isinstance(failure, Exception) else 200)
+    retry = extract(client, user_id, "key-3")
+    assert retry.json()["success"] is True
+    assert REPLAYED_HEADER not in retry.headers
+    assert extractions["calls"] == 2
+
+
+def test_a_key_held_by_an_unfinished_request_is_in_progress(user_id):
+    claim = dict(user_id=user_id, key="key-4", endpoint="/test", fingerprint="f", lease=60)
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            assert await begin_async(db, **claim) is None
+            with pytest.raises(IdempotencyInProgress):
+                await begin_async(db, **claim)
+            with pytest.raises(IdempotencyConflict):
+                await begin_async(db, **{**claim, "fingerprint": "g"})
+            await finish_async(db, user_id=user_id, key="key-4", status_code=200, response={"ok": 1}, ttl=60)
+            replayed = (await begin_async(db, **claim)).response
+            await release_async(db, user_id=user_id, key="key-4")  # a finished key is kept
+            return replayed, (await begin_async(db, **claim)).response
+
+    assert asyncio.run(run()) == ({"ok": 1}, {"ok": 1})
+
+
+def test_an_expired_lease_can_be_claimed_again(user_id):
+    claim = dict(user_id=user_id, key="key-5", endpoint="/test", fingerprint="f")
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            assert await begin_async(db, **claim, lease=-1) is None  # a request that died mid-way
+            return await begin_async(db, **claim, lease=60)
+
+    assert asyncio.run(run()) is None
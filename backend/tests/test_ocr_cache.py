@@ -0,0 +1,88 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from backend.services import ocr_services
+from backend.services.ocr_services import OCRResultCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controls time.time() as the cache sees it"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(ocr_services.time, "time", lambda: now[0])
+    return now
+
+
+def disk_keys(path) -> list[str]:
+    with sqlite3.connect(path) as conn:
+        return [key for (key,) in conn.execute("SELECT key FROM ocr_cache ORDER BY key")]
+
+
+def test_keys_are_the_sha256_of_the_bytes():
+    assert OCRResultCache.key_for(b"abc") == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
+    assert OCRResultCache.key_for(memoryview(b"abc")) == OCRResultCache.key_for(b"abc")
+
+
+def test_memory_tier_evicts_the_least_recently_used():
+    cache = OCRResultCache(max_entries=2)
+    cache.put("a", {"amount": "1"})
+    cache.put("b", {"amount": "2"})
+    assert cache.get("a") == {"amount": "1"}  # a is now more recent than b
+    cache.put("c", {"amount": "3"})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"amount": "1"}
+    assert cache.get("c") == {"amount": "3"}
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_returned_results_are_copies():
+    cache = OCRResultCache()
+    value = {"amount": "1"}
+    cache.put("a", value)
+    value["amount"] = "changed"
+    cache.get("a")["amount"] = "changed"
+    assert cache.get("a") == {"amount": "1"}
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = OCRResultCache(ttl_seconds=60)
+    cache.put("a", {"amount": "1"})
+    clock[0] += 59
+    assert cache.get("a") == {"amount": "1"}
+    clock[0] += 2
+    assert cache.get("a") is None
+    assert cache.stats() == {"hits": 1, "disk_hits": 0, "misses": 1, "hit_ratio": 0.5, "memory_entries": 0}
+
+
+def test_disk_tier_is_shared_between_caches(tmp_path):
+    path = str(tmp_path / "ocr.db")
+    OCRResultCache(path=path).put("a", {"amount": "1"})
+
+    other = OCRResultCache(path=path)  # e.g. another API process
+    assert other.get("a") == {"amount": "1"}
+    assert other.get("a") == {"amount": "1"}  # promoted to memory
+    assert other.stats()["disk_hits"] == 1
+    assert other.get("missing") is None
+    assert other.stats()["misses"] == 1
+
+
+def test_disk_tier_honours_the_ttl_and_prunes(tmp_path, clock):
+    path = str(tmp_path / "ocr.db")
+    cache = OCRResultCache(ttl_seconds=60, path=path, prune_every=1)
+    cache.put("old", {"amount": "1"})
+    clock[0] += 61
+    assert OCRResultCache(ttl_seconds=60, path=path).get("old") is None
+    cache.put("new", {"amount": "2"})
+    assert disk_keys(path) == ["new"]
+
+
+def test_async_accessors_use_both_tiers(tmp_path):
+    path = str(tmp_path / "ocr.db")
+
+    async def run():
+        await OCRResultCache(path=path).put_async("a", {"amount": "1"})
+        return await OCRResultCache(path=path).get_async("a")
+
+    assert asyncio.run(run()) == {"amount": "1"}
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+import pytest
+
+from backend.app.api.v1 import ocr
+from backend.services.ocr_executor import OCRExecutor, OCRJobTimeout, OCRQueueFull
+
+
+def nap(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+@pytest.fixture
+def executor():
+    pool = OCRExecutor(max_workers=1, max_queue=1, job_timeout=5.0, retry_after=7)
+    yield pool
+    pool.shutdown()
+
+
+def test_runs_jobs_in_the_pool(executor):
+    assert asyncio.run(executor.run(pow, 2, 10)) == 1024
+    assert executor.in_flight == 0
+
+
+def test_rejects_jobs_beyond_workers_plus_queue(executor):
+    async def run():
+        jobs = [asyncio.create_task(executor.run(nap, 0.5)) for _ in range(executor.capacity)]
+        await asyncio.sleep(0)  # let both claim their slots
+        with pytest.raises(OCRQueueFull) as rejected:
+            await executor.run(nap, 0)
+        return rejected.value, await asyncio.gather(*jobs)
+
+    rejected, results = asyncio.run(run())
+    assert rejected.retry_after == 7
+    assert results == [0.5, 0.5]
+
+
+def test_timed_out_jobs_keep_their_slot_until_the_worker_finishes(executor):
+    async def run():
+        await executor.run(nap, 0)  # spawn the worker before tightening the timeout
+        executor.job_timeout = 0.5
+        with pytest.raises(OCRJobTimeout):
+            await executor.run(nap, 1.5)
+        held = executor.in_flight
+        while executor.in_flight:
+            await asyncio.sleep(0.05)
+        return held
+
+    assert asyncio.run(run()) == 1
+
+
+@pytest.mark.parametrize("error, status", [(OCRQueueFull(7), 503), (OCRJobTimeout("slow"), 504)])
+def test_extract_maps_pool_errors_to_http_statuses(client, monkeypatch, error, status):
+    async def failing(content):
+        raise error
+
+    monkeypatch.setattr(ocr, "run_extraction", failing)
+    response = client.post("/api/v1/ocr/extract", files={"file": ("receipt.png", b"\x89PNG\r\n\x1a\n", "image/png")})
+    assert response.status_code == status
+    if status == 503:
+        assert response.headers["Retry-After"] == "7"
@@ -0,0 +1,74 @@
+from datetime import date
+
+import pytest
+
+from backend.db.session import SessionLocal
+from backend.models.expenses import Expense
+from backend.services.pagination import InvalidCursor, decode_cursor, encode_cursor, parse_fields
+
+DAYS = [date(2025, 3, 1), date(2025, 3, 2), date(2025, 3, 2), date(2025, 3, 2), date(2025, 3, 5), date(2025, 2, 28)]
+
+
+@pytest.fixture
+def expense_ids(user_id) -> list[int]:
+    """The user's expenses in listing order: date DESC, id DESC (several share a date)"""
+    with SessionLocal() as db:
+        expenses = [
+            Expense(user_id=user_id, vendor=f"Shop {index}", amount=10 + index, expense_date=day,
+                    category="Food" if index % 2 else "Other")
+            for index, day in enumerate(DAYS)
+        ]
+        db.add_all(expenses)
+        db.commit()
+        return [e.id for e in sorted(expenses, key=lambda e: (e.expense_date, e.id), reverse=True)]
+
+
+def walk(client, user_id: int, limit: int, **params) -> list[list[int]]:
+    pages, cursor = [], None
+    while True:
+        query = {"user_id": user_id, "limit": limit, **params, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/v1/expenses", params=query).json()
+        pages.append([item["id"] for item in body["items"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trips():
+    cursor = encode_cursor(date(2025, 3, 2), 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (date(2025, 3, 2), 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(date(2025, 1, 1), 1)[:-3], "WzEsMl0"])
+def test_bad_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor)
+
+
+def test_pages_cover_every_row_once_in_order_across_date_ties(client, user_id, expense_ids):
+    pages = walk(client, user_id, limit=2)
+    assert pages == [expense_ids[0:2], expense_ids[2:4], expense_ids[4:6]]
+
+
+def test_last_full_page_has_no_cursor(client, user_id, expense_ids):
+    assert walk(client, user_id, limit=len(expense_ids)) == [expense_ids]
+
+
+def test_filters_apply_to_every_page(client, user_id, expense_ids):
+    pages = walk(client, user_id, limit=1, category="Food")
+    food = [expense_id for expense_id in expense_ids if expense_id in sum(pages, [])]
+    assert len(food) == 3  # every other seeded expense
+    assert pages == [[expense_id] for expense_id in food]
+
+
+def test_invalid_cursor_and_fields_are_400(client, user_id):
+    assert client.get("/api/v1/expenses", params={"user_id": user_id, "cursor": "nope"}).status_code == 400
+    assert client.get("/api/v1/expenses", params={"user_id": user_id, "fields": "id,password"}).status_code == 400
+
+
+def test_fields_projects_the_listing(client, user_id, expense_ids):
+    body = client.get("/api/v1/expenses", params={"user_id": user_id, "fields": "id,amount", "limit": 1}).json()
+    assert list(body["items"][0]) == ["id", "amount"]
+    assert parse_fields(None, ("id", "amount"), ("id",)) == ["id"]
+    assert parse_fields("amount, id,amount", ("id", "amount"), ("id",)) == ["amount", "id"]
@@ -0,0 +1,82 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from backend.db.session import SessionLocal
+from backend.models.expense_rollups import ExpenseRollup
+from backend.rebuild_rollups import check_rollups
+from backend.services.expenses_services import create_expense
+from backend.services.rollup_services import expense_deltas, merge_deltas
+
+
+def buckets(user_id: int) -> dict[tuple, tuple]:
+    """Non-empty rollup buckets: (month, category, vendor) -> (total, count)"""
+    with SessionLocal() as db:
+        rows = db.scalars(select(ExpenseRollup).where(ExpenseRollup.user_id == user_id, ExpenseRollup.count != 0))
+        return {(r.month, r.category, r.vendor): (r.total, r.count) for r in rows}
+
+
+def consistent(user_id: int) -> bool:
+    with SessionLocal() as db:
+        return check_rollups(db, user_id) == 0
+
+
+@pytest.fixture
+def add(user_id):
+    def add(vendor: str, amount: float, day: date, category: str = "Food") -> int:
+        with SessionLocal() as db:
+            return create_expense(
+                db, user_id=user_id, vendor=vendor, amount=amount, expense_date=day, category=category, raw_text="",
+            ).id
+    return add
+
+
+def test_deltas_fold_into_monthly_buckets_and_cancel_out():
+    rows = [(1, date(2025, 3, 4), "Food", "Cafe", 10), (1, date(2025, 3, 20), "Food", "Cafe", 2.5)]
+    assert dict(expense_deltas(rows)) == {(1, date(2025, 3, 1), "Food", "Cafe"): [Decimal("12.5"), 2]}
+    merged = merge_deltas(expense_deltas(rows), expense_deltas(rows[:1], sign=-1))
+    assert dict(merged) == {(1, date(2025, 3, 1), "Food", "Cafe"): [Decimal("2.5"), 1]}
+
+
+def test_creates_add_to_the_merchant_bucket(user_id, add):
+    add("Sharma General Store", 100, date(2025, 3, 4))
+    add("SHARMA GENERAL STORE", 50, date(2025, 3, 9))  # another spelling of the same merchant
+    add("Sharma General Store", 25, date(2025, 4, 1))
+    assert buckets(user_id) == {
+        (date(2025, 3, 1), "Food", "Sharma General Store"): (Decimal("150.00"), 2),
+        (date(2025, 4, 1), "Food", "Sharma General Store"): (Decimal("25.00"), 1),
+    }
+    assert consistent(user_id)
+
+
+def test_updates_move_the_amount_between_buckets(client, user_id, add):
+    expense_id = add("Cafe Coffee Day", 80, date(2025, 3, 4))
+    add("Cafe Coffee Day", 20, date(2025, 3, 5))
+
+    response = client.patch(f"/api/v1/expenses/{expense_id}", json={"amount": 90, "category": "Travel"})
+    assert response.status_code == 200
+    assert buckets(user_id) == {
+        (date(2025, 3, 1), "Food", "Cafe Coffee Day"): (Decimal("20.00"), 1),
+        (date(2025, 3, 1), "Travel", "Cafe Coffee Day"): (Decimal("90.00"), 1),
+    }
+
+    client.patch(f"/api/v1/expenses/{expense_id}", json={"expense_date": "2025-04-02", "vendor": "Blue Tokai"})
+    assert buckets(user_id) == {
+        (date(2025, 3, 1), "Food", "Cafe Coffee Day"): (Decimal("20.00"), 1),
+        (date(2025, 4, 1), "Travel", "Blue Tokai"): (Decimal("90.00"), 1),
+    }
+    assert consistent(user_id)
+
+
+def test_deletes_empty_their_bucket(client, user_id, add):
+    add("Zomato", 300, date(2025, 3, 4))
+    drop = add("Swiggy", 200, date(2025, 3, 4))
+    assert client.delete(f"/api/v1/expenses/{drop}").status_code == 204
+    assert buckets(user_id) == {(date(2025, 3, 1), "Food", "Zomato"): (Decimal("300.00"), 1)}
+    assert client.delete(f"/api/v1/expenses/{drop}").status_code == 404
+    assert consistent(user_id)
+
+    summary = client.get("/api/v1/expenses/summary", params={"user_id": user_id, "group_by": "vendor"}).json()
+    assert summary["buckets"] == [{"key": "Zomato", "total": 300.0, "count": 1}]
@@ -0,0 +1,55 @@
+import json
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+from backend.services.upi_parser import TRANSACTION_ID, parse_transaction_text, validate_transaction
+
+FIXTURE = Path(__file__).parents[1] / "benchmarks" / "fixtures" / "upi_text.json"
+CASES = json.loads(FIXTURE.read_text(encoding="utf-8"))
+TODAY = date(2025, 10, 20)
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["name"] for case in CASES])
+def test_fixture_texts_parse_to_the_expected_fields(case):
+    parsed = parse_transaction_text(case["text"], today=TODAY)
+    assert {field: parsed[field] for field in case["expected"]} == case["expected"]
+
+
+@pytest.mark.parametrize("text, amount", [
+    ("₹1500", "1500.00"),
+    ("₹1999", "1999.00"),
+    ("Rs.2000", "2000.00"),
+    ("₹ 12345.50", "12345.50"),
+    ("INR 100000", "100000.00"),
+    ("₹1,500", "1500.00"),
+    ("₹1,23,456.00", "123456.00"),
+    ("₹12,345.5", "12345.50"),
+    ("₹45", "45.00"),
+])
+def test_amounts_parse_whole_with_or_without_grouping(text, amount):
+    assert parse_transaction_text(f"Paid to\nShop\n{text}\n12 Oct 2025")["amount"] == amount
+
+
+@pytest.mark.parametrize("value", ["successful", "Transaction", "SUCCESSFULLY", "Completedpayment"])
+def test_words_are_not_transaction_ids(value):
+    assert TRANSACTION_ID.fullmatch(value) is None
+
+
+@pytest.mark.parametrize("value", ["528412937710", "T2510121942123456789012", "TXN123456789", "axis1234567890"])
+def test_transaction_id_shapes(value):
+    assert TRANSACTION_ID.fullmatch(value)
+
+
+def test_a_word_read_as_the_id_is_not_trusted():
+    parsed = parse_transaction_text(
+        "Payment to\nShop\n₹1500\nTransaction ID: Successfully\n12 Oct 2025", today=TODAY,
+    )
+    assert parsed["id"] == "Successfully"
+    assert validate_transaction(parsed, today=TODAY) == ["id"]
+
+
+def test_a_clean_read_has_no_issues():
+    parsed = parse_transaction_text(CASES[0]["text"], today=TODAY)
+    assert validate_transaction(parsed, today=TODAY) == []
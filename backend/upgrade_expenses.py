@@ -0,0 +1,77 @@
+from backend.db.base import Base
+from backend.db.session import engine
+from backend.models.expenses import Expense
+from backend.models.payments import Payment
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateColumn
+import logging
+
+logger = logging.getLogger("upgrade_expenses")
+if not logger.handlers:
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+# Columns added to existing tables since they were first created; raw_text_digest is compact_raw_text's job
+COLUMNS = {Expense.__table__: ("merchant", "category_locked")}
+INDEXED_TABLES = (Expense.__table__, Payment.__table__)
+
+
+def add_columns(conn) -> list[str]:
+    """ALTER TABLE ... ADD COLUMN for model columns the database lacks; returns the ones added"""
+    added = []
+    for table, names in COLUMNS.items():
+        existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+        for name in names:
+            if name in existing:
+                continue
+            # CreateColumn renders the model's type, NOT NULL and server default for this dialect
+            ddl = CreateColumn(table.c[name]).compile(dialect=conn.dialect)
+            conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+            added.append(f"{table.name}.{name}")
+    return added
+
+
+def create_indexes(conn) -> list[str]:
+    """Create the models' indexes that don't exist yet; returns the ones created"""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    created = []
+    for table in INDEXED_TABLES:
+        existing = {index["name"] for index in inspect(conn).get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name in existing:
+                continue
+            try:
+                # A savepoint, so one index that can't be built doesn't undo the rest
+                with conn.begin_nested():
+                    index.create(conn)
+            except IntegrityError as e:
+                logger.error("❌ Could not create %s (existing rows violate it): %s", index.name, e.orig)
+        # Postgres-only indexes are skipped elsewhere, so report what the database now has
+        created += sorted({index["name"] for index in inspect(conn).get_indexes(table.name)} - existing)
+    return created
+
+
+def main():
+    # New tables (rollups, category overrides, the dictionary version, idempotency keys); existing ones are left alone
+    tables = set(inspect(engine).get_table_names())
+    missing = [table for table in Base.metadata.sorted_tables if table.name not in tables]
+    Base.metadata.create_all(engine, tables=missing, checkfirst=True)
+    for table in missing:
+        logger.info("✅ Created table %s", table.name)
+
+    with engine.begin() as conn:
+        for column in add_columns(conn):
+            logger.info("✅ Added column %s", column)
+        for index in create_indexes(conn):
+            logger.info("✅ Created index %s", index)
+
+    logger.info("Run python -m backend.normalize_vendors to fill in merchants for existing expenses")
+
+
+if __name__ == "__main__":
+    main()